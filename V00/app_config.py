@@ -0,0 +1,14 @@
+import json
+from typing import Dict
+from logger import video_logger
+
+def load_config(config_path: str = 'config.json') -> Dict:
+    """读取配置文件，失败时返回空配置（全部使用默认值）"""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        video_logger.info('Configuration loaded successfully')
+        return config
+    except Exception as e:
+        video_logger.error('Failed to load config: %s', str(e))
+        return {}
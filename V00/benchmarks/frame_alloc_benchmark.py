@@ -0,0 +1,137 @@
+"""渲染热循环的逐帧内存分配基准
+
+渲染一条包含视频片段、图片片段、转场和字幕叠加层的时间线，统计渲染过程中分配帧大小缓冲的次数。
+在每次 Python/C 函数调用和返回时（sys.setprofile）读取 tracemalloc 记录的内存，
+相邻两次读数增长超过半帧即记为一次帧缓冲分配（numpy 数组和 bytes 对象都会被 tracemalloc 记录）。
+
+用法（在 V00 目录下运行）：
+    python benchmarks/frame_alloc_benchmark.py --output benchmarks/frame_alloc_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import tracemalloc
+from typing import Dict, List, Optional
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+def build_timeline(root: str, size: tuple, seconds: float, fps: float):
+    from PIL import Image
+    from moviepy.editor import VideoClip
+    from lazy_clips import LazyImageClip, LazyVideoFileClip
+    from normalizer import Normalizer
+    from render_engine import StreamingRenderer
+    from subtitle_renderer import SubtitleTrack
+    from transitions import Transitions
+
+    rng = np.random.default_rng(0)
+    video_file = os.path.join(root, 'source.mp4')
+    base = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+    source = VideoClip(lambda t: np.roll(base, int(t * 48), axis=1), duration=seconds)
+    StreamingRenderer(video_file, size, fps=fps, ffmpeg_params=['-preset', 'ultrafast']).render([source])
+    image_file = os.path.join(root, 'still.png')
+    Image.fromarray(rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)).save(image_file)
+
+    clips = [
+        LazyVideoFileClip(video_file, {'width': size[0], 'height': size[1], 'fps': fps, 'duration': seconds}),
+        LazyImageClip(image_file, seconds, size),
+    ]
+    clips = Normalizer(size).normalize(clips)
+    timeline = Transitions('crossfade', 0.5).apply(clips, size, fps)
+    cues = [{'text': f'第{index + 1}句字幕', 'start': index * 1.0, 'end': index * 1.0 + 0.9}
+            for index in range(int(seconds * 2))]
+    return timeline, SubtitleTrack(cues, size)
+
+def measure(root: str, size: tuple, seconds: float, fps: float) -> Dict:
+    from frame_pool import FRAME_POOL
+    from render_engine import StreamingRenderer
+
+    timeline, subtitle = build_timeline(root, size, seconds, fps)
+    frame_bytes = size[0] * size[1] * 3
+    per_frame: List[int] = []
+    state = {'allocations': 0}
+
+    def on_event(frame, event, arg) -> None:
+        current = tracemalloc.get_traced_memory()[0]
+        grown = current - state['last']
+        state['last'] = current
+        if grown >= frame_bytes // 2:
+            state['allocations'] += int(round(grown / frame_bytes))
+
+    def on_frame(done: int, total: int) -> None:
+        per_frame.append(state['allocations'])
+        state['allocations'] = 0
+
+    renderer = StreamingRenderer(os.path.join(root, 'output.mp4'), size, fps=fps,
+                                 ffmpeg_params=['-preset', 'ultrafast'])
+    tracemalloc.start()
+    start = state['last'] = tracemalloc.get_traced_memory()[0]
+    sys.setprofile(on_event)
+    try:
+        frames = renderer.render(timeline, overlays=[subtitle], progress_callback=on_frame)
+    finally:
+        sys.setprofile(None)
+    retained = (tracemalloc.get_traced_memory()[0] - start) / frame_bytes
+    tracemalloc.stop()
+    subtitle.close()
+    for clip in timeline:
+        clip.close()
+    # 第一帧包含打开解码器、加载图片等一次性分配，单独列出
+    steady = per_frame[1:] or per_frame
+    return {
+        'frames': frames,
+        'frame_bytes': frame_bytes,
+        'frame_allocations_total': sum(per_frame) + state['allocations'],
+        'frame_allocations_first_frame': per_frame[0] if per_frame else 0,
+        'frame_allocations_per_frame': round(statistics.mean(steady), 3),
+        'frame_allocations_max': max(steady),
+        # 渲染结束后仍未释放的内存（以帧大小为单位），包括缓冲池中留待复用的空闲缓冲
+        'retained_frames': round(retained, 3),
+        'frame_pool': FRAME_POOL.stats(),
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='渲染热循环逐帧内存分配基准')
+    parser.add_argument('--canvas', default='1280x720', help='画布尺寸，如 1280x720')
+    parser.add_argument('--seconds', type=float, default=4.0, help='每个片段的时长')
+    parser.add_argument('--fps', type=float, default=24)
+    parser.add_argument('--output', help='将结果写入该 JSON 文件')
+    args = parser.parse_args(argv)
+
+    size = tuple(int(value) for value in args.canvas.lower().split('x'))
+    output_file = os.path.abspath(args.output) if args.output else None
+    original_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix='frame_alloc_benchmark_')
+    # 日志等相对路径写入工作目录，不污染项目目录
+    os.chdir(work_dir)
+    try:
+        result = measure(work_dir, size, args.seconds, args.fps)
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    results = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'canvas': list(size),
+            'fps': args.fps,
+        },
+        'result': result,
+    }
+    print(json.dumps(results, indent=4, ensure_ascii=False))
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
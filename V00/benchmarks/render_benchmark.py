@@ -0,0 +1,230 @@
+"""渲染流水线基准
+
+离线生成确定性的测试素材（不同分辨率的图片、合成的 MP4、由本地桩 TTS 生成的配音），
+在多个规模下分别测量 ImageProcessor.process、VideoProcessor.process、
+SubtitleGenerator.generate 和 VideoComposer.compose 的耗时，结果保存为 JSON。
+指定 --baseline 时与基线比较，任一项中位数变慢超过 --threshold 即以非零状态退出。
+
+用法（在 V00 目录下运行）：
+    python benchmarks/render_benchmark.py --scales small medium --output benchmarks/render_results.json
+    python benchmarks/render_benchmark.py --baseline benchmarks/render_baseline.json --threshold 0.25
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import wave
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+# 各规模的素材数量和配音句数；图片分辨率依次循环使用
+SCALES: Dict[str, Dict] = {
+    'small': {'images': 4, 'videos': 1, 'video_seconds': 3.0, 'sentences': 4},
+    'medium': {'images': 12, 'videos': 3, 'video_seconds': 4.0, 'sentences': 12},
+    'large': {'images': 30, 'videos': 6, 'video_seconds': 5.0, 'sentences': 30},
+}
+IMAGE_SIZES = ((640, 360), (1920, 1080), (1080, 1920), (3840, 2160))
+VIDEO_SIZE = (640, 360)
+SAMPLE_RATE = 16000
+# 桩 TTS 每个字的朗读时长（秒）
+SECONDS_PER_CHAR = 0.2
+STAGES = ('image_process', 'video_process', 'subtitle_generate', 'compose')
+
+def _make_stub_provider():
+    from tts_factory import TTSProvider
+
+    class StubTTSProvider(TTSProvider):
+        """按字数生成固定时长正弦波的本地 TTS，不依赖网络"""
+        async def synthesize_segment(self, text: str, voice_name: str, speed: float, output_file: str) -> bool:
+            samples = int(len(text) * SECONDS_PER_CHAR / speed * SAMPLE_RATE)
+            tone = np.sin(2 * np.pi * 220 * np.arange(samples) / SAMPLE_RATE) * 8000
+            with wave.open(output_file, 'wb') as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(SAMPLE_RATE)
+                f.writeframes(tone.astype('<i2').tobytes())
+            return True
+
+    return StubTTSProvider(max_concurrency=4)
+
+def _pattern(width: int, height: int, seed: int) -> np.ndarray:
+    """固定随机种子生成的渐变加噪声图像，保证每次生成的素材字节一致"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)[np.newaxis, :]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, np.newaxis]
+    image = np.empty((height, width, 3), dtype=np.float32)
+    image[:, :, 0] = x
+    image[:, :, 1] = y
+    image[:, :, 2] = (x + y) / 2
+    image += rng.integers(0, 32, size=(height, width, 1))
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+def build_fixtures(root: str, scale: Dict) -> Dict:
+    """生成某个规模的素材，返回素材目录、文案和配音文件路径"""
+    from PIL import Image
+    from moviepy.editor import VideoClip
+    from render_engine import StreamingRenderer
+
+    image_dir = os.path.join(root, 'images')
+    video_dir = os.path.join(root, 'videos')
+    os.makedirs(image_dir, exist_ok=True)
+    os.makedirs(video_dir, exist_ok=True)
+
+    for index in range(scale['images']):
+        width, height = IMAGE_SIZES[index % len(IMAGE_SIZES)]
+        extension = 'jpg' if index % 2 else 'png'
+        Image.fromarray(_pattern(width, height, index)).save(os.path.join(image_dir, f'image_{index:03d}.{extension}'))
+
+    for index in range(scale['videos']):
+        base = _pattern(*VIDEO_SIZE, 1000 + index)
+        clip = VideoClip(lambda t, base=base: np.roll(base, int(t * 48), axis=1), duration=scale['video_seconds'])
+        StreamingRenderer(os.path.join(video_dir, f'video_{index:03d}.mp4'), VIDEO_SIZE, fps=24,
+                          ffmpeg_params=['-preset', 'ultrafast']).render([clip])
+
+    script = ''.join(f'这是第{index + 1}句用于渲染基准的固定文案。' for index in range(scale['sentences']))
+    audio_file = os.path.join(root, 'narration.wav')
+    if not asyncio.run(_make_stub_provider().generate_speech(script, 'stub', 1.0, audio_file)):
+        raise RuntimeError('桩 TTS 生成配音失败')
+    return {'image_dir': image_dir, 'video_dir': video_dir, 'script': script, 'audio_file': audio_file}
+
+def _timed(samples: List[float], func: Callable):
+    started = time.perf_counter()
+    result = func()
+    samples.append(time.perf_counter() - started)
+    return result
+
+def run_scale(root: str, fixtures: Dict, runs: int, canvas: tuple, profile: str, fit: str = 'letterbox',
+              ken_burns: bool = False, transition: Optional[str] = None, transition_duration: float = 0.5) -> Dict:
+    """在同一组素材上重复完整流程 runs 次，每次使用全新的处理器和探测缓存"""
+    from memory_manager import MemoryManager
+    from normalizer import Normalizer
+    from probe_cache import ProbeCache
+    from timeline_planner import audio_duration
+    from transitions import create_transitions
+    from video_strategy import ImageProcessor, SubtitleGenerator, VideoComposer, VideoProcessor
+
+    samples = {stage: [] for stage in STAGES}
+    frames = 0
+    for run in range(runs):
+        run_dir = os.path.join(root, f'run_{run}')
+        probe_cache = ProbeCache(os.path.join(run_dir, 'probe_cache.sqlite'))
+        images = _timed(samples['image_process'],
+                        lambda: ImageProcessor(canvas_size=canvas, ken_burns=ken_burns).process(fixtures['image_dir']))
+        video_processor = VideoProcessor(memory_manager=MemoryManager(os.path.join(run_dir, 'temp')),
+                                         probe_cache=probe_cache)
+        videos = _timed(samples['video_process'], lambda: video_processor.process(fixtures['video_dir']))
+        generator = SubtitleGenerator(canvas)
+        subtitle = _timed(samples['subtitle_generate'], lambda: generator.generate(
+            fixtures['script'], audio_duration(fixtures['audio_file']), fixtures['audio_file']))
+        # 不使用分段缓存，每次都完整编码
+        composer = VideoComposer(os.path.join(run_dir, 'output'), profile=profile, normalizer=Normalizer(canvas, fit),
+                                 transitions=create_transitions(transition, transition_duration))
+        output_file, success = _timed(samples['compose'], lambda: composer.compose(
+            images + videos, subtitle, fixtures['audio_file']))
+        if not success:
+            raise RuntimeError('视频合成失败')
+        with open(composer.stats_file, encoding='utf-8') as f:
+            frames = json.loads(f.readlines()[-1])['frames']
+        probe_cache.close()
+
+    results = {
+        stage: {
+            'median_seconds': round(statistics.median(values), 4),
+            'min_seconds': round(min(values), 4),
+            'runs': runs,
+        }
+        for stage, values in samples.items()
+    }
+    results['compose']['frames'] = frames
+    results['compose']['fps'] = round(frames / results['compose']['median_seconds'], 2)
+    return results
+
+def compare_results(current: Dict, baseline: Dict, threshold: float, min_delta: float = 0.05) -> List[str]:
+    """返回变慢超过阈值的条目；绝对差值小于 min_delta 秒的波动忽略"""
+    regressions = []
+    for scale, stages in current.get('scales', {}).items():
+        for stage, result in stages.items():
+            reference = baseline.get('scales', {}).get(scale, {}).get(stage)
+            if not reference:
+                continue
+            before, after = reference['median_seconds'], result['median_seconds']
+            if after > before * (1 + threshold) and after - before >= min_delta:
+                regressions.append(f'{scale}/{stage}: {before:.3f}s -> {after:.3f}s (+{(after / before - 1) * 100:.0f}%)')
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='渲染流水线性能基准')
+    parser.add_argument('--scales', nargs='+', choices=sorted(SCALES), default=['small', 'medium'])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--canvas', default='1280x720', help='画布尺寸，如 1280x720')
+    parser.add_argument('--profile', default='draft', help='导出配置：draft / balanced / archive')
+    parser.add_argument('--fit', default='letterbox', choices=('letterbox', 'crop'), help='画幅适配方式')
+    parser.add_argument('--ken-burns', action='store_true', help='图片片段使用平移/缩放运动效果')
+    parser.add_argument('--transition', default='none', help='片段间转场：crossfade / dip_to_black / wipe / none')
+    parser.add_argument('--transition-duration', type=float, default=0.5, help='转场时长（秒）')
+    parser.add_argument('--output', help='将结果写入该 JSON 文件')
+    parser.add_argument('--baseline', help='用于比较的基线结果 JSON')
+    parser.add_argument('--threshold', type=float, default=0.25, help='允许的相对变慢比例')
+    parser.add_argument('--min-delta', type=float, default=0.05, help='忽略小于该秒数的绝对差值')
+    parser.add_argument('--keep-fixtures', help='将素材和输出保存到该目录，而不是临时目录')
+    args = parser.parse_args(argv)
+
+    width, height = (int(value) for value in args.canvas.lower().split('x'))
+    # 切换工作目录前先把路径参数转为绝对路径
+    output_file = os.path.abspath(args.output) if args.output else None
+    baseline_file = os.path.abspath(args.baseline) if args.baseline else None
+    original_dir = os.getcwd()
+    work_dir = os.path.abspath(args.keep_fixtures or tempfile.mkdtemp(prefix='render_benchmark_'))
+    os.makedirs(work_dir, exist_ok=True)
+    # 日志等相对路径写入工作目录，不污染项目目录
+    os.chdir(work_dir)
+    results = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'canvas': [width, height],
+            'profile': args.profile,
+            'fit': args.fit,
+            'ken_burns': args.ken_burns,
+            'transition': args.transition,
+        },
+        'scales': {},
+    }
+    try:
+        for name in args.scales:
+            root = os.path.join(work_dir, name)
+            fixtures = build_fixtures(root, SCALES[name])
+            results['scales'][name] = run_scale(root, fixtures, args.runs, (width, height), args.profile, args.fit,
+                                                  args.ken_burns, args.transition, args.transition_duration)
+    finally:
+        os.chdir(original_dir)
+        if not args.keep_fixtures:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(json.dumps(results, indent=4, ensure_ascii=False))
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+
+    if baseline_file:
+        with open(baseline_file, encoding='utf-8') as f:
+            regressions = compare_results(results, json.load(f), args.threshold, args.min_delta)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
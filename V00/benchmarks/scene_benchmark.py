@@ -0,0 +1,117 @@
+"""镜头检测基准
+
+离线生成若干段包含多个镜头的视频，分别测量：
+- 首次检测（ffmpeg 低帧率抽取缩略图 + NumPy 向量化打分，按文件并发）
+- 再次运行（检测结果命中缓存）
+- 可选的对照：moviepy 以原始分辨率和帧率逐帧读取并逐帧计算直方图
+
+用法（在 V00 目录下运行）：
+    python benchmarks/scene_benchmark.py --compare-moviepy --output benchmarks/scene_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+def make_videos(root: str, count: int, size: tuple, seconds: float, fps: float) -> str:
+    """每段视频每 2.5 秒切换一次色调，画面持续平移"""
+    from moviepy.editor import VideoClip
+    from render_engine import StreamingRenderer
+
+    video_dir = os.path.join(root, 'videos')
+    os.makedirs(video_dir, exist_ok=True)
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 128, size=(size[1], size[0], 3), dtype=np.uint8)
+    tints = [rng.integers(0, 128, size=3, dtype=np.uint8) for _ in range(8)]
+    for index in range(count):
+        clip = VideoClip(lambda t, index=index: np.roll(base, int(t * 60), axis=1) + tints[(index + int(t / 2.5)) % 8],
+                         duration=seconds)
+        StreamingRenderer(os.path.join(video_dir, f'video_{index}.mp4'), size, fps=fps,
+                          ffmpeg_params=['-preset', 'ultrafast']).render([clip])
+    return video_dir
+
+def detect(video_dir: str, cache_path: str, workers: Optional[int]) -> Dict:
+    from probe_cache import ProbeCache
+    from scene_detect import SceneCache, SceneDetector
+    from video_strategy import VideoProcessor
+
+    cache = SceneCache(cache_path)
+    processor = VideoProcessor(max_workers=workers, probe_cache=ProbeCache(cache_path + '.probe'),
+                               scene_detector=SceneDetector(cache=cache))
+    start = time.perf_counter()
+    clips = processor.process(video_dir)
+    seconds = time.perf_counter() - start
+    cache.close()
+    return {'seconds': round(seconds, 4), 'segments': len(clips), 'cache_hits': cache.hits}
+
+def moviepy_full_rate(video_dir: str) -> float:
+    from moviepy.editor import VideoFileClip
+
+    start = time.perf_counter()
+    for file in sorted(os.listdir(video_dir)):
+        clip = VideoFileClip(os.path.join(video_dir, file), audio=False)
+        for frame in clip.iter_frames():
+            np.histogramdd(frame.reshape(-1, 3), bins=4, range=[(0, 256)] * 3)
+        clip.close()
+    return round(time.perf_counter() - start, 4)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='镜头检测基准')
+    parser.add_argument('--canvas', default='1280x720', help='素材尺寸，如 1280x720')
+    parser.add_argument('--videos', type=int, default=4, help='素材文件数')
+    parser.add_argument('--seconds', type=float, default=10.0, help='每个素材的时长')
+    parser.add_argument('--fps', type=float, default=24)
+    parser.add_argument('--workers', type=int, help='并发检测的线程数，默认与素材加载相同')
+    parser.add_argument('--compare-moviepy', action='store_true', help='同时测量 moviepy 逐帧读取的耗时')
+    parser.add_argument('--output', help='将结果写入该 JSON 文件')
+    args = parser.parse_args(argv)
+
+    size = tuple(int(value) for value in args.canvas.lower().split('x'))
+    output_file = os.path.abspath(args.output) if args.output else None
+    original_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix='scene_benchmark_')
+    # 日志等相对路径写入工作目录，不污染项目目录
+    os.chdir(work_dir)
+    try:
+        video_dir = make_videos(work_dir, args.videos, size, args.seconds, args.fps)
+        cache_path = os.path.join(work_dir, 'scene_cache.sqlite')
+        result = {
+            'first_run': detect(video_dir, cache_path, args.workers),
+            'cached_run': detect(video_dir, cache_path, args.workers),
+        }
+        if args.compare_moviepy:
+            result['moviepy_full_rate_seconds'] = moviepy_full_rate(video_dir)
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    results = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'cpu_count': os.cpu_count(),
+            'canvas': list(size),
+            'videos': args.videos,
+            'seconds': args.seconds,
+            'fps': args.fps,
+        },
+        'result': result,
+    }
+    print(json.dumps(results, indent=4, ensure_ascii=False))
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
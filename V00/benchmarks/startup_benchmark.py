@@ -0,0 +1,102 @@
+"""启动耗时基准
+
+测量从启动解释器到主窗口第一次完成事件循环的耗时（冷启动到首个窗口），
+并用 python -X importtime 统计 main 的导入耗时分解。
+
+用法（在 V00 目录下运行）：
+    python benchmarks/startup_benchmark.py --runs 5 --importtime benchmarks/startup_importtime.txt
+无显示环境时自动使用 Qt 的 offscreen 平台。
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程：创建窗口并在第一次事件循环迭代时输出时间戳
+FIRST_WINDOW_SNIPPET = '''
+import sys, time
+{preload}
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+import main
+window = main.AutoEditApp()
+window.show()
+def first_frame():
+    print('FIRST_WINDOW', time.time(), flush=True)
+    window.scheduler.stop(wait=False)
+    app.quit()
+QTimer.singleShot(0, first_frame)
+app.exec_()
+'''
+
+_IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+def _child_env() -> dict:
+    env = dict(os.environ)
+    if not env.get('DISPLAY') and not env.get('WAYLAND_DISPLAY'):
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    return env
+
+def measure_first_window(eager: bool = False) -> float:
+    """返回冷启动到首个窗口的秒数；eager=True 时在窗口前导入完整的渲染与 TTS 流水线（改为延迟导入前的行为）"""
+    snippet = FIRST_WINDOW_SNIPPET.format(preload='import pipeline, gradio_client' if eager else '')
+    started = time.time()
+    output = subprocess.run(
+        [sys.executable, '-c', snippet], cwd=PROJECT_DIR, env=_child_env(),
+        capture_output=True, text=True, check=True
+    ).stdout
+    for line in output.splitlines():
+        if line.startswith('FIRST_WINDOW'):
+            return float(line.split()[1]) - started
+    raise RuntimeError('子进程没有输出窗口时间')
+
+def importtime_breakdown(module: str = 'main', top: int = 25) -> list:
+    """返回 (累计微秒, 自身微秒, 模块名) 列表，按累计耗时降序"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_DIR, env=_child_env(), capture_output=True, text=True, check=True
+    ).stderr
+    entries = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        # 模块名前每两个空格表示一层嵌套，只保留 main 本身及其直接导入的模块
+        if match and (len(match.group(3)) - 1) // 2 <= 1:
+            entries.append((int(match.group(2)), int(match.group(1)), match.group(4)))
+    entries.sort(reverse=True)
+    return entries[:top]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='测量图形界面冷启动耗时')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--importtime', help='将 -X importtime 分解写入该文件')
+    args = parser.parse_args()
+
+    results = {}
+    for mode, eager in (('lazy', False), ('eager', True)):
+        samples = [measure_first_window(eager) for _ in range(args.runs)]
+        results[mode] = {
+            'median_seconds': round(statistics.median(samples), 3),
+            'min_seconds': round(min(samples), 3),
+            'runs': args.runs,
+        }
+    results['speedup'] = round(results['eager']['median_seconds'] / results['lazy']['median_seconds'], 2)
+    print(json.dumps(results, indent=4))
+
+    if args.importtime:
+        lines = [f'# python -X importtime -c "import main"（Python {sys.version.split()[0]}）',
+                 '# cumulative_us  self_us  module']
+        lines += [f'{cumulative:>14}  {self_us:>7}  {name}'
+                  for cumulative, self_us, name in importtime_breakdown()]
+        with open(args.importtime, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""转场开销基准
+
+用常驻内存的合成片段（不解码、不编码）按渲染引擎的方式逐帧取帧，
+分别改变片段时长（时间线长度）和转场时长，测量转场带来的额外耗时。
+只有重叠帧需要混合，额外耗时应只随转场时长和数量增长，与时间线长度无关。
+指定 --compare-moviepy 时同时测量 moviepy CompositeVideoClip 交叉淡化（每帧都合成）的耗时作为对照。
+
+用法（在 V00 目录下运行）：
+    python benchmarks/transition_benchmark.py --output benchmarks/transition_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+def make_clips(count: int, seconds: float, size: Sequence[int]) -> List:
+    from moviepy.editor import VideoClip
+
+    rng = np.random.default_rng(0)
+    clips = []
+    for _ in range(count):
+        frame = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+        clips.append(VideoClip(lambda t, frame=frame: frame, duration=seconds))
+    return clips
+
+def pull_frames(timeline: Sequence, fps: float) -> Dict:
+    """与 StreamingRenderer 相同的顺序逐帧取帧，分别统计转场片段和其他片段的耗时"""
+    from render_engine import timeline_counts
+    from transitions import TransitionClip
+
+    result = {'frames': 0, 'blended_frames': 0, 'seconds': 0.0, 'transition_seconds': 0.0}
+    started = time.perf_counter()
+    for clip, count in zip(timeline, timeline_counts(timeline, fps)):
+        clip_started = time.perf_counter()
+        for index in range(count):
+            clip.get_frame(index / fps)
+        if isinstance(clip, TransitionClip):
+            result['transition_seconds'] += time.perf_counter() - clip_started
+            result['blended_frames'] += count
+        result['frames'] += count
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+def run_case(kind: str, clips: int, clip_seconds: float, transition: float, size: Sequence[int], fps: float,
+             runs: int, compare_moviepy: bool = False) -> Dict:
+    from transitions import Transitions
+
+    samples = []
+    for _ in range(runs):
+        sources = make_clips(clips, clip_seconds, size)
+        timeline = Transitions(kind, transition).apply(sources, tuple(size), fps) if transition else sources
+        samples.append(pull_frames(timeline, fps))
+    best = min(samples, key=lambda sample: sample['seconds'])
+    case = {
+        'clip_seconds': clip_seconds,
+        'transition_seconds': transition,
+        'timeline_frames': best['frames'],
+        'blended_frames': best['blended_frames'],
+        'seconds': round(best['seconds'], 4),
+        'blend_seconds': round(best['transition_seconds'], 4),
+    }
+    if compare_moviepy and transition:
+        case['moviepy_seconds'] = round(moviepy_crossfade(clips, clip_seconds, transition, size, fps), 4)
+    return case
+
+def moviepy_crossfade(clips: int, clip_seconds: float, transition: float, size: Sequence[int], fps: float) -> float:
+    """moviepy 的交叉淡化写法：concatenate(method='compose') 对时间线的每一帧都做合成"""
+    from moviepy.editor import concatenate_videoclips
+    from render_engine import frame_count
+
+    sources = make_clips(clips, clip_seconds, size)
+    timeline = concatenate_videoclips([sources[0]] + [clip.crossfadein(transition) for clip in sources[1:]],
+                                      method='compose', padding=-transition)
+    started = time.perf_counter()
+    for index in range(frame_count(timeline.duration, fps)):
+        timeline.get_frame(index / fps)
+    return time.perf_counter() - started
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from transitions import TRANSITIONS
+
+    parser = argparse.ArgumentParser(description='转场开销基准')
+    parser.add_argument('--kind', default='crossfade', choices=TRANSITIONS)
+    parser.add_argument('--clips', type=int, default=4, help='时间线中的片段数')
+    parser.add_argument('--clip-seconds', type=float, nargs='+', default=[2.0, 8.0, 32.0], help='每个片段的时长')
+    parser.add_argument('--transition-seconds', type=float, nargs='+', default=[0.0, 0.5, 1.0],
+                        help='转场时长，0 表示硬切')
+    parser.add_argument('--canvas', default='1280x720', help='画布尺寸，如 1280x720')
+    parser.add_argument('--fps', type=float, default=24)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--compare-moviepy', action='store_true', help='同时测量 moviepy 逐帧合成的耗时')
+    parser.add_argument('--output', help='将结果写入该 JSON 文件')
+    args = parser.parse_args(argv)
+
+    size = [int(value) for value in args.canvas.lower().split('x')]
+    results = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'canvas': size,
+            'fps': args.fps,
+            'kind': args.kind,
+            'clips': args.clips,
+        },
+        'cases': [
+            run_case(args.kind, args.clips, clip_seconds, transition, size, args.fps, args.runs, args.compare_moviepy)
+            for clip_seconds in args.clip_seconds
+            for transition in args.transition_seconds
+        ],
+    }
+    print(json.dumps(results, indent=4, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable
+
+class CacheLeases:
+    """缓存条目的使用登记
+
+    同一进程中并发的任务（命令行 -j、渲染队列）各自创建缓存对象，但共用同一个缓存目录。
+    任务取得或写入条目时登记，用完（例如分段拼接完成）后释放；淘汰时跳过所有仍在使用的条目，
+    而不只是调用方自己的。按次数计数，同一任务可以多次登记同一条目。
+    淘汰在 hold() 内检查并删除，与登记互斥，登记后再检查文件是否存在即可避免刚登记的条目被删除。
+    """
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = threading.RLock()
+
+    def acquire(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def release(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._counts[key] -= 1
+                if self._counts[key] <= 0:
+                    del self._counts[key]
+
+    def in_use(self, key: str) -> bool:
+        with self._lock:
+            return self._counts.get(key, 0) > 0
+
+    def hold(self) -> threading.RLock:
+        """淘汰期间持有，阻止新的登记"""
+        return self._lock
+
+_leases: Dict[str, CacheLeases] = {}
+_leases_lock = threading.Lock()
+
+def leases_for(cache_dir: str) -> CacheLeases:
+    """同一缓存目录在进程内共用一份使用登记"""
+    key = os.path.normcase(os.path.abspath(cache_dir))
+    with _leases_lock:
+        leases = _leases.get(key)
+        if leases is None:
+            leases = _leases[key] = CacheLeases()
+        return leases
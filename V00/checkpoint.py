@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from logger import video_logger
+
+class RenderCheckpoint:
+    """渲染任务的检查点清单
+
+    清单（checkpoint.json）记录已完成阶段的产物，每次更新都先写临时文件再原子替换，
+    进程在任何时刻被杀死都不会留下损坏的清单。输入指纹（文案、配音与画布参数）变化时旧检查点作废。
+    已编码的时间线分段由分段缓存保存，清单中只记录合成进度。
+    """
+    def __init__(self, directory: str, fingerprint: Dict):
+        self.directory = directory
+        self.manifest_file = os.path.join(directory, 'checkpoint.json')
+        self.fingerprint = hashlib.sha256(
+            json.dumps(fingerprint, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+        ).hexdigest()
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict] = {}
+        manifest = self._read()
+        if manifest and manifest.get('fingerprint') == self.fingerprint:
+            self.stages = manifest.get('stages', {})
+            if self.stages:
+                video_logger.info('Loaded render checkpoint with completed stages: %s', ', '.join(self.stages))
+        elif manifest:
+            video_logger.info('Render inputs changed, discarding checkpoint: %s', self.manifest_file)
+
+    def _read(self) -> Optional[Dict]:
+        try:
+            with open(self.manifest_file, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            video_logger.warning('Ignoring unreadable checkpoint %s: %s', self.manifest_file, str(e))
+            return None
+
+    def _write(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        temp_file = f'{self.manifest_file}.{os.getpid()}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'updated': time.time(), 'stages': self.stages},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.manifest_file)
+
+    @staticmethod
+    def file_entry(path: str) -> Dict:
+        stat = os.stat(path)
+        return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    @staticmethod
+    def file_unchanged(entry: Dict) -> bool:
+        try:
+            stat = os.stat(entry['path'])
+        except (OSError, KeyError):
+            return False
+        return stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']
+
+    def completed(self, stage: str, files: List[str] = ()) -> Optional[Dict]:
+        """返回已完成阶段记录的数据；阶段未完成或 files 中记录的产物缺失、被修改时返回 None"""
+        with self._lock:
+            data = self.stages.get(stage)
+        if data is None or not data.get('done'):
+            return None
+        for name in files:
+            if not self.file_unchanged(data.get(name, {})):
+                video_logger.info('Checkpoint output of stage %s changed, recomputing', stage)
+                return None
+        return data
+
+    def complete(self, stage: str, **data) -> None:
+        with self._lock:
+            self.stages[stage] = dict(data, done=True)
+            self._write()
+
+    def update(self, stage: str, **data) -> None:
+        """记录进行中阶段的进度，不标记为完成"""
+        with self._lock:
+            self.stages[stage] = dict(self.stages.get(stage, {}), **data)
+            self._write()
+
+    def invalidate(self, *stages: str) -> None:
+        with self._lock:
+            removed = [stage for stage in stages if self.stages.pop(stage, None) is not None]
+            if removed:
+                self._write()
@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+def load_manifest(manifest_path: str) -> List[Dict]:
+    """读取任务清单（JSON 或 YAML），支持任务列表或 {"jobs": [...]} 两种写法
+
+    清单中的相对路径以清单文件所在目录为基准。
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        if manifest_path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError('读取 YAML 清单需要安装 PyYAML')
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+    jobs = manifest.get('jobs', []) if isinstance(manifest, dict) else manifest
+    if not isinstance(jobs, list):
+        raise ValueError('任务清单格式错误：jobs 必须是列表')
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    resolved = []
+    for index, job in enumerate(jobs):
+        job = dict(job)
+        job.setdefault('name', f'job{index + 1}')
+        for key in ('image_path', 'video_path', 'output_path', 'script_file'):
+            if job.get(key):
+                job[key] = os.path.join(base_dir, job[key])
+        if job.get('script_file'):
+            with open(job['script_file'], 'r', encoding='utf-8') as f:
+                job['script'] = f.read().strip()
+        missing = [key for key in ('script', 'image_path', 'video_path') if not job.get(key)]
+        if missing:
+            raise ValueError(f'任务 {job["name"]} 缺少字段: {", ".join(missing)}')
+        resolved.append(job)
+    return resolved
+
+def run_job(job: Dict, base_config: Dict, probe_cache, default_output: str) -> Dict:
+    from pipeline import VideoPipeline
+
+    name = job['name']
+    config = dict(base_config, **job.get('config', {}))
+    output_path = job.get('output_path') or os.path.join(default_output, name)
+    last_progress = [-1]
+
+    def on_progress(value: int):
+        # 每 10% 输出一次进度
+        if value // 10 != last_progress[0] // 10:
+            print(f'[{name}] {value}%', flush=True)
+        last_progress[0] = value
+
+    def on_status(status: str):
+        print(f'[{name}] {status}', flush=True)
+
+    started = time.perf_counter()
+    try:
+        pipeline = VideoPipeline(
+            job['script'], job['image_path'], job['video_path'], config, output_path,
+            progress_callback=on_progress, status_callback=on_status,
+            probe_cache=probe_cache, temp_dir=os.path.join(output_path, 'temp')
+        )
+        output_file = pipeline.run()
+        return {'name': name, 'success': True, 'output': output_file,
+                'seconds': round(time.perf_counter() - started, 2)}
+    except Exception as e:
+        return {'name': name, 'success': False, 'error': str(e),
+                'seconds': round(time.perf_counter() - started, 2)}
+
+def render_command(args) -> int:
+    jobs = load_manifest(args.manifest)
+    # 流水线模块在解析参数之后才导入，保证 --help 等命令快速返回
+    from pipeline import create_probe_cache, load_config
+
+    base_config = load_config(args.config)
+    if args.profile:
+        base_config['export_profile'] = args.profile
+    probe_cache = create_probe_cache(base_config)
+    default_output = args.output or base_config.get('output_path', 'output')
+
+    with ThreadPoolExecutor(max_workers=max(args.jobs, 1)) as executor:
+        results = list(executor.map(lambda job: run_job(job, base_config, probe_cache, default_output), jobs))
+    probe_cache.close()
+
+    for result in results:
+        if result['success']:
+            print(f'[{result["name"]}] 完成 ({result["seconds"]}s): {result["output"]}')
+        else:
+            print(f'[{result["name"]}] 失败 ({result["seconds"]}s): {result["error"]}', file=sys.stderr)
+    return 0 if all(result['success'] for result in results) else 1
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='video-editor', description='智能视频剪辑助手')
+    subparsers = parser.add_subparsers(dest='command')
+
+    render = subparsers.add_parser('render', help='按任务清单无界面批量生成视频')
+    render.add_argument('manifest', help='任务清单文件（JSON 或 YAML）')
+    render.add_argument('--config', default='config.json', help='配置文件路径')
+    render.add_argument('-j', '--jobs', type=int, default=1, help='同时运行的任务数')
+    render.add_argument('--profile', help='导出配置（draft/balanced/archive），覆盖配置文件')
+    render.add_argument('--output', help='未指定 output_path 的任务的输出根目录')
+    render.set_defaults(func=render_command)
+
+    subparsers.add_parser('gui', help='启动图形界面（默认）')
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if getattr(args, 'func', None) is None:
+        # 只有启动图形界面时才导入 PyQt5
+        from main import main as gui_main
+        return gui_main()
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
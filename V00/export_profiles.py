@@ -0,0 +1,98 @@
+import json
+import os
+import time
+from typing import Dict, List, Optional
+from logger import video_logger
+
+# 导出配置：preset/crf 决定速度与质量，threads=0 表示由 x264 按 CPU 核数自动选择
+EXPORT_PROFILES: Dict[str, Dict] = {
+    'draft': {
+        'preset': 'ultrafast',
+        'crf': 30,
+        'threads': 0,
+        'tune': 'fastdecode',
+        'audio_bitrate': '96k',
+    },
+    'balanced': {
+        'preset': 'medium',
+        'crf': 23,
+        'threads': 0,
+        'tune': None,
+        'audio_bitrate': '128k',
+    },
+    'archive': {
+        'preset': 'slow',
+        'crf': 18,
+        'threads': 0,
+        'tune': 'film',
+        'audio_bitrate': '192k',
+    },
+}
+
+DEFAULT_PROFILE = 'balanced'
+
+def get_profile(name: Optional[str]) -> Dict:
+    """按名称获取导出配置，未知名称回退到默认配置"""
+    if name not in EXPORT_PROFILES:
+        if name:
+            video_logger.warning('Unknown export profile %s, using %s', name, DEFAULT_PROFILE)
+        name = DEFAULT_PROFILE
+    return dict(EXPORT_PROFILES[name], name=name)
+
+def ffmpeg_params(profile: Dict) -> List[str]:
+    """将导出配置转换为 ffmpeg 输出参数"""
+    params = [
+        '-preset', profile['preset'],
+        '-crf', str(profile['crf']),
+        '-threads', str(profile['threads']),
+        '-b:a', profile['audio_bitrate'],
+    ]
+    if profile.get('tune'):
+        params += ['-tune', profile['tune']]
+    return params
+
+def record_encode_stats(stats_file: str, profile: Dict, output_file: str,
+                        frames: int, seconds: float, size, encoded_frames: Optional[int] = None) -> Dict:
+    """追加一条编码统计（帧率、文件大小）到 JSON Lines 文件
+
+    frames 为成片的总帧数，encoded_frames 为本次实际编码的帧数（增量渲染时不含复用的分段，默认等于 frames），
+    帧率按实际编码的帧数计算，每帧字节数按成片计算。
+    """
+    encoded_frames = frames if encoded_frames is None else encoded_frames
+    file_size = os.path.getsize(output_file) if os.path.exists(output_file) else 0
+    entry = {
+        'profile': profile['name'],
+        'timestamp': time.time(),
+        'resolution': list(size),
+        'frames': frames,
+        'encoded_frames': encoded_frames,
+        'seconds': round(seconds, 3),
+        'fps': round(encoded_frames / seconds, 2) if seconds > 0 else 0.0,
+        'size_bytes': file_size,
+        'bytes_per_frame': file_size // frames if frames else 0,
+    }
+    os.makedirs(os.path.dirname(stats_file) or '.', exist_ok=True)
+    with open(stats_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
+    video_logger.info('Encoded %d of %d frames with profile %s at %.1f fps, %d bytes',
+                      encoded_frames, frames, profile['name'], entry['fps'], file_size)
+    return entry
+
+def summarize_encode_stats(stats_file: str) -> Dict[str, Dict]:
+    """按导出配置汇总历史编码统计的平均帧率和每帧字节数"""
+    summary: Dict[str, Dict] = {}
+    if not os.path.exists(stats_file):
+        return summary
+    with open(stats_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            item = summary.setdefault(entry['profile'], {'runs': 0, 'fps': 0.0, 'bytes_per_frame': 0.0})
+            item['runs'] += 1
+            item['fps'] += entry['fps']
+            item['bytes_per_frame'] += entry['bytes_per_frame']
+    for item in summary.values():
+        item['fps'] = round(item['fps'] / item['runs'], 2)
+        item['bytes_per_frame'] = round(item['bytes_per_frame'] / item['runs'])
+    return summary
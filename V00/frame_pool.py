@@ -0,0 +1,49 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+import numpy as np
+
+class FramePool:
+    """按形状和类型复用的帧缓冲池
+
+    解码器、画布和转场的缓冲在使用结束后归还，下一个片段直接取用，渲染热循环中不再逐帧分配。
+    取出的缓冲内容未清零，使用方需要完整覆盖。空闲缓冲超过 max_free 个时丢弃最久未用的。
+    """
+    def __init__(self, max_free: int = 8):
+        self.max_free = max_free
+        self.allocations = 0
+        self.reuses = 0
+        self._free: 'OrderedDict[Tuple, List[np.ndarray]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            buffers = self._free.get(key)
+            if buffers:
+                self.reuses += 1
+                buffer = buffers.pop()
+                if not buffers:
+                    del self._free[key]
+                return buffer
+            self.allocations += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer: np.ndarray) -> None:
+        key = (buffer.shape, buffer.dtype.str)
+        with self._lock:
+            self._free.setdefault(key, []).append(buffer)
+            self._free.move_to_end(key)
+            while sum(len(buffers) for buffers in self._free.values()) > self.max_free:
+                oldest = next(iter(self._free))
+                self._free[oldest].pop(0)
+                if not self._free[oldest]:
+                    del self._free[oldest]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'allocations': self.allocations, 'reuses': self.reuses,
+                    'free': sum(len(buffers) for buffers in self._free.values())}
+
+# 进程内共享的缓冲池，渲染队列中的多个任务共用
+FRAME_POOL = FramePool()
@@ -0,0 +1,229 @@
+import threading
+from typing import Dict, Optional, Tuple
+import numpy as np
+from PIL import Image, ImageOps
+from moviepy.editor import VideoClip
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+from frame_pool import FRAME_POOL
+
+# EXIF 方向标记中需要交换宽高的取值
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+_EXIF_ORIENTATION = 0x0112
+
+def fit_size(size: Tuple[int, int], bounds: Tuple[int, int]) -> Tuple[int, int]:
+    """等比缩放到不超过 bounds 的尺寸，不放大"""
+    width, height = size
+    scale = min(bounds[0] / width, bounds[1] / height, 1.0)
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+def probe_image_size(file_path: str) -> Tuple[int, int]:
+    """只读取图片文件头，返回应用 EXIF 方向后的尺寸"""
+    with Image.open(file_path) as img:
+        width, height = img.size
+        if img.getexif().get(_EXIF_ORIENTATION, 1) in _TRANSPOSED_ORIENTATIONS:
+            return height, width
+        return width, height
+
+def load_scaled_image(file_path: str, target_size: Tuple[int, int]) -> np.ndarray:
+    """直接以目标尺寸解码图片
+
+    JPEG 使用 draft 模式在 DCT 阶段缩小，其余格式先用 reduce 做整数倍缩小，
+    最后再精确缩放到目标尺寸，并按 EXIF 方向旋转。
+    """
+    with Image.open(file_path) as img:
+        orientation = img.getexif().get(_EXIF_ORIENTATION, 1)
+        if img.format == 'JPEG':
+            draft_size = target_size[::-1] if orientation in _TRANSPOSED_ORIENTATIONS else target_size
+            img.draft('RGB', draft_size)
+        img = ImageOps.exif_transpose(img)
+        if img.size != tuple(target_size):
+            factor = min(img.width // target_size[0], img.height // target_size[1])
+            if factor >= 2:
+                img = img.reduce(factor)
+            img = img.resize(target_size, Image.LANCZOS)
+        return np.asarray(img.convert('RGB'))
+
+def center_crop(frame: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """居中裁切到 size（宽, 高），返回视图"""
+    width, height = size
+    x = max((frame.shape[1] - width) // 2, 0)
+    y = max((frame.shape[0] - height) // 2, 0)
+    return frame[y:y + height, x:x + width]
+
+class PooledVideoReader(FFMPEG_VideoReader):
+    """从缓冲池取两块帧缓冲、用 readinto 直接读入的 ffmpeg 解码器
+
+    moviepy 每读一帧都会创建新的 bytes 对象。这里交替使用两块缓冲：新帧读入后备缓冲，读满后才与当前帧交换，
+    读取不完整时仍能返回上一帧。返回的帧在下一次取帧前有效，使用方需要在此之前用完或复制。
+    """
+    def _buffers(self):
+        if getattr(self, '_pool_buffers', None) is None:
+            w, h = self.size
+            self._pool_buffers = [FRAME_POOL.acquire((h, w, self.depth)) for _ in range(2)]
+            self._pool_views = [memoryview(buffer).cast('B') for buffer in self._pool_buffers]
+        return self._pool_buffers
+
+    def _read_into(self, index: int) -> int:
+        self._buffers()
+        view = self._pool_views[index]
+        read = 0
+        while read < len(view):
+            count = self.proc.stdout.readinto(view[read:])
+            if not count:
+                break
+            read += count
+        return read
+
+    def skip_frames(self, n=1):
+        # 跳过的帧读入后备缓冲，不分配内存
+        back = 1 if getattr(self, 'lastread', None) is self._buffers()[0] else 0
+        for _ in range(n):
+            self._read_into(back)
+        self.pos += n
+
+    def read_frame(self):
+        buffers = self._buffers()
+        back = 1 if getattr(self, 'lastread', None) is buffers[0] else 0
+        if self._read_into(back) != buffers[back].nbytes:
+            if getattr(self, 'lastread', None) is None:
+                raise IOError(f'MoviePy error: failed to read the first frame of video file {self.filename}')
+            return self.lastread
+        self.lastread = buffers[back]
+        return self.lastread
+
+    def close(self):
+        FFMPEG_VideoReader.close(self)
+        self.lastread = None
+        buffers = getattr(self, '_pool_buffers', None)
+        if buffers is not None:
+            for view in self._pool_views:
+                view.release()
+            self._pool_buffers = self._pool_views = None
+            for buffer in buffers:
+                FRAME_POOL.release(buffer)
+
+class LazyVideoReader:
+    """首次取帧时才创建 ffmpeg 解码进程，close 后可再次按需打开
+
+    设置 target_size 时由 ffmpeg 解码进程直接输出该尺寸的帧，设置 output_size 时再居中裁切（返回视图，不复制）。
+    """
+    def __init__(self, filename: str, target_size: Optional[Tuple[int, int]] = None,
+                 output_size: Optional[Tuple[int, int]] = None):
+        self.filename = filename
+        self.target_size = target_size
+        self.output_size = output_size
+        self._reader: Optional[FFMPEG_VideoReader] = None
+        self._lock = threading.Lock()
+
+    def set_target_size(self, target_size: Optional[Tuple[int, int]],
+                        output_size: Optional[Tuple[int, int]] = None) -> None:
+        with self._lock:
+            if target_size != self.target_size and self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            self.target_size = target_size
+            self.output_size = output_size
+
+    def get_frame(self, t: float):
+        with self._lock:
+            if self._reader is None:
+                # moviepy 的 target_resolution 为 (高, 宽)
+                target_resolution = self.target_size[::-1] if self.target_size else None
+                # 双线性缩放的质量足以用于画幅适配，开销约为默认双三次的一半
+                self._reader = PooledVideoReader(self.filename, target_resolution=target_resolution,
+                                                 resize_algo='bilinear')
+            frame = self._reader.get_frame(t)
+        if self.output_size:
+            frame = center_crop(frame, self.output_size)
+        return frame
+
+    def close(self) -> None:
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+class LazyVideoFileClip(VideoClip):
+    """使用已知探测信息构建的视频片段
+
+    与 VideoFileClip 不同，构建时不启动任何 ffmpeg 进程，
+    时长、尺寸和帧率直接来自探测缓存。
+    """
+    def __init__(self, filename: str, metadata: Dict):
+        VideoClip.__init__(self)
+        self.filename = filename
+        self.metadata = metadata
+        self.source_size = (metadata['width'], metadata['height'])
+        self.size = self.source_size
+        self.fps = metadata['fps']
+        self.duration = self.end = metadata['duration']
+        self.reader = LazyVideoReader(filename)
+        self.make_frame = lambda t: self.reader.get_frame(t)
+
+    def set_target_size(self, size: Tuple[int, int], output_size: Optional[Tuple[int, int]] = None) -> None:
+        """以 size 解码，指定 output_size 时再居中裁切；解码器由 subclip 等派生片段共享，需对所有派生片段调用"""
+        size = tuple(size)
+        self.size = tuple(output_size or size)
+        self.reader.set_target_size(None if size == self.source_size else size,
+                                    tuple(output_size) if output_size and tuple(output_size) != size else None)
+
+    def close(self):
+        if self.reader:
+            self.reader.close()
+
+class LazyImageReader:
+    """图片像素在首次取帧时才解码，close 后释放像素缓冲
+
+    设置 output_size 时，按 target_size 解码后居中裁切到 output_size（铺满画布模式）。
+    """
+    def __init__(self, filename: str, target_size: Tuple[int, int],
+                 output_size: Optional[Tuple[int, int]] = None):
+        self.filename = filename
+        self.target_size = target_size
+        self.output_size = output_size
+        self._frame: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def set_target_size(self, target_size: Tuple[int, int], output_size: Optional[Tuple[int, int]] = None) -> None:
+        with self._lock:
+            if (target_size, output_size) != (self.target_size, self.output_size):
+                self._frame = None
+            self.target_size = target_size
+            self.output_size = output_size
+
+    def get_frame(self, t: float) -> np.ndarray:
+        with self._lock:
+            if self._frame is None:
+                frame = load_scaled_image(self.filename, self.target_size)
+                if self.output_size and self.output_size != tuple(self.target_size):
+                    frame = np.ascontiguousarray(center_crop(frame, self.output_size))
+                self._frame = frame
+            return self._frame
+
+    def close(self) -> None:
+        with self._lock:
+            self._frame = None
+
+class LazyImageClip(VideoClip):
+    """按画布尺寸延迟解码的静态图片片段
+
+    构建时只读取文件头得到尺寸，像素缓冲在片段成为当前渲染片段时才加载，
+    渲染结束后随解码器一起释放，因此内存占用与图片数量无关。
+    """
+    def __init__(self, filename: str, duration: float, canvas_size: Tuple[int, int]):
+        VideoClip.__init__(self)
+        self.filename = filename
+        self.source_size = probe_image_size(filename)
+        self.size = fit_size(self.source_size, canvas_size)
+        self.duration = self.end = duration
+        self.reader = LazyImageReader(filename, self.size)
+        self.make_frame = lambda t: self.reader.get_frame(t)
+
+    def set_target_size(self, size: Tuple[int, int], output_size: Optional[Tuple[int, int]] = None) -> None:
+        """以 size 解码，指定 output_size 时再居中裁切；解码器由 set_duration 等派生片段共享"""
+        self.size = tuple(output_size or size)
+        self.reader.set_target_size(tuple(size), tuple(output_size) if output_size else None)
+
+    def close(self):
+        if self.reader:
+            self.reader.close()
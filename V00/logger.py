@@ -2,6 +2,15 @@ import logging
 import os
 from logging.handlers import RotatingFileHandler
 
+class LazyRotatingFileHandler(RotatingFileHandler):
+    """第一次写日志时才创建日志目录并打开文件"""
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+    
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
 def setup_logger(name, log_file='app.log', level=logging.INFO):
     """设置日志系统
     
@@ -13,9 +22,8 @@ def setup_logger(name, log_file='app.log', level=logging.INFO):
     Returns:
         logger: 配置好的日志记录器
     """
-    # 创建日志目录
+    # 日志目录和文件在第一次写入时才创建，导入本模块不产生文件操作
     log_dir = 'logs'
-    os.makedirs(log_dir, exist_ok=True)
     log_path = os.path.join(log_dir, log_file)
     
     # 创建日志记录器
@@ -23,7 +31,7 @@ def setup_logger(name, log_file='app.log', level=logging.INFO):
     logger.setLevel(level)
     
     # 创建文件处理器
-    file_handler = RotatingFileHandler(
+    file_handler = LazyRotatingFileHandler(
         log_path,
         maxBytes=10*1024*1024,  # 10MB
         backupCount=5,
@@ -1,11 +1,14 @@
 import sys
 import os
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QFileDialog
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+import json
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QFileDialog, QTableWidgetItem
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from qfluentwidgets import FluentWindow, NavigationInterface, NavigationItemPosition, FluentIcon
 from qfluentwidgets import SubtitleLabel, setTheme, Theme, PushButton, LineEdit, ComboBox, ImageLabel
 from qfluentwidgets import MessageBox, StateToolTip, ScrollArea, CardWidget, BodyLabel, PrimaryPushButton, ProgressBar
-from video_processor_viewmodel import VideoProcessorViewModel
+from qfluentwidgets import TableWidget
+from app_config import load_config
+from render_queue import CANCELLED, DONE, FAILED, PENDING, RUNNING, JobQueue, RenderScheduler
 
 class AutoEditApp(FluentWindow):
     def __init__(self):
@@ -13,6 +16,22 @@ class AutoEditApp(FluentWindow):
         self.setWindowTitle('智能视频剪辑助手')
         self.resize(900, 700)
         
+        # 渲染任务队列：按 CPU 核数和可用内存并发执行，每个任务使用独立的工作目录
+        config = load_config()
+        self.job_queue = JobQueue(
+            config.get('queue_db_path', os.path.join('cache', 'render_queue.sqlite')),
+            config.get('queue_work_dir', os.path.join('output', 'jobs'))
+        )
+        self.scheduler = RenderScheduler(
+            self.job_queue,
+            config,
+            max_jobs=config.get('queue_max_jobs'),
+            cores_per_job=int(config.get('queue_cores_per_job', 4)),
+            memory_per_job_mb=float(config.get('queue_memory_per_job_mb', 1500)),
+            threshold_mb=float(config.get('memory_threshold_mb', 1000))
+        )
+        self.scheduler.start()
+        
         # 初始化导航栏
         self.init_navigation()
         
@@ -24,32 +43,79 @@ class AutoEditApp(FluentWindow):
         self.navigation_interface.setExpandWidth(200)
         
         # 添加导航项
-        self.add_sub_interface(
-            interface=TextDrivenEditInterface(self),
+        self.addSubInterface(
+            interface=TextDrivenEditInterface(self, scheduler=self.scheduler),
             icon=FluentIcon.DOCUMENT,
             text='文案驱动剪辑',
             position=NavigationItemPosition.TOP
         )
         
-        self.add_sub_interface(
-            interface=AutoGenerateInterface(self),
+        self.addSubInterface(
+            interface=AutoGenerateInterface(self, scheduler=self.scheduler),
             icon=FluentIcon.ROBOT,
             text='智能生成剪辑',
             position=NavigationItemPosition.TOP
         )
         
-        self.add_sub_interface(
+        self.addSubInterface(
+            interface=QueueInterface(self, scheduler=self.scheduler),
+            icon=FluentIcon.HISTORY,
+            text='渲染队列',
+            position=NavigationItemPosition.TOP
+        )
+        
+        self.addSubInterface(
             interface=SettingsInterface(self),
             icon=FluentIcon.SETTING,
             text='设置',
             position=NavigationItemPosition.BOTTOM
         )
 
-class TextDrivenEditInterface(QWidget):
-    def __init__(self, parent=None):
+    def closeEvent(self, event):
+        # 停止调度器，未完成的任务在下次启动时重新排队
+        self.scheduler.stop(wait=False)
+        super().closeEvent(event)
+
+class QueuedJobMixin:
+    """将生成任务提交到渲染队列，并定时刷新该任务的进度和状态"""
+    def init_job_tracking(self, scheduler):
+        self.scheduler = scheduler
+        self.job_id = None
+        self.job_timer = QTimer(self)
+        self.job_timer.timeout.connect(self.refresh_job)
+    
+    def submit_job(self, script, image_path, video_path, config=None):
+        self.job_id = self.scheduler.queue.submit(script, image_path, video_path, config=config)
+        self.scheduler.wake()
+        self.progress_bar.setValue(0)
+        self.status_label.setText(f'已加入渲染队列（任务 {self.job_id}）')
+        self.job_timer.start(500)
+    
+    def refresh_job(self):
+        job = self.scheduler.queue.get(self.job_id)
+        if job is None:
+            self.job_timer.stop()
+            return
+        self.update_progress(job['progress'])
+        if job['status'] == PENDING:
+            self.update_status(f'排队中（任务 {self.job_id}）')
+        elif job['status'] == RUNNING:
+            self.update_status(job['status_text'] or '正在生成...')
+        else:
+            self.job_timer.stop()
+            if job['status'] == DONE:
+                self.handle_completion(f'视频生成完成！\n保存路径：{job["output"]}')
+            elif job['status'] == FAILED:
+                self.handle_error(job['error'] or '视频生成失败')
+            else:
+                self.update_status('任务已取消')
+
+class TextDrivenEditInterface(QWidget, QueuedJobMixin):
+    def __init__(self, parent=None, scheduler=None):
         super().__init__(parent=parent)
+        self.setObjectName('textDrivenEditInterface')
         self.setup_ui()
-        self.processor = None
+        self.init_job_tracking(scheduler)
     
     def setup_ui(self):
         self.layout = QVBoxLayout(self)
@@ -138,17 +204,8 @@ class TextDrivenEditInterface(QWidget):
             MessageBox('提示', '请填写完整的文案和素材路径', self).exec_()
             return
         
-        # 禁用生成按钮
-        self.generate_btn.setEnabled(False)
-        
-        # 创建并启动处理线程
-        self.processor = VideoProcessorViewModel()
-        self.processor.initialize_generator(script, image_path, video_path)
-        self.processor.progress_updated.connect(self.update_progress)
-        self.processor.processing_status.connect(self.update_status)
-        self.processor.error_occurred.connect(self.handle_error)
-        self.processor.generation_finished.connect(self.handle_completion)
-        self.processor.start()
+        # 提交到渲染队列，可以连续提交多个任务
+        self.submit_job(script, image_path, video_path)
     
     def update_progress(self, value):
         self.progress_bar.setValue(value)
@@ -166,11 +223,12 @@ class TextDrivenEditInterface(QWidget):
         MessageBox('完成', msg, self).exec_()
         self.status_label.setText('生成完成')
 
-class AutoGenerateInterface(QWidget):
-    def __init__(self, parent=None):
+class AutoGenerateInterface(QWidget, QueuedJobMixin):
+    def __init__(self, parent=None, scheduler=None):
         super().__init__(parent=parent)
+        self.setObjectName('autoGenerateInterface')
         self.setup_ui()
-        self.processor = None
+        self.init_job_tracking(scheduler)
     
     def setup_ui(self):
         self.layout = QVBoxLayout(self)
@@ -261,17 +319,8 @@ class AutoGenerateInterface(QWidget):
             MessageBox('提示', '请确保已选择素材文件夹并生成文案', self).exec_()
             return
         
-        # 禁用生成按钮
-        self.generate_video_btn.setEnabled(False)
-        
-        # 创建并启动处理线程
-        self.processor = VideoProcessorViewModel()
-        self.processor.initialize_generator(script, material_path, material_path)
-        self.processor.progress_updated.connect(self.update_progress)
-        self.processor.processing_status.connect(self.update_status)
-        self.processor.error_occurred.connect(self.handle_error)
-        self.processor.generation_finished.connect(self.handle_completion)
-        self.processor.start()
+        # 提交到渲染队列，可以连续提交多个任务；视频素材经镜头检测只保留得分最高的片段
+        self.submit_job(script, material_path, material_path, config={'scene_detection': True})
     
     def update_progress(self, value):
         self.progress_bar.setValue(value)
@@ -289,9 +338,88 @@ class AutoGenerateInterface(QWidget):
         MessageBox('完成', msg, self).exec_()
         self.status_label.setText('生成完成')
 
+class QueueInterface(QWidget):
+    STATUS_LABELS = {
+        PENDING: '排队中',
+        RUNNING: '生成中',
+        DONE: '已完成',
+        FAILED: '失败',
+        CANCELLED: '已取消',
+    }
+    
+    def __init__(self, parent=None, scheduler=None):
+        super().__init__(parent=parent)
+        self.setObjectName('queueInterface')
+        self.scheduler = scheduler
+        self.setup_ui()
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(1000)
+        self.refresh()
+    
+    def setup_ui(self):
+        self.layout = QVBoxLayout(self)
+        self.layout.setSpacing(20)
+        self.layout.setContentsMargins(30, 30, 30, 30)
+        
+        # 标题
+        title = SubtitleLabel('渲染队列', self)
+        self.layout.addWidget(title)
+        
+        self.summary_label = BodyLabel('', self)
+        self.layout.addWidget(self.summary_label)
+        
+        # 任务列表
+        self.table = TableWidget(self)
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels(['任务', '名称', '状态', '进度', '输出 / 错误'])
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(TableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(TableWidget.SelectRows)
+        self.layout.addWidget(self.table)
+        
+        # 操作按钮
+        button_layout = QHBoxLayout()
+        self.cancel_btn = PushButton('取消所选任务', self)
+        self.cancel_btn.clicked.connect(self.cancel_selected)
+        self.clear_btn = PushButton('清除已结束任务', self)
+        self.clear_btn.clicked.connect(self.clear_finished)
+        button_layout.addWidget(self.cancel_btn)
+        button_layout.addWidget(self.clear_btn)
+        button_layout.addStretch()
+        self.layout.addLayout(button_layout)
+    
+    def refresh(self):
+        jobs = self.scheduler.queue.list_jobs()
+        self.table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            if job['status'] == RUNNING:
+                status = f'{self.STATUS_LABELS[RUNNING]}：{job["status_text"]}' if job['status_text'] else self.STATUS_LABELS[RUNNING]
+            else:
+                status = self.STATUS_LABELS.get(job['status'], job['status'])
+            values = [str(job['id']), job['name'], status, f'{job["progress"]}%', job['output'] or job['error'] or '']
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        running = sum(1 for job in jobs if job['status'] == RUNNING)
+        pending = sum(1 for job in jobs if job['status'] == PENDING)
+        self.summary_label.setText(
+            f'运行中 {running} / 最多 {self.scheduler.max_jobs} 个任务，排队 {pending} 个'
+        )
+    
+    def cancel_selected(self):
+        rows = {index.row() for index in self.table.selectedIndexes()}
+        for row in rows:
+            self.scheduler.cancel(int(self.table.item(row, 0).text()))
+        self.refresh()
+    
+    def clear_finished(self):
+        self.scheduler.queue.clear_finished()
+        self.refresh()
+
 class SettingsInterface(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent=parent)
+        self.setObjectName('settingsInterface')
         self.setup_ui()
         self.load_settings()
     
@@ -519,8 +647,11 @@ class SettingsInterface(QWidget):
         except Exception as e:
             MessageBox('错误', f'加载设置失败: {str(e)}', self).exec_()
 
-if __name__ == '__main__':
+def main():
     app = QApplication(sys.argv)
     window = AutoEditApp()
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    return app.exec_()
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
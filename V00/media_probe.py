@@ -0,0 +1,272 @@
+import json
+import os
+import re
+import shutil
+import struct
+import subprocess
+from typing import Dict, List, Optional, Sequence, Tuple
+from logger import video_logger
+
+def _iter_boxes(data: bytes, offset: int = 0, end: Optional[int] = None):
+    """遍历一段数据中的 ISO BMFF box，返回 (类型, 内容起始, 内容结束)"""
+    end = len(data) if end is None else end
+    while offset + 8 <= end:
+        size, box_type = struct.unpack('>I4s', data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            break
+        yield box_type, offset + header, min(offset + size, end)
+        offset += size
+
+def _find_box(data: bytes, box_type: bytes, start: int, end: int):
+    for child_type, child_start, child_end in _iter_boxes(data, start, end):
+        if child_type == box_type:
+            return child_start, child_end
+    return None
+
+def _read_moov(file_path: str) -> Optional[bytes]:
+    """只读取文件中的 moov 索引，不读取媒体数据"""
+    file_size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        offset = 0
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            header = f.read(16)
+            size, box_type = struct.unpack('>I4s', header[:8])
+            header_size = 8
+            if size == 1:
+                size = struct.unpack('>Q', header[8:16])[0]
+                header_size = 16
+            elif size == 0:
+                size = file_size - offset
+            if size < header_size:
+                return None
+            if box_type == b'moov':
+                f.seek(offset + header_size)
+                return f.read(size - header_size)
+            offset += size
+    return None
+
+def _timescale(data: bytes, box: Tuple[int, int]) -> int:
+    """mvhd/mdhd 中的时间刻度"""
+    offset = box[0] + (20 if data[box[0]] == 1 else 12)
+    return struct.unpack('>I', data[offset:offset + 4])[0]
+
+def _read_runs(data: bytes, box: Tuple[int, int], signed: bool = False) -> List[Tuple[int, int]]:
+    """读取 stts/ctts 的 (采样数, 取值) 游程表"""
+    entry_count = struct.unpack('>I', data[box[0] + 4:box[0] + 8])[0]
+    values = struct.unpack(f'>{entry_count * 2}{"i" if signed else "I"}', data[box[0] + 8:box[0] + 8 + entry_count * 8])
+    return list(zip(values[0::2], values[1::2]))
+
+def _run_values(runs: List[Tuple[int, int]], samples: Sequence[int], cumulative: bool) -> List[int]:
+    """按升序的采样编号（从 1 开始）查游程表
+
+    cumulative 为 True 时返回该采样之前所有采样取值之和（stts 中即解码时间），否则返回该采样所在游程的取值。
+    """
+    values = []
+    first = 1
+    total = 0
+    run = 0
+    for sample in samples:
+        while run < len(runs) and sample >= first + runs[run][0]:
+            total += runs[run][0] * runs[run][1]
+            first += runs[run][0]
+            run += 1
+        if cumulative:
+            values.append(total + (sample - first) * runs[run][1] if run < len(runs) else total)
+        else:
+            values.append(runs[run][1] if run < len(runs) else 0)
+    return values
+
+def _edit_offset(data: bytes, edts: Optional[Tuple[int, int]], timescale: int,
+                 movie_timescale: int) -> Optional[int]:
+    """编辑列表（elst）把媒体时间映射到显示时间的偏移量（媒体时间刻度）
+
+    只支持最常见的形式：若干空编辑（延迟显示）加一个正常速率的编辑，
+    例如含 B 帧的 H.264 用 media_time 跳过开头的合成延迟。更复杂的编辑列表返回 None。
+    """
+    elst = _find_box(data, b'elst', *edts) if edts else None
+    if not elst:
+        return 0
+    version = data[elst[0]]
+    entry_count = struct.unpack('>I', data[elst[0] + 4:elst[0] + 8])[0]
+    entry_format, entry_size = ('>Qqhh', 20) if version == 1 else ('>Iihh', 12)
+    delay = 0
+    media_start = None
+    for index in range(entry_count):
+        offset = elst[0] + 8 + index * entry_size
+        duration, media_time, rate, _ = struct.unpack(entry_format, data[offset:offset + entry_size])
+        if media_time == -1:
+            if media_start is not None:
+                return None
+            delay += duration * timescale // max(movie_timescale, 1)
+        elif media_start is None and rate == 1:
+            media_start = media_time
+        else:
+            return None
+    return delay - (media_start or 0)
+
+def _video_track_keyframes(moov: bytes, trak_start: int, trak_end: int,
+                           movie_timescale: int) -> Optional[List[float]]:
+    """视频轨道关键帧的显示时间（秒）
+
+    解码时间来自 stts，加上 ctts 的合成时间偏移和 elst 的编辑偏移得到显示时间，
+    与 ffprobe 报告的 pts_time 一致。编辑列表无法解析时返回 None，由调用方回退到 ffprobe。
+    """
+    mdia = _find_box(moov, b'mdia', trak_start, trak_end)
+    if not mdia:
+        return None
+    hdlr = _find_box(moov, b'hdlr', *mdia)
+    if not hdlr or moov[hdlr[0] + 8:hdlr[0] + 12] != b'vide':
+        return None
+
+    mdhd = _find_box(moov, b'mdhd', *mdia)
+    minf = _find_box(moov, b'minf', *mdia)
+    stbl = _find_box(moov, b'stbl', *minf) if minf else None
+    if not mdhd or not stbl:
+        return None
+    timescale = _timescale(moov, mdhd)
+    if not timescale:
+        return None
+
+    # stts: 每个采样的解码时长
+    stts = _find_box(moov, b'stts', *stbl)
+    if not stts:
+        return None
+    sample_runs = _read_runs(moov, stts)
+
+    # stss: 关键帧采样编号（从 1 开始），缺失时表示所有采样都是关键帧
+    stss = _find_box(moov, b'stss', *stbl)
+    if stss:
+        key_count = struct.unpack('>I', moov[stss[0] + 4:stss[0] + 8])[0]
+        key_samples = sorted(struct.unpack(f'>{key_count}I', moov[stss[0] + 8:stss[0] + 8 + key_count * 4]))
+    else:
+        key_samples = range(1, sum(count for count, _ in sample_runs) + 1)
+
+    edit_offset = _edit_offset(moov, _find_box(moov, b'edts', trak_start, trak_end), timescale, movie_timescale)
+    if edit_offset is None:
+        return None
+    decode_times = _run_values(sample_runs, key_samples, cumulative=True)
+    # ctts: 合成时间偏移（显示时间 - 解码时间），版本 1 允许负值，按有符号数读取兼容两种版本
+    ctts = _find_box(moov, b'ctts', *stbl)
+    offsets = _run_values(_read_runs(moov, ctts, signed=True), key_samples, cumulative=False) if ctts \
+        else [0] * len(decode_times)
+    # 编辑起点之前的关键帧不显示，钳到 0
+    return sorted(max(decode + offset + edit_offset, 0) / timescale
+                  for decode, offset in zip(decode_times, offsets))
+
+def read_mp4_keyframes(file_path: str) -> Optional[List[float]]:
+    """从 MP4/MOV 的 moov 索引中读取视频轨道关键帧的显示时间（秒）"""
+    try:
+        moov = _read_moov(file_path)
+        if moov is None:
+            return None
+        mvhd = _find_box(moov, b'mvhd', 0, len(moov))
+        movie_timescale = _timescale(moov, mvhd) if mvhd else 0
+        for box_type, start, end in _iter_boxes(moov):
+            if box_type == b'trak':
+                keyframes = _video_track_keyframes(moov, start, end, movie_timescale)
+                if keyframes is not None:
+                    return keyframes
+    except (OSError, struct.error) as e:
+        video_logger.warning('Failed to read MP4 index of %s: %s', file_path, str(e))
+    return None
+
+def get_ffmpeg_binary() -> str:
+    # moviepy.config 导入较慢，只在真正需要 ffmpeg 时才导入
+    from moviepy.config import get_setting
+    return get_setting('FFMPEG_BINARY')
+
+def get_ffprobe_binary() -> Optional[str]:
+    return os.getenv('FFPROBE_BINARY') or shutil.which('ffprobe')
+
+def ffprobe_keyframes(file_path: str) -> Optional[List[float]]:
+    """使用 ffprobe 读取数据包标记得到关键帧时间（不解码画面）"""
+    ffprobe = get_ffprobe_binary()
+    if not ffprobe:
+        return None
+    try:
+        output = subprocess.run(
+            [ffprobe, '-v', 'error', '-select_streams', 'v:0',
+             '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', file_path],
+            capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        video_logger.warning('ffprobe failed on %s: %s', file_path, str(e))
+        return None
+
+    keyframes = []
+    for line in output.splitlines():
+        pts_time, _, flags = line.partition(',')
+        if 'K' in flags and pts_time not in ('', 'N/A'):
+            keyframes.append(float(pts_time))
+    return sorted(keyframes)
+
+def probe_keyframes(file_path: str) -> Optional[List[float]]:
+    """获取视频的关键帧时间列表，MP4/MOV 直接读取容器索引，其余格式回退到 ffprobe"""
+    if file_path.lower().endswith(('.mp4', '.mov', '.m4v')):
+        keyframes = read_mp4_keyframes(file_path)
+        if keyframes:
+            return keyframes
+    return ffprobe_keyframes(file_path)
+
+def _parse_ffmpeg_banner(file_path: str) -> Optional[Dict]:
+    """未安装 ffprobe 时，解析 `ffmpeg -i` 的输出获取媒体信息"""
+    try:
+        output = subprocess.run(
+            [get_ffmpeg_binary(), '-hide_banner', '-i', file_path],
+            capture_output=True, text=True, errors='replace'
+        ).stderr
+    except OSError as e:
+        video_logger.warning('ffmpeg failed on %s: %s', file_path, str(e))
+        return None
+
+    video = re.search(r'Stream #.*?Video: (\w+).*?, (\d{2,5})x(\d{2,5})', output)
+    if not video:
+        return None
+    duration = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', output)
+    fps = re.search(r'([\d.]+) (?:fps|tbr)', output[video.start():])
+    hours, minutes, seconds = duration.groups() if duration else (0, 0, 0)
+    return {
+        'duration': int(hours) * 3600 + int(minutes) * 60 + float(seconds),
+        'width': int(video.group(2)),
+        'height': int(video.group(3)),
+        'fps': float(fps.group(1)) if fps else 0.0,
+        'codec': video.group(1),
+        'has_audio': bool(re.search(r'Stream #.*?Audio:', output)),
+    }
+
+def probe_metadata(file_path: str) -> Optional[Dict]:
+    """探测视频的时长、分辨率、帧率、编码和是否包含音轨"""
+    ffprobe = get_ffprobe_binary()
+    if not ffprobe:
+        return _parse_ffmpeg_banner(file_path)
+    try:
+        output = subprocess.run(
+            [ffprobe, '-v', 'error', '-show_streams', '-show_format', '-of', 'json', file_path],
+            capture_output=True, text=True, check=True
+        ).stdout
+        info = json.loads(output)
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        video_logger.warning('ffprobe failed on %s: %s', file_path, str(e))
+        return None
+
+    streams = info.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    if video is None:
+        return None
+    numerator, _, denominator = video.get('avg_frame_rate', '0/1').partition('/')
+    fps = float(numerator) / float(denominator or 1) if float(denominator or 1) else 0.0
+    return {
+        'duration': float(info.get('format', {}).get('duration') or video.get('duration') or 0),
+        'width': int(video['width']),
+        'height': int(video['height']),
+        'fps': fps,
+        'codec': video.get('codec_name'),
+        'has_audio': any(s.get('codec_type') == 'audio' for s in streams),
+    }
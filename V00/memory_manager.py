@@ -1,7 +1,13 @@
+import math
 import os
-import shutil
 import psutil
+from typing import Callable, List, Optional, Tuple
 from logger import video_logger
+from media_probe import probe_keyframes
+
+def available_memory_mb() -> float:
+    """当前系统可用内存（MB）"""
+    return psutil.virtual_memory().available / (1024 * 1024)
 
 class MemoryManager:
     def __init__(self, temp_dir='temp', threshold_mb=1000):
@@ -13,8 +19,7 @@ class MemoryManager:
     
     def check_memory_usage(self):
         """检查系统内存使用情况"""
-        memory = psutil.virtual_memory()
-        available_mb = memory.available / (1024 * 1024)
+        available_mb = available_memory_mb()
         if available_mb < self.threshold_mb:
             video_logger.warning('Low memory warning: %d MB available', available_mb)
             self.clean_temp_files()
@@ -37,53 +42,55 @@ class MemoryManager:
             except Exception as e:
                 video_logger.error('Failed to clean temp file %s: %s', file_path, str(e))
     
-    def split_large_file(self, file_path, chunk_size_mb=100):
-        """将大文件分割成小块处理"""
-        chunk_size = chunk_size_mb * 1024 * 1024  # 转换为字节
+    def segment_large_file(self, file_path: str, duration: float, chunk_size_mb: int = 100,
+                           keyframe_probe: Callable[[str], Optional[List[float]]] = probe_keyframes
+                           ) -> List[Tuple[str, float, float]]:
+        """按关键帧边界将大文件划分为时间区间
+
+        不再复制文件数据，返回 (路径, 开始时间, 结束时间) 列表，
+        由调用方通过 subclip 按需解码。每个区间约对应 chunk_size_mb 的数据量。
+        keyframe_probe 读取关键帧时间，传入 ProbeCache.keyframes 时命中缓存的文件无需再读取。
+        """
         if not os.path.exists(file_path):
             video_logger.error('File not found: %s', file_path)
             return []
-        
+
+        chunk_size = chunk_size_mb * 1024 * 1024  # 转换为字节
         file_size = os.path.getsize(file_path)
-        if file_size <= chunk_size:
-            return [file_path]
-        
-        chunks = []
-        try:
-            base_name = os.path.basename(file_path)
-            name, ext = os.path.splitext(base_name)
-            
-            with open(file_path, 'rb') as f:
-                chunk_num = 0
-                while True:
-                    chunk_data = f.read(chunk_size)
-                    if not chunk_data:
-                        break
-                    
-                    chunk_path = os.path.join(
-                        self.temp_dir,
-                        f'{name}_chunk_{chunk_num}{ext}'
-                    )
-                    with open(chunk_path, 'wb') as chunk_file:
-                        chunk_file.write(chunk_data)
-                    
-                    chunks.append(chunk_path)
-                    self.register_temp_file(chunk_path)
-                    chunk_num += 1
-                    video_logger.debug('Created chunk file: %s', chunk_path)
-            
-            video_logger.info('Split %s into %d chunks', file_path, len(chunks))
-            return chunks
-        except Exception as e:
-            video_logger.error('Failed to split file %s: %s', file_path, str(e))
-            return []
+        if file_size <= chunk_size or duration <= 0:
+            return [(file_path, 0.0, duration)]
+
+        # 按平均码率估算每个区间的目标时长
+        target_duration = duration * chunk_size / file_size
+        keyframes = keyframe_probe(file_path)
+        if keyframes:
+            boundaries = [0.0]
+            for keyframe in keyframes:
+                if keyframe - boundaries[-1] >= target_duration and keyframe < duration:
+                    boundaries.append(keyframe)
+        else:
+            video_logger.warning('No keyframe index for %s, using evenly spaced segments', file_path)
+            count = int(math.ceil(duration / target_duration))
+            boundaries = [duration * i / count for i in range(count)]
+
+        boundaries.append(duration)
+        segments = [
+            (file_path, start, end)
+            for start, end in zip(boundaries[:-1], boundaries[1:])
+            if end > start
+        ]
+        video_logger.info('Segmented %s into %d keyframe-aligned ranges', file_path, len(segments))
+        return segments
     
     def __del__(self):
-        """析构时清理所有临时文件"""
-        self.clean_temp_files()
-        if os.path.exists(self.temp_dir):
-            try:
-                shutil.rmtree(self.temp_dir)
-                video_logger.info('Cleaned temp directory: %s', self.temp_dir)
-            except Exception as e:
-                video_logger.error('Failed to clean temp directory: %s', str(e))
\ No newline at end of file
+        """析构时只清理注册过的临时文件
+
+        临时目录中可能有需要跨进程保留的文件（如断点续渲的检查点），目录只在为空时删除。
+        """
+        try:
+            self.clean_temp_files()
+            if os.path.isdir(self.temp_dir) and not os.listdir(self.temp_dir):
+                os.rmdir(self.temp_dir)
+        except Exception:
+            # 解释器退出时模块可能已被回收，忽略清理失败
+            pass
\ No newline at end of file
@@ -0,0 +1,130 @@
+import math
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from lazy_clips import LazyImageClip, load_scaled_image
+
+# 运动方式：起止状态为 (缩放倍数, 水平位置, 垂直位置)，位置取值 0~1 表示在可平移范围内的相对位置
+MOTION_PRESETS: Dict[str, Tuple[Tuple[float, float, float], Tuple[float, float, float]]] = {
+    'zoom_in': ((0.0, 0.5, 0.5), (1.0, 0.5, 0.5)),
+    'zoom_out': ((1.0, 0.5, 0.5), (0.0, 0.5, 0.5)),
+    'pan_left': ((1.0, 1.0, 0.5), (1.0, 0.0, 0.5)),
+    'pan_right': ((1.0, 0.0, 0.5), (1.0, 1.0, 0.5)),
+    'pan_up': ((1.0, 0.5, 1.0), (1.0, 0.5, 0.0)),
+    'pan_down': ((1.0, 0.5, 0.0), (1.0, 0.5, 1.0)),
+}
+
+def pick_motion(filename: str) -> str:
+    """按文件名确定性地选择运动方式，重新渲染时同一张图片的运动不变"""
+    names = sorted(MOTION_PRESETS)
+    return names[zlib.crc32(filename.replace('\\', '/').rsplit('/', 1)[-1].encode('utf-8')) % len(names)]
+
+def cover_window(source: Tuple[int, int], output: Tuple[int, int]) -> Tuple[float, float]:
+    """源图中与输出画幅比例相同的最大取景窗口尺寸"""
+    scale = min(source[0] / output[0], source[1] / output[1])
+    return output[0] * scale, output[1] * scale
+
+class ImagePyramid:
+    """图片的多分辨率金字塔
+
+    第 0 层为最大分辨率，之后每层宽高减半（PIL reduce 盒式滤波），直到不小于输出尺寸的最小一层。
+    每帧从像素密度最接近输出的层取景，缩小倍数始终小于 2，双线性插值不会产生明显混叠。
+    取景框与输出尺寸相同（固定缩放的平移）时直接按整数像素切片，不做重采样。
+    """
+    def __init__(self, image: Image.Image, min_size: Tuple[int, int]):
+        self.levels: List[Image.Image] = [image]
+        while self.levels[-1].width // 2 >= min_size[0] and self.levels[-1].height // 2 >= min_size[1]:
+            self.levels.append(self.levels[-1].reduce(2))
+        self._base_array: Optional[np.ndarray] = None
+
+    def render(self, box: Tuple[float, float, float, float], size: Tuple[int, int]) -> np.ndarray:
+        """将第 0 层坐标系中的取景框 box 缩放到 size，一次完成裁切与仿射缩放"""
+        base = self.levels[0]
+        if abs(box[2] - box[0] - size[0]) < 0.5 and abs(box[3] - box[1] - size[1]) < 0.5:
+            if self._base_array is None:
+                self._base_array = np.asarray(base)
+            x = min(max(int(round(box[0])), 0), base.width - size[0])
+            y = min(max(int(round(box[1])), 0), base.height - size[1])
+            return self._base_array[y:y + size[1], x:x + size[0]]
+        density = (box[2] - box[0]) / size[0]
+        level = min(max(int(math.log2(density)), 0), len(self.levels) - 1) if density > 1 else 0
+        image = self.levels[level]
+        rx, ry = image.width / base.width, image.height / base.height
+        return np.asarray(image.resize(size, Image.BILINEAR,
+                                       box=(box[0] * rx, box[1] * ry, box[2] * rx, box[3] * ry)))
+
+class KenBurnsReader:
+    """按运动进度生成帧；金字塔在首次取帧时构建，close 后释放"""
+    def __init__(self, filename: str, source_size: Tuple[int, int], output_size: Tuple[int, int],
+                 motion: str, zoom: float):
+        self.filename = filename
+        self.source_size = source_size
+        self.output_size = tuple(output_size)
+        self.start, self.end = MOTION_PRESETS[motion]
+        self.zoom = max(zoom, 1.0)
+        self._pyramid: Optional[ImagePyramid] = None
+        self._window: Tuple[float, float] = (0.0, 0.0)
+        self._lock = threading.Lock()
+
+    def set_target_size(self, target_size: Tuple[int, int], output_size: Optional[Tuple[int, int]] = None) -> None:
+        with self._lock:
+            output_size = tuple(output_size or target_size)
+            if output_size != self.output_size:
+                self._pyramid = None
+            self.output_size = output_size
+
+    def _build(self) -> ImagePyramid:
+        # 第 0 层在最大缩放时与输出的像素密度相同：大图直接以该尺寸解码，小图一次性放大，
+        # 之后每帧都只需缩小或整数切片
+        window_width, _ = cover_window(self.source_size, self.output_size)
+        scale = self.output_size[0] * self.zoom / window_width
+        base_size = (max(1, round(self.source_size[0] * scale)), max(1, round(self.source_size[1] * scale)))
+        image = Image.fromarray(load_scaled_image(self.filename, base_size))
+        self._window = cover_window(image.size, self.output_size)
+        return ImagePyramid(image, self.output_size)
+
+    def frame_box(self, progress: float) -> Tuple[float, float, float, float]:
+        """进度 progress（0~1）对应的第 0 层取景框"""
+        state = [a + (b - a) * progress for a, b in zip(self.start, self.end)]
+        zoom = 1.0 + (self.zoom - 1.0) * state[0]
+        base = self._pyramid.levels[0]
+        width, height = self._window[0] / zoom, self._window[1] / zoom
+        x = (base.width - width) * state[1]
+        y = (base.height - height) * state[2]
+        return x, y, x + width, y + height
+
+    def get_frame(self, progress: float) -> np.ndarray:
+        with self._lock:
+            if self._pyramid is None:
+                self._pyramid = self._build()
+            pyramid = self._pyramid
+            box = self.frame_box(min(max(progress, 0.0), 1.0))
+        return pyramid.render(box, self.output_size)
+
+    def close(self) -> None:
+        with self._lock:
+            self._pyramid = None
+
+class KenBurnsClip(LazyImageClip):
+    """带平移/缩放运动的静态图片片段
+
+    运动进度按片段时长计算，时间线规划调整图片时长后运动仍覆盖整个片段。
+    """
+    def __init__(self, filename: str, duration: float, canvas_size: Tuple[int, int],
+                 motion: Optional[str] = None, zoom: float = 1.2):
+        LazyImageClip.__init__(self, filename, duration, canvas_size)
+        self.motion = motion or pick_motion(filename)
+        self.reader = KenBurnsReader(filename, self.source_size, self.size, self.motion, zoom)
+        # 运动参数参与分段缓存的内容签名
+        self.edit_ops = (('ken_burns', self.motion, zoom),)
+        self._bind_motion()
+
+    def _bind_motion(self) -> None:
+        self.make_frame = lambda t: self.reader.get_frame(t / self.duration if self.duration else 0.0)
+
+    def set_duration(self, t, change_end=True):
+        clip = LazyImageClip.set_duration(self, t, change_end)
+        clip._bind_motion()
+        return clip
@@ -0,0 +1,61 @@
+import math
+from typing import List, Sequence, Tuple
+import numpy as np
+from PIL import Image
+from logger import video_logger
+from segment_cache import record_edit
+
+# 适配方式：letterbox 等比缩放到画布内并补黑边，crop 等比缩放铺满画布并居中裁切
+FIT_MODES = ('letterbox', 'crop')
+
+def scaled_size(source: Tuple[int, int], canvas: Tuple[int, int], mode: str = 'letterbox') -> Tuple[int, int]:
+    """按适配方式计算素材缩放后的尺寸（允许放大），crop 模式保证不小于画布"""
+    width, height = source
+    if mode == 'crop':
+        scale = max(canvas[0] / width, canvas[1] / height)
+        return max(canvas[0], math.ceil(width * scale - 1e-6)), max(canvas[1], math.ceil(height * scale - 1e-6))
+    scale = min(canvas[0] / width, canvas[1] / height)
+    return min(canvas[0], max(1, round(width * scale))), min(canvas[1], max(1, round(height * scale)))
+
+def resize_frame(frame: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """单帧缩放，使用 PIL 的 C 实现，避免逐像素的 Python 运算"""
+    if (frame.shape[1], frame.shape[0]) == tuple(size):
+        return frame
+    if frame.dtype != np.uint8:
+        frame = frame.astype(np.uint8)
+    return np.asarray(Image.fromarray(frame[:, :, :3]).resize(size, Image.BILINEAR))
+
+class Normalizer:
+    """素材分辨率与画幅归一化
+
+    在素材加载之后、合成之前对每个片段只做一次尺寸决策：
+    延迟解码的图片和视频直接以目标尺寸解码（图片缩放一次后缓存，视频由 ffmpeg 解码进程缩放），
+    其他片段才逐帧缩放。补黑边和裁切由渲染引擎在写入画布时完成。
+    """
+    def __init__(self, canvas_size: Tuple[int, int] = (1920, 1080), mode: str = 'letterbox'):
+        if mode not in FIT_MODES:
+            raise ValueError(f'Unknown canvas fit mode: {mode}')
+        # libx264 + yuv420p 要求宽高为偶数
+        self.canvas_size = (canvas_size[0] - canvas_size[0] % 2, canvas_size[1] - canvas_size[1] % 2)
+        self.mode = mode
+
+    def normalize(self, clips: Sequence) -> List:
+        """返回归一化后的片段列表；延迟解码的片段会被原地修改解码尺寸"""
+        normalized = []
+        direct = resized = 0
+        for clip in clips:
+            source = getattr(clip, 'source_size', None) or tuple(clip.size)
+            size = scaled_size(source, self.canvas_size, self.mode)
+            if hasattr(clip, 'set_target_size'):
+                # crop 模式在解码器中裁切成画布尺寸，渲染时无需再处理
+                clip.set_target_size(size, self.canvas_size if self.mode == 'crop' else None)
+                direct += 1
+            elif tuple(clip.size) != size:
+                clip = record_edit(clip.fl_image(lambda frame, size=size: resize_frame(frame, size)),
+                                   clip, 'resize', size[0], size[1])
+                clip.size = size
+                resized += 1
+            normalized.append(clip)
+        video_logger.info('Normalized %d clips to %dx%d (%s): %d decoded at target size, %d resized per frame',
+                          len(normalized), *self.canvas_size, self.mode, direct, resized)
+        return normalized
@@ -0,0 +1,345 @@
+import asyncio
+import os
+import shutil
+import threading
+from typing import Callable, Dict, Optional
+from app_config import load_config
+from checkpoint import RenderCheckpoint
+from tts_factory import TTSFactory
+from tts_cache import TTSCache
+from video_strategy import ImageProcessor, VideoProcessor, SubtitleGenerator, VideoComposer
+from logger import video_logger
+from memory_manager import MemoryManager
+from normalizer import Normalizer
+from probe_cache import ProbeCache
+from profiler import NULL_PROFILER, Profiler
+from scene_detect import SceneCache, SceneDetector
+from segment_cache import SegmentCache
+from speech_segments import segment_timings_path
+from stage_scheduler import StageScheduler
+from timeline_planner import TimelinePlanner, audio_duration
+from transitions import create_transitions
+
+def create_tts_provider(config: Dict, profiler: Optional[Profiler] = None, frame_rate: Optional[float] = None):
+    if not config:
+        return TTSFactory.create_provider('gradio', profiler=profiler, frame_rate=frame_rate)
+    return TTSFactory.create_provider(
+        config.get('voice_mode', 'gradio').lower(),
+        profiler=profiler,
+        frame_rate=frame_rate,
+        server_url=config.get('api_url'),
+        max_concurrency=int(config.get('tts_concurrency', 3)),
+        max_segment_chars=int(config.get('tts_max_segment_chars', 120)),
+        request_timeout=float(config.get('tts_request_timeout', 120)),
+        max_retries=int(config.get('tts_max_retries', 2)),
+        cache=TTSCache(
+            config.get('tts_cache_dir', os.path.join('cache', 'tts')),
+            max_bytes=int(config.get('tts_cache_max_mb', 512)) * 1024 * 1024
+        )
+    )
+
+def create_probe_cache(config: Dict) -> ProbeCache:
+    return ProbeCache(
+        config.get('probe_cache_path', os.path.join('cache', 'probe_cache.sqlite')),
+        max_entries=int(config.get('probe_cache_max_entries', 10000))
+    )
+
+class ProgressTracker:
+    """按各阶段实际完成的数量（文件数、配音分段数、帧数）加权计算总进度
+
+    并发执行的阶段分别报告自己的 (done, total)，总进度只增不减。
+    各阶段在不同线程中调用 update，计算和回调都在锁内进行，回调收到的进度按调用顺序递增。
+    """
+    def __init__(self, weights: Dict[str, float], callback: Optional[Callable[[int], None]] = None):
+        self.weights = weights
+        self.callback = callback
+        self.fractions = {stage: 0.0 for stage in weights}
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def update(self, stage: str, done: int, total: int) -> None:
+        with self._lock:
+            self.fractions[stage] = min(done / total, 1.0) if total > 0 else 1.0
+            value = int(100 * sum(self.weights[key] * self.fractions[key] for key in self.weights)
+                        / sum(self.weights.values()))
+            if value > self.value:
+                self.value = value
+                if self.callback:
+                    self.callback(value)
+
+    def stage_callback(self, stage: str) -> Callable[[int, int], None]:
+        return lambda done, total: self.update(stage, done, total)
+
+class VideoPipeline:
+    """与界面无关的视频生成流水线
+
+    图形界面（VideoGenerator）和命令行（cli.py）共用该流水线，
+    进度和状态通过回调函数通知调用方，本模块不依赖 PyQt5。
+    开启 profile_render 时每次运行都会在输出目录写入 Chrome trace 格式的 render_trace.json。
+    开启 resume_renders 时配音、字幕和已编码分段记录在输出目录的 checkpoint/ 中，
+    中断后以相同参数重新运行会从最后完成的阶段或分段继续。
+    """
+    # 各阶段在总进度中的权重
+    progress_weights = {'ingest': 15, 'audio': 30, 'subtitle': 5, 'render': 50}
+
+    def __init__(self, script: str, image_path: str, video_path: str, config: Optional[Dict] = None,
+                 output_path: Optional[str] = None,
+                 progress_callback: Optional[Callable[[int], None]] = None,
+                 status_callback: Optional[Callable[[str], None]] = None,
+                 probe_cache: Optional[ProbeCache] = None, temp_dir: str = 'temp'):
+        self.script = script
+        self.image_path = image_path
+        self.video_path = video_path
+        self.config = load_config() if config is None else config
+        self.output_path = output_path or self.config.get('output_path', 'output')
+        self.progress_callback = progress_callback
+        self.status_callback = status_callback
+        self.is_running = False
+        self.profiler = Profiler('render') if self.config.get('profile_render', True) else NULL_PROFILER
+
+        self.voice_name = self.config.get('voice_type', 'am_adam')
+        self.voice_speed = float(self.config.get('voice_speed', 1.0))
+
+        # 初始化处理器
+        ingest_workers = self.config.get('ingest_workers')
+        canvas_size = (
+            int(self.config.get('canvas_width', 1920)),
+            int(self.config.get('canvas_height', 1080))
+        )
+        self.checkpoint = None
+        self.checkpoint_dir = os.path.join(self.output_path, 'checkpoint')
+        if self.config.get('resume_renders', True):
+            self.checkpoint = RenderCheckpoint(self.checkpoint_dir, {
+                'script': script,
+                'voice_mode': self.config.get('voice_mode', 'gradio'),
+                'api_url': self.config.get('api_url'),
+                'voice_name': self.voice_name,
+                'voice_speed': self.voice_speed,
+                'tts_max_segment_chars': self.config.get('tts_max_segment_chars', 120),
+                'canvas_size': canvas_size,
+            })
+        self.image_processor = ImageProcessor(max_workers=ingest_workers, canvas_size=canvas_size,
+                                              profiler=self.profiler,
+                                              ken_burns=self.config.get('ken_burns', False),
+                                              ken_burns_zoom=self.config.get('ken_burns_zoom', 1.2))
+        self.memory_manager = MemoryManager(temp_dir)
+        # 多个任务并发时共用同一个探测缓存连接
+        self.probe_cache = probe_cache or create_probe_cache(self.config)
+        self.video_processor = VideoProcessor(
+            max_workers=ingest_workers,
+            memory_manager=self.memory_manager,
+            probe_cache=self.probe_cache,
+            profiler=self.profiler,
+            scene_detector=self._create_scene_detector()
+        )
+        self.subtitle_generator = SubtitleGenerator(
+            canvas_size,
+            font_path=self.config.get('subtitle_font'),
+            fontsize=int(self.config.get('subtitle_fontsize', 24)),
+            profiler=self.profiler
+        )
+        self.video_composer = VideoComposer(
+            self.output_path,
+            profile=self.config.get('export_profile', 'balanced'),
+            planner=TimelinePlanner(
+                min_image_duration=float(self.config.get('timeline_min_image_duration', 1.0)),
+                min_speed=float(self.config.get('timeline_min_speed', 0.8)),
+                max_speed=float(self.config.get('timeline_max_speed', 1.5)),
+                loop=bool(self.config.get('timeline_loop', True))
+            ),
+            segment_cache=self._create_segment_cache(),
+            segment_seconds=float(self.config.get('segment_seconds', 10)),
+            profiler=self.profiler,
+            on_segment=self._record_segment if self.checkpoint else None,
+            normalizer=Normalizer(canvas_size, self.config.get('canvas_fit', 'letterbox')),
+            transitions=create_transitions(self.config.get('transition'),
+                                           float(self.config.get('transition_duration', 0.5)))
+        )
+        # 配音各句对齐到成片的帧边界
+        self.tts_provider = create_tts_provider(self.config, self.profiler, frame_rate=self.video_composer.fps)
+
+        video_logger.info('VideoPipeline initialized with script length: %d', len(script))
+
+    def _create_scene_detector(self) -> Optional[SceneDetector]:
+        if not self.config.get('scene_detection', False):
+            return None
+        return SceneDetector(
+            sample_fps=float(self.config.get('scene_sample_fps', 2.0)),
+            max_segments=int(self.config.get('scene_max_segments', 8)),
+            segment_seconds=float(self.config.get('scene_segment_seconds', 5.0)),
+            cache=SceneCache(self.config.get('scene_cache_path', os.path.join('cache', 'scene_cache.sqlite'))),
+            profiler=self.profiler
+        )
+
+    def _create_segment_cache(self) -> Optional[SegmentCache]:
+        max_bytes = int(self.config.get('segment_cache_max_mb', 2048)) * 1024 * 1024
+        if self.config.get('incremental_render', True):
+            return SegmentCache(self.config.get('segment_cache_dir', os.path.join('cache', 'segments')), max_bytes)
+        if self.checkpoint:
+            # 未开启增量渲染时分段只保存在本任务的检查点目录中，成功后删除
+            return SegmentCache(os.path.join(self.checkpoint_dir, 'segments'), max_bytes)
+        return None
+
+    def _record_segment(self, index: int, total: int, reused: bool) -> None:
+        self.checkpoint.update('compose', segments_done=index + 1, segments_total=total)
+
+    def _emit_progress(self, value: int) -> None:
+        if self.progress_callback:
+            self.progress_callback(value)
+
+    def _emit_status(self, status: str) -> None:
+        if self.status_callback:
+            self.status_callback(status)
+
+    def run(self) -> str:
+        """执行完整流水线并返回成片路径，失败时抛出异常"""
+        try:
+            video_logger.info('Starting video generation')
+            self.is_running = True
+            self.tts_provider.reset_cancellation()
+            self._ingest_progress = {}
+            self.progress = ProgressTracker(self.progress_weights, self.progress_callback)
+            self._emit_progress(0)
+
+            # 检查路径是否存在
+            if not os.path.exists(self.image_path):
+                video_logger.error('Image directory does not exist: %s', self.image_path)
+                raise Exception('图片文件夹不存在')
+            if not os.path.exists(self.video_path):
+                video_logger.error('Video directory does not exist: %s', self.video_path)
+                raise Exception('视频文件夹不存在')
+
+            # 语音只依赖文案，与素材加载并发执行；字幕按配音对齐，合成等待所有输入就绪
+            scheduler = StageScheduler()
+            scheduler.add_stage('images', self._profiled('images', self._process_images))
+            scheduler.add_stage('videos', self._profiled('videos', self._process_videos))
+            scheduler.add_stage('audio', self._profiled('audio', self._generate_audio))
+            scheduler.add_stage('subtitle', self._profiled('subtitle', self._generate_subtitle),
+                                depends_on=('images', 'videos', 'audio'))
+            scheduler.add_stage('compose', self._profiled('compose', self._compose),
+                                depends_on=('images', 'videos', 'audio', 'subtitle'))
+            results = scheduler.run(should_continue=lambda: self.is_running)
+
+            self._emit_progress(100)
+            return results['compose']
+        finally:
+            self.is_running = False
+            self._save_trace()
+            video_logger.info('Video generation completed')
+
+    def _profiled(self, name: str, stage: Callable) -> Callable:
+        def run_stage(**inputs):
+            with self.profiler.span(name, 'pipeline'):
+                return stage(**inputs)
+        return run_stage
+
+    def _save_trace(self) -> None:
+        if not self.profiler.enabled:
+            return
+        try:
+            trace_file = self.profiler.save(os.path.join(self.output_path, 'render_trace.json'))
+            self.profiler.log_summary()
+            video_logger.info('Render trace saved: %s', trace_file)
+        except OSError as e:
+            video_logger.warning('Failed to save render trace: %s', str(e))
+
+    def _process_images(self):
+        self._emit_status('正在处理图片素材...')
+        callback = self._ingest_progress_callback('images')
+        images = self.image_processor.process(self.image_path, callback)
+        if not images:
+            callback(0, 0)
+        return images
+
+    def _process_videos(self):
+        self._emit_status('正在处理视频素材...')
+        callback = self._ingest_progress_callback('videos')
+        video_clips = self.video_processor.process(self.video_path, callback)
+        if not video_clips:
+            callback(0, 0)
+        video_logger.info('Probe cache: %d hits, %d misses',
+                          self.probe_cache.hits, self.probe_cache.misses)
+        scene_detector = self.video_processor.scene_detector
+        if scene_detector is not None and scene_detector.cache is not None:
+            video_logger.info('Scene cache: %d hits, %d misses',
+                              scene_detector.cache.hits, scene_detector.cache.misses)
+        return video_clips
+
+    def _generate_audio(self):
+        self._emit_status('正在生成语音...')
+        os.makedirs(self.output_path, exist_ok=True)
+        audio_file = os.path.join(self.output_path, 'temp_audio.wav')
+        if self.checkpoint and self.checkpoint.completed('audio', files=('audio', 'timings')):
+            video_logger.info('Resuming from checkpoint, reusing narration: %s', audio_file)
+            self.progress.update('audio', 1, 1)
+            return audio_file
+        if self.checkpoint:
+            # 配音重新生成后字幕时间也随之失效
+            self.checkpoint.invalidate('audio', 'subtitle')
+        video_logger.info('Generating audio file: %s', audio_file)
+        success = asyncio.run(self.tts_provider.generate_speech(
+            self.script,
+            self.voice_name,
+            self.voice_speed,
+            audio_file,
+            self.progress.stage_callback('audio')
+        ))
+        if not success:
+            video_logger.error('Audio generation failed')
+            raise Exception('语音生成失败')
+        if self.checkpoint:
+            self.checkpoint.complete('audio', audio=RenderCheckpoint.file_entry(audio_file),
+                                     timings=RenderCheckpoint.file_entry(segment_timings_path(audio_file)))
+        return audio_file
+
+    def _generate_subtitle(self, images, videos, audio):
+        self._emit_status('正在生成字幕...')
+        resumed = self.checkpoint.completed('subtitle') if self.checkpoint else None
+        if resumed:
+            video_logger.info('Resuming from checkpoint, reusing %d subtitle cues', len(resumed['cues']))
+            subtitle = self.subtitle_generator.build_track(resumed['cues'])
+        else:
+            # 时间线按配音时长规划，字幕的兜底时长同样以配音为准
+            total_duration = audio_duration(audio) or sum(clip.duration for clip in images + videos)
+            subtitle = self.subtitle_generator.generate(self.script, total_duration, audio)
+            if self.checkpoint:
+                self.checkpoint.complete('subtitle', cues=subtitle.cues)
+        self.progress.update('subtitle', 1, 1)
+        return subtitle
+
+    def _compose(self, images, videos, audio, subtitle):
+        self._emit_status('正在合成最终视频...')
+        if self.checkpoint:
+            progress = self.checkpoint.stages.get('compose', {})
+            if progress.get('done'):
+                self.checkpoint.invalidate('compose')
+            elif progress:
+                video_logger.info('Resuming render after %d of %d encoded segments',
+                                  progress.get('segments_done', 0), progress.get('segments_total', 0))
+        output_file, success = self.video_composer.compose(
+            images + videos, subtitle, audio, self.progress.stage_callback('render'),
+            should_continue=lambda: self.is_running
+        )
+        if not success:
+            raise Exception('视频合成失败')
+        if self.checkpoint:
+            self.checkpoint.complete('compose', output=RenderCheckpoint.file_entry(output_file))
+            if not self.config.get('incremental_render', True):
+                shutil.rmtree(os.path.join(self.checkpoint_dir, 'segments'), ignore_errors=True)
+        return output_file
+
+    def _ingest_progress_callback(self, key: str):
+        """图片和视频并发加载，合并两者的文件数作为素材加载阶段的进度"""
+        def callback(done: int, total: int):
+            self._ingest_progress[key] = (done, total)
+            done_sum = sum(d for d, _ in self._ingest_progress.values())
+            total_sum = sum(t for _, t in self._ingest_progress.values())
+            # 两个文件夹都为空时才视为加载完成
+            if total_sum or len(self._ingest_progress) == 2:
+                self.progress.update('ingest', done_sum, total_sum)
+        return callback
+
+    def stop(self):
+        self.is_running = False
+        # 中止正在进行的语音合成请求
+        self.tts_provider.cancel()
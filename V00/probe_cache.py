@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from logger import video_logger
+from media_probe import probe_keyframes, probe_metadata
+
+# 计算部分内容哈希时读取的头尾字节数
+HASH_BLOCK_SIZE = 64 * 1024
+
+def partial_content_hash(file_path: str, file_size: int) -> str:
+    """对文件头尾各 64KB 和文件大小做哈希，避免读取整个大文件"""
+    digest = hashlib.sha1(str(file_size).encode('ascii'))
+    with open(file_path, 'rb') as f:
+        digest.update(f.read(HASH_BLOCK_SIZE))
+        if file_size > HASH_BLOCK_SIZE * 2:
+            f.seek(-HASH_BLOCK_SIZE, os.SEEK_END)
+            digest.update(f.read(HASH_BLOCK_SIZE))
+    return digest.hexdigest()
+
+class ProbeCache:
+    """跨运行的素材探测信息缓存
+
+    以 (路径, 大小, 修改时间) 快速命中；未命中时再按部分内容哈希查找，
+    因此移动或复制过的文件也无需重新探测。超过 max_entries 时按最近访问时间淘汰。
+    大文件切分所需的关键帧时间与探测信息存在同一条目中，命中时不再读取索引或启动 ffprobe。
+    """
+    _COLUMNS = ('duration', 'width', 'height', 'fps', 'codec', 'has_audio')
+
+    def __init__(self, db_path: str = os.path.join('cache', 'probe_cache.sqlite'), max_entries: int = 10000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS probes ('
+            ' content_hash TEXT PRIMARY KEY, path TEXT, size INTEGER, mtime_ns INTEGER,'
+            ' duration REAL, width INTEGER, height INTEGER, fps REAL, codec TEXT,'
+            ' has_audio INTEGER, last_access REAL, keyframes TEXT)'
+        )
+        # 旧版本创建的数据库没有关键帧列
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(probes)')]
+        if 'keyframes' not in columns:
+            self._conn.execute('ALTER TABLE probes ADD COLUMN keyframes TEXT')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS probes_path ON probes (path)')
+        self._conn.commit()
+
+    def _row_to_metadata(self, row) -> Dict:
+        metadata = dict(zip(self._COLUMNS, row))
+        metadata['has_audio'] = bool(metadata['has_audio'])
+        return metadata
+
+    def get(self, file_path: str) -> Optional[Dict]:
+        """查询缓存，文件已变化或不存在缓存时返回 None"""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        columns = ', '.join(self._COLUMNS)
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT content_hash, {columns} FROM probes WHERE path = ? AND size = ? AND mtime_ns = ?',
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        if row is None:
+            content_hash = partial_content_hash(path, stat.st_size)
+            with self._lock:
+                row = self._conn.execute(
+                    f'SELECT content_hash, {columns} FROM probes WHERE content_hash = ?',
+                    (content_hash,)
+                ).fetchone()
+            if row is None:
+                return None
+
+        with self._lock:
+            self._conn.execute(
+                'UPDATE probes SET path = ?, size = ?, mtime_ns = ?, last_access = ? WHERE content_hash = ?',
+                (path, stat.st_size, stat.st_mtime_ns, time.time(), row[0])
+            )
+            self._conn.commit()
+        return self._row_to_metadata(row[1:])
+
+    def put(self, file_path: str, metadata: Dict) -> None:
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        content_hash = partial_content_hash(path, stat.st_size)
+        values = [metadata.get(column) for column in self._COLUMNS]
+        values[-1] = int(bool(values[-1]))
+        with self._lock:
+            self._conn.execute('DELETE FROM probes WHERE path = ?', (path,))
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO probes (content_hash, path, size, mtime_ns, {", ".join(self._COLUMNS)},'
+                ' last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (content_hash, path, stat.st_size, stat.st_mtime_ns, *values, time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        count = self._conn.execute('SELECT COUNT(*) FROM probes').fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                'DELETE FROM probes WHERE content_hash IN '
+                '(SELECT content_hash FROM probes ORDER BY last_access ASC LIMIT ?)',
+                (count - self.max_entries,)
+            )
+            video_logger.info('Probe cache evicted %d entries', count - self.max_entries)
+
+    def probe(self, file_path: str) -> Optional[Dict]:
+        """优先从缓存读取探测信息，未命中时调用探测并写入缓存"""
+        metadata = self.get(file_path)
+        if metadata is not None:
+            self.hits += 1
+            return metadata
+        self.misses += 1
+        metadata = probe_metadata(file_path)
+        if metadata is not None:
+            self.put(file_path, metadata)
+        return metadata
+
+    def keyframes(self, file_path: str) -> Optional[List[float]]:
+        """优先从缓存读取关键帧时间，未命中时读取容器索引或调用 ffprobe
+
+        只为已缓存探测信息的文件（先调用 probe）保存关键帧；读取失败（例如未安装 ffprobe）时不缓存。
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT content_hash, keyframes FROM probes WHERE path = ? AND size = ? AND mtime_ns = ?',
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        if row is not None and row[1] is not None:
+            return json.loads(row[1])
+        keyframes = probe_keyframes(path)
+        if row is not None and keyframes is not None:
+            with self._lock:
+                self._conn.execute('UPDATE probes SET keyframes = ? WHERE content_hash = ?',
+                                   (json.dumps(keyframes), row[0]))
+                self._conn.commit()
+        return keyframes
+
+    def invalidate(self, file_path: str) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM probes WHERE path = ?', (os.path.abspath(file_path),))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM probes')
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
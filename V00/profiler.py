@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import psutil
+from logger import video_logger
+
+class Profiler:
+    """渲染流水线的结构化计时
+
+    每个 span 记录墙钟时间、线程 CPU 时间和结束时的常驻内存，
+    可以导出为 Chrome trace 格式（chrome://tracing 或 Perfetto 打开），也可以汇总为各阶段的统计。
+    """
+    enabled = True
+
+    def __init__(self, name: str = 'render', rss_interval: float = 0.2):
+        self.name = name
+        self.rss_interval = rss_interval
+        self.events: List[Dict] = []
+        self.peak_rss = 0
+        self._process = psutil.Process()
+        self._origin = time.perf_counter()
+        self._last_rss_sample = 0.0
+        self._lock = threading.Lock()
+
+    def sample_rss(self, force: bool = False) -> int:
+        """采样当前进程的常驻内存并更新峰值，默认每 rss_interval 秒最多采样一次"""
+        now = time.perf_counter()
+        if not force and now - self._last_rss_sample < self.rss_interval:
+            return self.peak_rss
+        self._last_rss_sample = now
+        rss = self._process.memory_info().rss
+        with self._lock:
+            self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def record(self, name: str, category: str, start: float, end: float,
+               cpu_seconds: Optional[float] = None, **args) -> None:
+        """记录一个已完成的区间，start/end 为 time.perf_counter() 的取值"""
+        if cpu_seconds is not None:
+            args['cpu_ms'] = round(cpu_seconds * 1000, 3)
+        args['rss_mb'] = round(self.sample_rss() / (1024 * 1024), 1)
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': round((start - self._origin) * 1e6, 1),
+            'dur': round((end - start) * 1e6, 1),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, category: str = 'stage', cpu: bool = True, **args):
+        """计时上下文；在 asyncio 中并发执行的协程应设置 cpu=False，因为线程 CPU 时间会包含其他协程"""
+        start = time.perf_counter()
+        cpu_start = time.thread_time() if cpu else None
+        try:
+            yield args
+        finally:
+            cpu_seconds = time.thread_time() - cpu_start if cpu else None
+            self.record(name, category, start, time.perf_counter(), cpu_seconds, **args)
+
+    def counter(self, name: str, **values) -> None:
+        event = {
+            'name': name,
+            'ph': 'C',
+            'ts': round((time.perf_counter() - self._origin) * 1e6, 1),
+            'pid': os.getpid(),
+            'args': values,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self) -> Dict:
+        """按 span 名称汇总调用次数、墙钟时间和 CPU 时间"""
+        stages: Dict[str, Dict] = {}
+        with self._lock:
+            events = [event for event in self.events if event['ph'] == 'X']
+        for event in events:
+            item = stages.setdefault(event['name'], {'count': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0, 'frames': 0})
+            item['count'] += 1
+            item['wall_ms'] += event['dur'] / 1000
+            item['cpu_ms'] += event['args'].get('cpu_ms', 0.0)
+            item['frames'] += event['args'].get('frames', 0)
+        for item in stages.values():
+            item['wall_ms'] = round(item['wall_ms'], 1)
+            item['cpu_ms'] = round(item['cpu_ms'], 1)
+            if not item['frames']:
+                del item['frames']
+            elif item['wall_ms']:
+                item['fps'] = round(item['frames'] / (item['wall_ms'] / 1000), 2)
+        self.sample_rss(force=True)
+        return {'name': self.name, 'peak_rss_mb': round(self.peak_rss / (1024 * 1024), 1), 'stages': stages}
+
+    def to_chrome_trace(self) -> Dict:
+        with self._lock:
+            events = list(self.events)
+        metadata = {'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'args': {'name': self.name}}
+        return {'traceEvents': [metadata] + events, 'displayTimeUnit': 'ms', 'otherData': self.summary()}
+
+    def save(self, trace_file: str) -> str:
+        os.makedirs(os.path.dirname(trace_file) or '.', exist_ok=True)
+        with open(trace_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f)
+        return trace_file
+
+    def log_summary(self) -> None:
+        summary = self.summary()
+        for name, item in sorted(summary['stages'].items(), key=lambda entry: -entry[1]['wall_ms']):
+            video_logger.info('Profile %s: %d calls, wall %.1fms, cpu %.1fms%s', name, item['count'],
+                              item['wall_ms'], item['cpu_ms'],
+                              f", {item['fps']} fps" if 'fps' in item else '')
+        video_logger.info('Profile peak RSS: %.1f MB', summary['peak_rss_mb'])
+
+class NullProfiler(Profiler):
+    """未启用性能分析时使用，所有记录操作都是空操作"""
+    enabled = False
+
+    def __init__(self):
+        self.events = []
+        self.peak_rss = 0
+
+    def sample_rss(self, force: bool = False) -> int:
+        return 0
+
+    def record(self, name: str, category: str, start: float, end: float,
+               cpu_seconds: Optional[float] = None, **args) -> None:
+        pass
+
+    @contextmanager
+    def span(self, name: str, category: str = 'stage', cpu: bool = True, **args):
+        yield args
+
+    def counter(self, name: str, **values) -> None:
+        pass
+
+    def summary(self) -> Dict:
+        return {'name': 'disabled', 'peak_rss_mb': 0.0, 'stages': {}}
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,423 @@
+import math
+import os
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from frame_pool import FRAME_POOL
+from logger import video_logger
+from media_probe import get_ffmpeg_binary
+from profiler import NULL_PROFILER, Profiler
+from segment_cache import SegmentCache, clip_signature, make_segment_key
+
+class RenderCancelled(Exception):
+    """渲染过程中 should_continue 返回 False"""
+
+def check_continue(should_continue: Optional[Callable[[], bool]]) -> None:
+    if should_continue is not None and not should_continue():
+        raise RenderCancelled('Render cancelled')
+
+def clip_readers(clip) -> List:
+    """片段使用的解码器，组合片段（如转场）包含各来源片段的解码器"""
+    readers = []
+    reader = getattr(clip, 'reader', None)
+    if reader is not None and hasattr(reader, 'close'):
+        readers.append(reader)
+    for source in getattr(clip, 'sources', ()):
+        readers.extend(clip_readers(source))
+    return readers
+
+def release_reader(clip, keep=None) -> None:
+    """关闭片段的解码进程，再次取帧时 moviepy 会自动重新打开
+
+    keep 为下一个片段，它仍要使用的解码器（如转场两侧共用的解码器）保持打开，避免重新打开和定位。
+    """
+    kept = clip_readers(keep) if keep is not None else []
+    for reader in clip_readers(clip):
+        if not any(reader is other for other in kept):
+            reader.close()
+
+def frame_count(duration: float, fps: float) -> int:
+    return max(int(math.ceil(duration * fps - 1e-6)), 0)
+
+def timeline_counts(clips: Sequence, fps: float, duration: Optional[float] = None) -> List[int]:
+    """每个片段在时间线上的帧数，指定 duration 时截断到该时长"""
+    counts = [frame_count(clip.duration, fps) for clip in clips]
+    if duration is not None:
+        limit = frame_count(duration, fps)
+        for index, count in enumerate(counts):
+            counts[index] = min(count, limit)
+            limit -= counts[index]
+    return counts
+
+def canvas_size(clips: Sequence) -> Tuple[int, int]:
+    """取所有片段中最大的宽和高作为画布尺寸（与 concatenate 的 compose 方式一致）"""
+    width = max(clip.size[0] for clip in clips)
+    height = max(clip.size[1] for clip in clips)
+    # libx264 + yuv420p 要求宽高为偶数
+    return width + width % 2, height + height % 2
+
+def _resolve_position(pos, canvas: Tuple[int, int], size: Tuple[int, int]) -> Tuple[int, int]:
+    if isinstance(pos, str):
+        pos = (pos, pos)
+    coords = []
+    for value, outer, inner in zip(pos, canvas, size):
+        if value in ('center', 'centre'):
+            value = (outer - inner) // 2
+        elif value in ('left', 'top'):
+            value = 0
+        elif value in ('right', 'bottom'):
+            value = outer - inner
+        coords.append(int(value))
+    return coords[0], coords[1]
+
+class StreamingRenderer:
+    """流式渲染引擎
+
+    按时间线顺序逐个片段取帧，将 RGB 原始数据直接写入一个常驻的 ffmpeg 编码进程。
+    同一时间只有当前片段的解码器处于打开状态，片段结束后立即释放。
+    画布缓冲从缓冲池取用，连续的帧直接以内存视图写入编码器管道，热循环中不再逐帧分配帧缓冲。
+    """
+    def __init__(self, output_file: str, size: Tuple[int, int], fps: float = 24,
+                 codec: str = 'libx264', audio_codec: str = 'aac',
+                 ffmpeg_params: Optional[List[str]] = None, profiler: Optional[Profiler] = None):
+        self.output_file = output_file
+        self.size = size
+        self.fps = fps
+        self.codec = codec
+        self.audio_codec = audio_codec
+        self.ffmpeg_params = ffmpeg_params or []
+        self.profiler = profiler or NULL_PROFILER
+        self._canvas: Optional[np.ndarray] = None
+
+    def _encoder_command(self, audio_path: Optional[str], duration: float) -> List[str]:
+        width, height = self.size
+        cmd = [
+            get_ffmpeg_binary(), '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-vcodec', 'rawvideo',
+            '-s', f'{width}x{height}', '-pix_fmt', 'rgb24', '-r', f'{self.fps}',
+            '-i', '-',
+        ]
+        if audio_path:
+            cmd += ['-i', audio_path, '-map', '0:v:0', '-map', '1:a:0', '-c:a', self.audio_codec]
+        cmd += ['-c:v', self.codec, '-pix_fmt', 'yuv420p', '-t', f'{duration:.3f}']
+        cmd += self.ffmpeg_params
+        cmd.append(self.output_file)
+        return cmd
+
+    def _canvas_buffer(self) -> np.ndarray:
+        if self._canvas is None:
+            width, height = self.size
+            self._canvas = FRAME_POOL.acquire((height, width, 3))
+        return self._canvas
+
+    def _release_canvas(self) -> None:
+        if self._canvas is not None:
+            FRAME_POOL.release(self._canvas)
+            self._canvas = None
+
+    def _write_frame(self, stream, frame: np.ndarray) -> None:
+        """连续的帧直接以内存视图写入，不经过 tobytes 复制；裁切视图等不连续的帧先复制到画布"""
+        if not frame.flags.c_contiguous:
+            canvas = self._canvas_buffer()
+            np.copyto(canvas, frame)
+            frame = canvas
+        stream.write(frame.data)
+
+    def _fit_to_canvas(self, frame: np.ndarray, copy: bool) -> np.ndarray:
+        if frame.ndim == 2:
+            frame = np.dstack([frame] * 3)
+        frame = frame[:, :, :3]
+        if frame.dtype != np.uint8:
+            frame = frame.astype(np.uint8)
+        height, width = frame.shape[:2]
+        if (width, height) == self.size:
+            if not copy:
+                return frame
+            canvas = self._canvas_buffer()
+            np.copyto(canvas, frame)
+            return canvas
+
+        # 尺寸不一致时居中放置：超出画布的部分裁掉，不足的部分补黑边
+        canvas_width, canvas_height = self.size
+        x, y = (canvas_width - width) // 2, (canvas_height - height) // 2
+        src = frame[max(-y, 0):max(-y, 0) + min(height, canvas_height),
+                    max(-x, 0):max(-x, 0) + min(width, canvas_width)]
+        if src.shape[:2] == (canvas_height, canvas_width) and not copy:
+            return src
+        y, x = max(y, 0), max(x, 0)
+        y1, x1 = y + src.shape[0], x + src.shape[1]
+        # 只清零黑边区域（上一帧或叠加层可能在黑边上绘制过），不重绘整块画布
+        canvas = self._canvas_buffer()
+        canvas[:y].fill(0)
+        canvas[y1:].fill(0)
+        canvas[y:y1, :x].fill(0)
+        canvas[y:y1, x1:].fill(0)
+        canvas[y:y1, x:x1] = src
+        return canvas
+
+    def _apply_overlay(self, frame: np.ndarray, overlay, t: float) -> None:
+        """叠加层可以是实现了 apply(frame, t) 的对象（如字幕轨道），也可以是 moviepy 片段"""
+        if hasattr(overlay, 'apply'):
+            overlay.apply(frame, t)
+        else:
+            self._blend_overlay(frame, overlay, t)
+
+    def _blend_overlay(self, frame: np.ndarray, overlay, t: float) -> None:
+        """只在叠加层的包围盒内进行 alpha 混合"""
+        local_t = t - overlay.start
+        if local_t < 0 or (overlay.duration is not None and local_t >= overlay.duration):
+            return
+        image = overlay.get_frame(local_t)[:, :, :3]
+        height, width = image.shape[:2]
+        x, y = _resolve_position(overlay.pos(local_t), self.size, (width, height))
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + width, self.size[0]), min(y + height, self.size[1])
+        if x1 <= x0 or y1 <= y0:
+            return
+
+        region = frame[y0:y1, x0:x1]
+        src = image[y0 - y:y1 - y, x0 - x:x1 - x]
+        if overlay.mask is None:
+            region[:] = src
+            return
+        alpha = overlay.mask.get_frame(local_t)[y0 - y:y1 - y, x0 - x:x1 - x, np.newaxis]
+        region[:] = (src * alpha + region * (1 - alpha)).astype(np.uint8)
+
+    def render(self, clips: Sequence, audio_path: Optional[str] = None, overlays: Sequence = (),
+               progress_callback: Optional[Callable[[int, int], None]] = None,
+               duration: Optional[float] = None, start_time: float = 0.0, release_readers: bool = True,
+               should_continue: Optional[Callable[[], bool]] = None) -> int:
+        """渲染时间线并返回写入的帧数
+
+        指定 duration 时超出部分的帧不会被解码；start_time 为该段在整体时间线中的起点，用于叠加层取时。
+        release_readers 为 False 时由调用方负责释放解码器。
+        每帧之前调用 should_continue，返回 False 时终止编码器并抛出 RenderCancelled。
+        """
+        counts = timeline_counts(clips, self.fps, duration)
+        total_frames = sum(counts)
+        duration = total_frames / self.fps
+        cmd = self._encoder_command(audio_path, duration)
+        video_logger.info('Starting streaming render: %d clips, %d frames, %dx%d',
+                          len(clips), total_frames, *self.size)
+
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        written = 0
+        profiling = self.profiler.enabled
+        clock = time.perf_counter
+        try:
+            for position, (clip, count) in enumerate(zip(clips, counts)):
+                timeline_start = start_time + written / self.fps
+                # 每帧只累加计时，每个片段记录一条 trace，避免逐帧事件撑大 trace 文件
+                clip_start = clock()
+                cpu_start = time.thread_time()
+                decode = composite = write = 0.0
+                for index in range(count):
+                    check_continue(should_continue)
+                    t0 = clock()
+                    image = clip.get_frame(index / self.fps)
+                    t1 = clock()
+                    frame = self._fit_to_canvas(image, copy=bool(overlays))
+                    for overlay in overlays:
+                        self._apply_overlay(frame, overlay, timeline_start + index / self.fps)
+                    t2 = clock()
+                    self._write_frame(process.stdin, frame)
+                    if profiling:
+                        t3 = clock()
+                        decode += t1 - t0
+                        composite += t2 - t1
+                        write += t3 - t2
+                    written += 1
+                    if progress_callback:
+                        progress_callback(written, total_frames)
+                # 当前片段结束后立即释放下一个片段不再使用的解码器
+                if release_readers:
+                    release_reader(clip, clips[position + 1] if position + 1 < len(clips) else None)
+                if profiling and count:
+                    elapsed = clock() - clip_start
+                    self.profiler.record(
+                        'render_clip', 'render', clip_start, clip_start + elapsed,
+                        time.thread_time() - cpu_start, frames=count,
+                        clip=os.path.basename(getattr(clip, 'filename', None) or type(clip).__name__),
+                        decode_ms=round(decode * 1000, 1), composite_ms=round(composite * 1000, 1),
+                        encoder_write_ms=round(write * 1000, 1)
+                    )
+                    self.profiler.counter('render_fps', fps=round(count / max(elapsed, 1e-9), 2))
+            process.stdin.close()
+        except BrokenPipeError:
+            # 编码进程提前退出，错误信息从 stderr 读取
+            pass
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            # 画布归还缓冲池，供下一个分段或任务复用
+            self._release_canvas()
+
+        # 等待编码器处理完管道中剩余的帧
+        with self.profiler.span('encoder_flush', 'render'):
+            stderr = process.stderr.read().decode('utf-8', errors='replace')
+            process.stderr.close()
+            return_code = process.wait()
+
+        if return_code != 0:
+            raise RuntimeError(f'ffmpeg encoder failed ({return_code}): {stderr.strip()}')
+        video_logger.info('Streaming render finished: %s (%d frames)', self.output_file, written)
+        return written
+
+class SegmentedRenderer:
+    """增量渲染引擎
+
+    时间线按片段边界（长片段再按 segment_seconds）切分为独立编码的分段，每个分段都以关键帧开始。
+    分段键由片段内容、字幕和编码参数的哈希组成，未变化的分段直接从缓存复用，
+    最后用 concat 无损拼接视频流并混入配音。
+    """
+    def __init__(self, output_file: str, size: Tuple[int, int], cache: SegmentCache, fps: float = 24,
+                 codec: str = 'libx264', audio_codec: str = 'aac',
+                 ffmpeg_params: Optional[List[str]] = None, audio_params: Optional[List[str]] = None,
+                 segment_seconds: float = 10.0, profiler: Optional[Profiler] = None,
+                 on_segment: Optional[Callable[[int, int, bool], None]] = None):
+        self.output_file = output_file
+        self.size = size
+        self.cache = cache
+        self.fps = fps
+        self.codec = codec
+        self.audio_codec = audio_codec
+        self.ffmpeg_params = ffmpeg_params or []
+        self.audio_params = audio_params or []
+        self.segment_frames = max(int(round(segment_seconds * fps)), 1)
+        self.profiler = profiler or NULL_PROFILER
+        self.on_segment = on_segment
+        self.reused = 0
+        self.encoded = 0
+        # 最近一次渲染中实际编码的帧数，不含从缓存复用的分段
+        self.encoded_frames = 0
+
+    def plan_segments(self, clips: Sequence, overlays: Sequence = (),
+                      duration: Optional[float] = None) -> List[Dict]:
+        """切分时间线并计算每个分段的键，无法签名的分段键为 None（总是重新编码）"""
+        segments = []
+        position = 0
+        for clip, count in zip(clips, timeline_counts(clips, self.fps, duration)):
+            signature = clip_signature(clip)
+            for first in range(0, count, self.segment_frames):
+                frames = min(self.segment_frames, count - first)
+                start, end = (position + first) / self.fps, (position + first + frames) / self.fps
+                overlay_signatures = [
+                    overlay.signature(start, end, self.fps) if hasattr(overlay, 'signature') else None
+                    for overlay in overlays
+                ]
+                key = None
+                if signature is not None and None not in overlay_signatures:
+                    key = make_segment_key([
+                        signature, first, frames, self.fps, list(self.size),
+                        self.codec, self.ffmpeg_params, overlay_signatures,
+                    ])
+                segments.append({'clip': clip, 'first': first, 'frames': frames, 'start': start, 'key': key})
+            position += count
+        return segments
+
+    def _encode_segment(self, segment: Dict, overlays: Sequence, output_file: str,
+                        progress: Optional[Callable[[int], None]],
+                        should_continue: Optional[Callable[[], bool]] = None) -> None:
+        clip = segment['clip']
+        piece = clip.subclip(segment['first'] / self.fps, (segment['first'] + segment['frames']) / self.fps)
+        renderer = StreamingRenderer(output_file, self.size, fps=self.fps, codec=self.codec,
+                                     ffmpeg_params=self.ffmpeg_params, profiler=self.profiler)
+        renderer.render([piece], overlays=overlays, duration=segment['frames'] / self.fps,
+                        start_time=segment['start'], release_readers=False, should_continue=should_continue,
+                        progress_callback=(lambda done, total: progress(done)) if progress else None)
+
+    def _concat(self, segment_files: List[str], audio_path: Optional[str], duration: float) -> None:
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+            for path in segment_files:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+            list_file = f.name
+        try:
+            cmd = [get_ffmpeg_binary(), '-y', '-loglevel', 'error',
+                   '-f', 'concat', '-safe', '0', '-i', list_file]
+            if audio_path:
+                cmd += ['-i', audio_path, '-map', '0:v:0', '-map', '1:a:0', '-c:a', self.audio_codec]
+                cmd += self.audio_params
+            cmd += ['-c:v', 'copy', '-t', f'{duration:.3f}', self.output_file]
+            result = subprocess.run(cmd, capture_output=True)
+            if result.returncode != 0:
+                stderr = result.stderr.decode('utf-8', errors='replace').strip()
+                raise RuntimeError(f'ffmpeg concat failed ({result.returncode}): {stderr}')
+        finally:
+            os.remove(list_file)
+
+    def render(self, clips: Sequence, audio_path: Optional[str] = None, overlays: Sequence = (),
+               progress_callback: Optional[Callable[[int, int], None]] = None,
+               duration: Optional[float] = None, should_continue: Optional[Callable[[], bool]] = None) -> int:
+        """渲染时间线并返回总帧数，只有内容变化的分段会被解码和编码
+
+        每个分段和编码中的每帧之前调用 should_continue，返回 False 时抛出 RenderCancelled，不再拼接。
+        """
+        segments = self.plan_segments(clips, overlays, duration)
+        total_frames = sum(segment['frames'] for segment in segments)
+        done = 0
+        segment_files = []
+        temp_files = []
+        # get/put 登记为使用中的分段，拼接完成后才释放，期间并发任务的淘汰不会删除它们
+        leased = []
+        self.reused = self.encoded = self.encoded_frames = 0
+        try:
+            for index, segment in enumerate(segments):
+                check_continue(should_continue)
+                key = segment['key']
+                cached = self.cache.get(key) if key else None
+                if cached:
+                    self.reused += 1
+                    segment_files.append(cached)
+                    leased.append(key)
+                    done += segment['frames']
+                    if progress_callback:
+                        progress_callback(done, total_frames)
+                    if self.on_segment:
+                        self.on_segment(index, len(segments), True)
+                    continue
+
+                if key:
+                    output_file = self.cache.temp_path(key)
+                else:
+                    output_file = f'{os.path.splitext(self.output_file)[0]}.part{index:05d}.mp4'
+                temp_files.append(output_file)
+                base = done
+                self._encode_segment(
+                    segment, overlays, output_file,
+                    (lambda written: progress_callback(base + written, total_frames)) if progress_callback else None,
+                    should_continue
+                )
+                if key:
+                    output_file = self.cache.put(key, output_file)
+                    leased.append(key)
+                segment_files.append(output_file)
+                self.encoded += 1
+                self.encoded_frames += segment['frames']
+                done += segment['frames']
+                if self.on_segment:
+                    self.on_segment(index, len(segments), False)
+                # 片段的最后一个分段完成后释放下一个片段不再使用的解码器
+                if index + 1 == len(segments):
+                    release_reader(segment['clip'])
+                elif segments[index + 1]['clip'] is not segment['clip']:
+                    release_reader(segment['clip'], segments[index + 1]['clip'])
+
+            check_continue(should_continue)
+            with self.profiler.span('concat_segments', 'render', segments=len(segment_files)):
+                self._concat(segment_files, audio_path, total_frames / self.fps)
+        finally:
+            for path in temp_files:
+                if os.path.exists(path):
+                    os.remove(path)
+            self.cache.release(leased)
+        # 本次渲染用到的分段保留，下次重新渲染时直接复用
+        self.cache.evict(keep=set(leased))
+        self.profiler.counter('segments', encoded=self.encoded, reused=self.reused)
+        video_logger.info('Segmented render finished: %s (%d frames, %d segments encoded, %d reused)',
+                          self.output_file, total_frames, self.encoded, self.reused)
+        return total_frames
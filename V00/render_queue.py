@@ -0,0 +1,292 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from logger import video_logger
+from memory_manager import available_memory_mb
+
+# 任务状态
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+class JobQueue:
+    """持久化的渲染任务队列
+
+    任务保存在 SQLite 中，程序重启后未完成的任务会重新排队。
+    每个任务拥有独立的工作目录，配音、成片和临时文件互不覆盖。
+    """
+    _COLUMNS = ('id', 'name', 'script', 'image_path', 'video_path', 'config', 'status',
+                'workdir', 'output', 'error', 'created', 'started', 'finished')
+
+    def __init__(self, db_path: str = os.path.join('cache', 'render_queue.sqlite'),
+                 work_root: str = os.path.join('output', 'jobs')):
+        self.db_path = db_path
+        self.work_root = work_root
+        # 进度和状态文本只保存在内存中，避免频繁写库
+        self.progress: Dict[int, int] = {}
+        self.status_text: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, script TEXT, image_path TEXT,'
+            ' video_path TEXT, config TEXT, status TEXT, workdir TEXT, output TEXT, error TEXT,'
+            ' created REAL, started REAL, finished REAL)'
+        )
+        self._conn.commit()
+        self.recover()
+
+    def _row_to_job(self, row) -> Dict:
+        job = dict(zip(self._COLUMNS, row))
+        job['config'] = json.loads(job['config'] or '{}')
+        job['progress'] = self.progress.get(job['id'], 100 if job['status'] == DONE else 0)
+        job['status_text'] = self.status_text.get(job['id'], '')
+        return job
+
+    def recover(self) -> None:
+        """上次运行中断的任务重新排队"""
+        with self._lock:
+            count = self._conn.execute(
+                'UPDATE jobs SET status = ?, started = NULL WHERE status = ?', (PENDING, RUNNING)
+            ).rowcount
+            self._conn.commit()
+        if count:
+            video_logger.info('Requeued %d interrupted render jobs', count)
+
+    def submit(self, script: str, image_path: str, video_path: str, name: Optional[str] = None,
+               config: Optional[Dict] = None) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO jobs (name, script, image_path, video_path, config, status, created)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (name, script, image_path, video_path, json.dumps(config or {}, ensure_ascii=False),
+                 PENDING, time.time())
+            )
+            job_id = cursor.lastrowid
+            name = name or f'job{job_id}'
+            # 工作目录名只保留安全字符
+            safe_name = re.sub(r'[^\w\-]+', '_', name)
+            workdir = os.path.join(self.work_root, f'{job_id:05d}_{safe_name}')
+            self._conn.execute('UPDATE jobs SET name = ?, workdir = ? WHERE id = ?', (name, workdir, job_id))
+            self._conn.commit()
+        video_logger.info('Queued render job %d (%s)', job_id, name)
+        return job_id
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {", ".join(self._COLUMNS)} FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list_jobs(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(f'SELECT {", ".join(self._COLUMNS)} FROM jobs ORDER BY id').fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def claim_next(self) -> Optional[Dict]:
+        """取出最早提交的等待任务并标记为运行中"""
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {", ".join(self._COLUMNS)} FROM jobs WHERE status = ? ORDER BY id LIMIT 1', (PENDING,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE jobs SET status = ?, started = ? WHERE id = ?',
+                               (RUNNING, time.time(), row[0]))
+            self._conn.commit()
+        job = self._row_to_job(row)
+        job['status'] = RUNNING
+        return job
+
+    def _finish(self, job_id: int, status: str, output: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, output = ?, error = ?, finished = ? WHERE id = ?',
+                (status, output, error, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def complete(self, job_id: int, output: str) -> None:
+        self.progress[job_id] = 100
+        self._finish(job_id, DONE, output=output)
+
+    def fail(self, job_id: int, error: str) -> None:
+        self._finish(job_id, FAILED, error=error)
+
+    def cancel(self, job_id: int) -> bool:
+        """取消等待中的任务；运行中的任务需由调度器停止"""
+        with self._lock:
+            count = self._conn.execute(
+                'UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status = ?',
+                (CANCELLED, time.time(), job_id, PENDING)
+            ).rowcount
+            self._conn.commit()
+        return bool(count)
+
+    def mark_cancelled(self, job_id: int) -> None:
+        self._finish(job_id, CANCELLED)
+
+    def clear_finished(self) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM jobs WHERE status IN (?, ?, ?)', (DONE, FAILED, CANCELLED))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class RenderScheduler:
+    """按 CPU 核数和可用内存调度渲染任务
+
+    同时运行的任务数不超过 max_jobs（默认按每个任务占用 cores_per_job 个核心计算），
+    且只有在可用内存扣除 threshold_mb 保留量和刚启动任务的预留后仍有 memory_per_job_mb 时才启动新任务。
+    """
+    def __init__(self, queue: JobQueue, config: Optional[Dict] = None, max_jobs: Optional[int] = None,
+                 cores_per_job: int = 4, memory_per_job_mb: float = 1500, threshold_mb: float = 1000,
+                 warmup_seconds: float = 15.0, poll_interval: float = 1.0,
+                 on_update: Optional[Callable[[int], None]] = None):
+        self.queue = queue
+        self.config = config or {}
+        self.max_jobs = max_jobs or max(1, (os.cpu_count() or 1) // max(cores_per_job, 1))
+        self.memory_per_job_mb = memory_per_job_mb
+        self.threshold_mb = threshold_mb
+        self.warmup_seconds = warmup_seconds
+        self.poll_interval = poll_interval
+        self.on_update = on_update
+        self._running: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._probe_cache = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='render-scheduler', daemon=True)
+            self._thread.start()
+            video_logger.info('Render scheduler started with up to %d concurrent jobs', self.max_jobs)
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def stop(self, wait: bool = True) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        with self._lock:
+            pipelines = [entry['pipeline'] for entry in self._running.values() if entry.get('pipeline')]
+        for pipeline in pipelines:
+            pipeline.stop()
+        if wait and self._thread is not None:
+            self._thread.join()
+            for entry in list(self._running.values()):
+                entry['thread'].join()
+
+    @property
+    def running_jobs(self) -> List[int]:
+        with self._lock:
+            return list(self._running)
+
+    def _memory_reserved_mb(self) -> float:
+        """刚启动的任务尚未达到峰值内存，为其预留内存"""
+        now = time.time()
+        with self._lock:
+            warming = sum(1 for entry in self._running.values() if now - entry['started'] < self.warmup_seconds)
+        return warming * self.memory_per_job_mb
+
+    def can_start(self) -> bool:
+        with self._lock:
+            if len(self._running) >= self.max_jobs:
+                return False
+        headroom = available_memory_mb() - self.threshold_mb - self._memory_reserved_mb()
+        return headroom >= self.memory_per_job_mb
+
+    def _loop(self) -> None:
+        while not self._stopped.is_set():
+            while not self._stopped.is_set() and self.can_start():
+                job = self.queue.claim_next()
+                if job is None:
+                    break
+                self._launch(job)
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _launch(self, job: Dict) -> None:
+        entry = {'started': time.time(), 'pipeline': None}
+        thread = threading.Thread(target=self._run_job, args=(job, entry), name=f'render-job-{job["id"]}', daemon=True)
+        entry['thread'] = thread
+        with self._lock:
+            self._running[job['id']] = entry
+        video_logger.info('Starting render job %d (%s), %d running', job['id'], job['name'], len(self._running))
+        thread.start()
+
+    def _notify(self, job_id: int) -> None:
+        if self.on_update:
+            self.on_update(job_id)
+
+    def _run_job(self, job: Dict, entry: Dict) -> None:
+        from pipeline import VideoPipeline, create_probe_cache
+
+        job_id = job['id']
+
+        def on_progress(value: int):
+            self.queue.progress[job_id] = value
+            self._notify(job_id)
+
+        def on_status(status: str):
+            self.queue.status_text[job_id] = status
+            self._notify(job_id)
+
+        try:
+            with self._lock:
+                if self._probe_cache is None:
+                    self._probe_cache = create_probe_cache(self.config)
+            pipeline = VideoPipeline(
+                job['script'], job['image_path'], job['video_path'],
+                dict(self.config, **job['config']), job['workdir'],
+                progress_callback=on_progress, status_callback=on_status,
+                probe_cache=self._probe_cache, temp_dir=os.path.join(job['workdir'], 'temp')
+            )
+            entry['pipeline'] = pipeline
+            if entry.get('cancelled'):
+                raise RuntimeError('任务已取消')
+            output_file = pipeline.run()
+            # 取消时流水线可能已经完成，不再记为完成
+            if entry.get('cancelled'):
+                raise RuntimeError('任务已取消')
+            self.queue.complete(job_id, output_file)
+            video_logger.info('Render job %d finished: %s', job_id, output_file)
+        except Exception as e:
+            if entry.get('cancelled') or self._stopped.is_set():
+                self.queue.mark_cancelled(job_id)
+            else:
+                self.queue.fail(job_id, str(e))
+                video_logger.error('Render job %d failed: %s', job_id, str(e))
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+            self._notify(job_id)
+            self.wake()
+
+    def cancel(self, job_id: int) -> bool:
+        """取消等待中或运行中的任务"""
+        if self.queue.cancel(job_id):
+            self._notify(job_id)
+            return True
+        with self._lock:
+            entry = self._running.get(job_id)
+        if entry is None:
+            return False
+        entry['cancelled'] = True
+        if entry.get('pipeline'):
+            entry['pipeline'].stop()
+        return True
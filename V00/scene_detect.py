@@ -0,0 +1,222 @@
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from logger import video_logger
+from media_probe import get_ffmpeg_binary
+from profiler import NULL_PROFILER, Profiler
+
+# 每个颜色通道的直方图分箱数，联合直方图共 HIST_BINS ** 3 个分箱
+HIST_BINS = 4
+# 亮度均值低于或高于该值的采样帧视为黑场或过曝
+DARK_LEVEL = 20
+BRIGHT_LEVEL = 235
+# 相邻采样帧平均亮度差达到该值（0~1）时运动得分记满
+FULL_MOTION = 0.08
+# 采样帧亮度标准差达到该值时对比度得分记满
+FULL_CONTRAST = 64.0
+
+def read_thumbnails(file_path: str, fps: float, size: Tuple[int, int]) -> np.ndarray:
+    """由 ffmpeg 按 fps 抽帧并直接缩小到 size，返回 (帧数, 高, 宽, 3) 的 uint8 数组
+
+    缩放在解码进程内完成，管道中只传输缩略图，第 k 帧对应素材的 k / fps 秒。
+    """
+    width, height = size
+    result = subprocess.run(
+        [get_ffmpeg_binary(), '-v', 'error', '-i', file_path, '-an', '-sn',
+         '-vf', f'fps={fps},scale={width}:{height}:flags=area',
+         '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+    )
+    frame_bytes = width * height * 3
+    count = len(result.stdout) // frame_bytes
+    if result.returncode != 0 and not count:
+        raise OSError(result.stderr.decode('utf-8', 'replace').strip() or f'ffmpeg exited with {result.returncode}')
+    return np.frombuffer(result.stdout, dtype=np.uint8, count=count * frame_bytes).reshape(count, height, width, 3)
+
+def frame_histograms(frames: np.ndarray) -> np.ndarray:
+    """所有帧的归一化联合颜色直方图，一次 bincount 完成"""
+    shift = 8 - int(np.log2(HIST_BINS))
+    quantized = (frames >> shift).astype(np.int32)
+    bins = quantized[..., 0] * HIST_BINS * HIST_BINS + quantized[..., 1] * HIST_BINS + quantized[..., 2]
+    count = len(frames)
+    bins = bins.reshape(count, -1) + (np.arange(count, dtype=np.int32) * HIST_BINS ** 3)[:, None]
+    histograms = np.bincount(bins.ravel(), minlength=count * HIST_BINS ** 3).reshape(count, -1)
+    return histograms / max(bins.shape[1], 1)
+
+def frame_scores(frames: np.ndarray) -> Dict[str, np.ndarray]:
+    """逐帧统计：相邻帧直方图差（0~1）、相邻帧平均亮度差（0~1）、亮度均值和标准差
+
+    两种差值的第 i 项是第 i 帧与第 i + 1 帧之间的差。
+    """
+    gray = frames.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    histograms = frame_histograms(frames)
+    flat = gray.reshape(len(frames), -1)
+    return {
+        'hist_diff': 0.5 * np.abs(np.diff(histograms, axis=0)).sum(axis=1),
+        'pixel_diff': np.abs(np.diff(flat, axis=0)).mean(axis=1) / 255.0,
+        'brightness': flat.mean(axis=1),
+        'contrast': flat.std(axis=1),
+    }
+
+def find_shots(scores: Dict[str, np.ndarray], fps: float, threshold: float,
+               min_shot_seconds: float) -> List[Tuple[int, int]]:
+    """按直方图差超过阈值的位置切分镜头，返回采样帧区间 [start, end) 的列表
+
+    间隔不足 min_shot_seconds 的切点（闪光、快速晃动）合并到前一个镜头。
+    """
+    count = len(scores['brightness'])
+    if count == 0:
+        return []
+    min_frames = max(int(round(min_shot_seconds * fps)), 1)
+    shots = []
+    start = 0
+    for cut in np.flatnonzero(scores['hist_diff'] > threshold) + 1:
+        if cut - start >= min_frames and count - cut >= min_frames:
+            shots.append((start, int(cut)))
+            start = int(cut)
+    shots.append((start, count))
+    return shots
+
+def score_shot(scores: Dict[str, np.ndarray], start: int, end: int) -> float:
+    """镜头得分（0~1）：对比度和运动量各占一半，按黑场或过曝帧的比例扣减"""
+    brightness = scores['brightness'][start:end]
+    contrast = min(float(scores['contrast'][start:end].mean()) / FULL_CONTRAST, 1.0)
+    # 镜头内部相邻帧的差值，不含进入镜头时的切换
+    motion_diff = scores['pixel_diff'][start:end - 1]
+    motion = min(float(motion_diff.mean()) / FULL_MOTION, 1.0) if len(motion_diff) else 0.0
+    usable = float(((brightness >= DARK_LEVEL) & (brightness <= BRIGHT_LEVEL)).mean())
+    return round((0.5 * contrast + 0.5 * motion) * usable, 4)
+
+class SceneCache:
+    """跨运行的镜头检测结果缓存
+
+    以 (路径, 大小, 修改时间, 检测参数) 命中，素材未变化时重新运行无需再次解码。
+    缓存的是每个文件的全部镜头和得分，改变选取的片段数或片段时长不会使缓存失效。
+    """
+    def __init__(self, db_path: str = os.path.join('cache', 'scene_cache.sqlite'), max_entries: int = 10000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS scenes ('
+            ' path TEXT, params TEXT, size INTEGER, mtime_ns INTEGER, shots TEXT, last_access REAL,'
+            ' PRIMARY KEY (path, params))'
+        )
+        self._conn.commit()
+
+    def get(self, file_path: str, params: str) -> Optional[List[Dict]]:
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT shots FROM scenes WHERE path = ? AND params = ? AND size = ? AND mtime_ns = ?',
+                (path, params, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute('UPDATE scenes SET last_access = ? WHERE path = ? AND params = ?',
+                               (time.time(), path, params))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, file_path: str, params: str, shots: List[Dict]) -> None:
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO scenes VALUES (?, ?, ?, ?, ?, ?)',
+                (path, params, stat.st_size, stat.st_mtime_ns, json.dumps(shots), time.time())
+            )
+            count = self._conn.execute('SELECT COUNT(*) FROM scenes').fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    'DELETE FROM scenes WHERE rowid IN (SELECT rowid FROM scenes ORDER BY last_access ASC LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+                video_logger.info('Scene cache evicted %d entries', count - self.max_entries)
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class SceneDetector:
+    """视频素材的镜头检测与片段选取
+
+    每个文件只由 ffmpeg 以 sample_fps 抽取 thumb_size 的缩略图，所有采样帧的直方图差、亮度差、
+    对比度一次性用 NumPy 向量化计算。analyze 在 VideoProcessor 的加载线程池中按文件并发调用
+    （解码在 ffmpeg 子进程中，NumPy 运算释放 GIL）。检测结果按文件缓存，
+    select 在所有文件的镜头中按得分选出最好的若干片段。
+    """
+    def __init__(self, sample_fps: float = 2.0, thumb_size: Tuple[int, int] = (64, 36),
+                 threshold: float = 0.35, min_shot_seconds: float = 1.0,
+                 max_segments: int = 8, segment_seconds: float = 5.0,
+                 cache: Optional[SceneCache] = None, profiler: Optional[Profiler] = None):
+        self.sample_fps = sample_fps
+        self.thumb_size = tuple(thumb_size)
+        self.threshold = threshold
+        self.min_shot_seconds = min_shot_seconds
+        self.max_segments = max_segments
+        self.segment_seconds = segment_seconds
+        self.cache = cache
+        self.profiler = profiler or NULL_PROFILER
+        # 影响检测结果的参数，作为缓存键的一部分
+        self.params = json.dumps([sample_fps, list(self.thumb_size), threshold, min_shot_seconds])
+
+    def analyze(self, file_path: str) -> List[Dict]:
+        """检测单个文件的镜头，返回按时间排序的 {'start', 'end', 'score'} 列表（秒）"""
+        if self.cache is not None:
+            shots = self.cache.get(file_path, self.params)
+            if shots is not None:
+                return shots
+        with self.profiler.span('scene_detect', 'ingest', file=os.path.basename(file_path)):
+            frames = read_thumbnails(file_path, self.sample_fps, self.thumb_size)
+            scores = frame_scores(frames) if len(frames) else None
+            shots = [
+                {'start': start / self.sample_fps, 'end': end / self.sample_fps,
+                 'score': score_shot(scores, start, end)}
+                for start, end in (find_shots(scores, self.sample_fps, self.threshold, self.min_shot_seconds)
+                                   if scores is not None else [])
+            ]
+        video_logger.debug('Detected %d shots in %s from %d sampled frames',
+                           len(shots), os.path.basename(file_path), len(frames))
+        if self.cache is not None:
+            self.cache.put(file_path, self.params, shots)
+        return shots
+
+    def select(self, shots_per_file: Sequence[Sequence[Dict]],
+               durations: Optional[Sequence[float]] = None) -> List[Tuple[int, float, float]]:
+        """在所有文件的镜头中选出得分最高的 max_segments 个，返回按文件和时间排序的 (文件序号, 开始, 结束)
+
+        每个片段取镜头中间最多 segment_seconds 秒，避开镜头首尾可能残留的转场帧；
+        durations 给出时片段结束时间不超过素材时长（采样帧的时间按 1 / sample_fps 取整）。
+        """
+        candidates = [
+            (shot['score'], index, shot)
+            for index, shots in enumerate(shots_per_file) for shot in shots
+        ]
+        # 得分相同时保留原有顺序，结果可复现
+        candidates.sort(key=lambda item: -item[0])
+        selected = []
+        for _, index, shot in candidates[:self.max_segments]:
+            end = shot['end'] if durations is None else min(shot['end'], durations[index])
+            length = min(end - shot['start'], self.segment_seconds)
+            if length <= 0:
+                continue
+            start = shot['start'] + (end - shot['start'] - length) / 2
+            selected.append((index, start, start + length))
+        selected.sort()
+        return selected
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Iterable, List, Optional
+from cache_leases import leases_for
+from logger import video_logger
+
+def record_edit(clip, parent, *operation):
+    """在派生片段上记录相对源素材的编辑操作（裁切、变速、改时长），用于计算分段键"""
+    clip.edit_ops = tuple(getattr(parent, 'edit_ops', ())) + (tuple(operation),)
+    return clip
+
+def clip_signature(clip) -> Optional[List]:
+    """片段的内容签名：源文件、文件状态、输出尺寸和编辑操作
+
+    组合片段（如转场）由各来源片段的签名和自身的编辑操作组成。
+    不是来自文件的片段（如纯色片段）无法判断内容是否变化，返回 None。
+    """
+    sources = getattr(clip, 'sources', None)
+    if sources:
+        signatures = [clip_signature(source) for source in sources]
+        if None in signatures:
+            return None
+        return [signatures, list(clip.size), round(clip.duration, 6),
+                [list(operation) for operation in getattr(clip, 'edit_ops', ())]]
+    filename = getattr(clip, 'filename', None)
+    if not filename:
+        return None
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return [
+        os.path.abspath(filename), stat.st_size, stat.st_mtime_ns,
+        list(clip.size), round(clip.duration, 6),
+        [list(operation) for operation in getattr(clip, 'edit_ops', ())],
+    ]
+
+def make_segment_key(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+class SegmentCache:
+    """已编码时间线分段的缓存
+
+    每个分段独立编码（以关键帧开始），按输入内容的哈希命名，
+    重新渲染时未变化的分段直接复用，总大小超过 max_bytes 时按最近使用时间淘汰。
+    进程被杀死时正在编码的临时文件会残留，超过 stale_seconds 后在淘汰时删除。
+    get 命中和 put 写入的分段登记为使用中，直到调用方 release；同一目录的所有缓存对象共用登记，
+    并发任务的淘汰不会删除其他任务已取得、尚未拼接的分段。
+    """
+    stale_seconds = 3600
+    def __init__(self, cache_dir: str = os.path.join('cache', 'segments'), max_bytes: int = 2048 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.leases = leases_for(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def segment_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.mp4')
+
+    def get(self, key: str) -> Optional[str]:
+        """命中时返回分段路径并登记为使用中，用完后需要 release"""
+        path = self.segment_path(key)
+        # 先登记再检查：登记后的分段不会再被淘汰，检查时已被删除则视为未命中
+        self.leases.acquire(key)
+        try:
+            # 更新访问时间，用于 LRU 淘汰
+            os.utime(path)
+        except FileNotFoundError:
+            self.leases.release([key])
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def temp_path(self, key: str) -> str:
+        path = self.segment_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f'{path[:-len(".mp4")]}.{uuid.uuid4().hex}.tmp.mp4'
+
+    def put(self, key: str, encoded_file: str) -> str:
+        """写入分段并登记为使用中，用完后需要 release"""
+        path = self.segment_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.leases.acquire(key)
+        os.replace(encoded_file, path)
+        return path
+
+    def release(self, keys: Iterable[str]) -> None:
+        """释放 get/put 登记的分段，每次登记对应一次释放"""
+        self.leases.release(keys)
+
+    def evict(self, keep: Optional[set] = None) -> None:
+        """总大小超过预算时删除最久未使用的分段
+
+        keep 中的分段和任一任务登记为使用中的分段不会被删除。
+        """
+        keep = keep or set()
+        with self._lock, self.leases.hold():
+            entries = []
+            total = 0
+            for root, _, files in os.walk(self.cache_dir):
+                for file in files:
+                    if not file.endswith('.mp4'):
+                        continue
+                    path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(path)
+                        if file.endswith('.tmp.mp4'):
+                            if time.time() - stat.st_mtime > self.stale_seconds:
+                                os.remove(path)
+                            continue
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            removed = 0
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                key = os.path.basename(path)[:-len('.mp4')]
+                if key in keep or self.leases.in_use(key):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    video_logger.warning('Failed to evict segment %s: %s', path, str(e))
+                    continue
+                total -= size
+                removed += 1
+            video_logger.info('Segment cache evicted %d segments, %d bytes remaining', removed, total)
@@ -1,3 +1,4 @@
+import os
 from setuptools import setup, find_packages
 
 setup(
@@ -10,6 +11,12 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/username/video-editor-assistant",
     packages=find_packages(),
+    # 项目模块位于根目录，需逐个声明才能被命令行入口导入
+    py_modules=[
+        os.path.splitext(name)[0]
+        for name in os.listdir(os.path.dirname(os.path.abspath(__file__)))
+        if name.endswith('.py') and name != 'setup.py'
+    ],
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -23,7 +30,7 @@ setup(
     ],
     entry_points={
         'console_scripts': [
-            'video-editor=main:main',
+            'video-editor=cli:main',
         ],
     },
     include_package_data=True,
@@ -0,0 +1,104 @@
+import json
+import math
+import os
+import re
+import wave
+from typing import Dict, List, Optional, Sequence
+
+# 句子结束标点（中英文），英文句点需后接空白或位于结尾，避免切开小数和缩写
+_SENTENCE_RE = re.compile(
+    r'.+?(?:[。！？!?；;…]+[”’"\')\]】」』]*|\.+(?=\s|$)[”’"\')\]]*|\n+|$)',
+    re.S
+)
+# 句内停顿标点，用于继续切分过长的句子
+_CLAUSE_RE = re.compile(r'.+?(?:[，,、：:—]+|$)', re.S)
+
+def _split_long_sentence(sentence: str, max_chars: int) -> List[str]:
+    pieces = []
+    buffer = ''
+    for clause in _CLAUSE_RE.findall(sentence):
+        while len(clause) > max_chars:
+            if buffer:
+                pieces.append(buffer)
+                buffer = ''
+            pieces.append(clause[:max_chars])
+            clause = clause[max_chars:]
+        if buffer and len(buffer) + len(clause) > max_chars:
+            pieces.append(buffer)
+            buffer = ''
+        buffer += clause
+    if buffer:
+        pieces.append(buffer)
+    return pieces
+
+def split_text(text: str, max_chars: int = 120) -> List[str]:
+    """按句子和标点边界切分文案，每段不超过 max_chars 个字符"""
+    segments = []
+    for sentence in _SENTENCE_RE.findall(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            segments.append(sentence)
+        else:
+            segments.extend(piece.strip() for piece in _split_long_sentence(sentence, max_chars))
+    return [segment for segment in segments if segment]
+
+def concat_wav_files(segment_files: Sequence[str], output_file: str,
+                     frame_rate: Optional[float] = None) -> List[float]:
+    """按顺序拼接 WAV 文件，返回每段的时长（秒）
+
+    指定 frame_rate 时每段末尾补静音到下一个视频帧边界（最多一帧），修改一句文案后，
+    其后各句的时间整体平移整数帧，增量渲染时这些句子所在的分段仍能命中缓存。
+    """
+    durations = []
+    params = None
+    written = 0
+    with wave.open(output_file, 'wb') as out:
+        for segment_file in segment_files:
+            with wave.open(segment_file, 'rb') as segment:
+                segment_params = segment.getparams()
+                if params is None:
+                    params = segment_params
+                    out.setparams(params)
+                elif segment_params[:3] != params[:3]:
+                    raise ValueError(f'WAV format mismatch in {segment_file}')
+                frames = segment.readframes(segment.getnframes())
+                out.writeframes(frames)
+                length = segment.getnframes()
+                if frame_rate:
+                    sample_rate = segment.getframerate()
+                    boundary = math.ceil((written + length) * frame_rate / sample_rate - 1e-9)
+                    padding = max(int(round(boundary * sample_rate / frame_rate)) - written - length, 0)
+                    # 8 位 WAV 为无符号采样，静音值为 0x80
+                    silence = b'\x80' if segment.getsampwidth() == 1 else b'\x00' * segment.getsampwidth()
+                    out.writeframes(silence * padding * segment.getnchannels())
+                    length += padding
+                written += length
+                durations.append(length / segment.getframerate())
+    return durations
+
+def segment_timings_path(audio_file: str) -> str:
+    return os.path.splitext(audio_file)[0] + '.segments.json'
+
+def build_timings(texts: Sequence[str], durations: Sequence[float]) -> List[Dict]:
+    timings = []
+    start = 0.0
+    for index, (text, duration) in enumerate(zip(texts, durations)):
+        timings.append({'index': index, 'text': text, 'start': start, 'end': start + duration})
+        start += duration
+    return timings
+
+def save_segment_timings(audio_file: str, timings: List[Dict]) -> str:
+    path = segment_timings_path(audio_file)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(timings, f, ensure_ascii=False, indent=2)
+    return path
+
+def load_segment_timings(audio_file: str) -> List[Dict]:
+    """读取配音的分段时间信息，不存在时返回空列表"""
+    path = segment_timings_path(audio_file)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,76 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Optional
+from logger import video_logger
+
+class StageError(Exception):
+    """某个阶段执行失败"""
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(str(error))
+        self.stage = stage
+        self.error = error
+
+class StageScheduler:
+    """按依赖关系调度流水线阶段
+
+    没有依赖关系的阶段并发执行，阶段函数以关键字参数接收其依赖阶段的结果。
+    任一阶段失败时不再启动新的阶段，并抛出 StageError。
+    """
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._stages: Dict[str, Callable[..., Any]] = {}
+        self._dependencies: Dict[str, tuple] = {}
+        self.timings: Dict[str, float] = {}
+
+    def add_stage(self, name: str, func: Callable[..., Any], depends_on: Iterable[str] = ()) -> None:
+        depends_on = tuple(depends_on)
+        for dependency in depends_on:
+            if dependency not in self._stages:
+                raise ValueError(f'Stage {name} depends on unknown stage {dependency}')
+        self._stages[name] = func
+        self._dependencies[name] = depends_on
+
+    def _run_stage(self, name: str, kwargs: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return self._stages[name](**kwargs)
+        finally:
+            self.timings[name] = time.perf_counter() - started
+            video_logger.info('Stage %s finished in %.2fs', name, self.timings[name])
+
+    @staticmethod
+    def _check_continue(should_continue: Optional[Callable[[], bool]]) -> None:
+        if should_continue is not None and not should_continue():
+            raise StageError('scheduler', RuntimeError('Pipeline stopped'))
+
+    def run(self, should_continue: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """执行全部阶段并返回各阶段结果"""
+        results: Dict[str, Any] = {}
+        pending = dict(self._dependencies)
+        running = {}
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while pending or running:
+                    self._check_continue(should_continue)
+                    for name in [n for n, deps in pending.items() if all(d in results for d in deps)]:
+                        kwargs = {dependency: results[dependency] for dependency in pending.pop(name)}
+                        running[executor.submit(self._run_stage, name, kwargs)] = name
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        try:
+                            results[name] = future.result()
+                        except Exception as e:
+                            raise StageError(name, e) from e
+                # 最后一个阶段执行期间取消时，循环已因没有待执行的阶段而退出
+                self._check_continue(should_continue)
+            except StageError:
+                for future in running:
+                    future.cancel()
+                raise
+
+        video_logger.info('Pipeline finished in %.2fs: %s', time.perf_counter() - started,
+                          ', '.join(f'{name}={seconds:.2f}s' for name, seconds in self.timings.items()))
+        return results
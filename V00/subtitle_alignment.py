@@ -0,0 +1,136 @@
+import wave
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from speech_segments import split_text
+
+def _distribute(texts: Sequence[str], start: float, end: float) -> List[Dict]:
+    """按字数比例把 [start, end] 分配给多条文本"""
+    total_chars = sum(len(text) for text in texts) or 1
+    cues = []
+    position = start
+    for text in texts:
+        next_position = position + (end - start) * len(text) / total_chars
+        cues.append({'text': text, 'start': position, 'end': next_position})
+        position = next_position
+    return cues
+
+def cues_from_timings(timings: Sequence[Dict], max_chars: int = 40) -> List[Dict]:
+    """由 TTS 分段时间生成字幕，超长分段再按句内标点拆成多条"""
+    cues = []
+    for timing in timings:
+        texts = split_text(timing['text'], max_chars) or [timing['text']]
+        cues.extend(_distribute(texts, timing['start'], timing['end']))
+    return cues
+
+def read_wav_mono(audio_file: str) -> Tuple[np.ndarray, int]:
+    """读取 WAV 为单声道 float32 数组"""
+    with wave.open(audio_file, 'rb') as f:
+        channels = f.getnchannels()
+        sample_width = f.getsampwidth()
+        sample_rate = f.getframerate()
+        data = f.readframes(f.getnframes())
+    if sample_width == 1:
+        samples = np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32)
+    elif sample_width == 4:
+        samples = np.frombuffer(data, dtype='<i4').astype(np.float32)
+    else:
+        raise ValueError(f'Unsupported sample width: {sample_width}')
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+def detect_speech_regions(audio_file: str, frame_ms: float = 20.0, threshold_db: float = -35.0,
+                          min_silence: float = 0.25, min_speech: float = 0.1) -> List[Tuple[float, float]]:
+    """基于短时能量的静音检测，返回语音区间 [(开始, 结束), ...]"""
+    samples, sample_rate = read_wav_mono(audio_file)
+    frame_length = max(int(sample_rate * frame_ms / 1000), 1)
+    frame_total = len(samples) // frame_length
+    if frame_total == 0:
+        return []
+
+    frames = samples[:frame_total * frame_length].reshape(frame_total, frame_length)
+    energy = np.einsum('ij,ij->i', frames, frames) / frame_length
+    energy_db = 10 * np.log10(energy + 1e-10)
+    voiced = energy_db > energy_db.max() + threshold_db
+
+    # 找出连续的有声帧区间
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    frame_seconds = frame_length / sample_rate
+
+    regions: List[List[float]] = []
+    for start, end in zip(starts * frame_seconds, ends * frame_seconds):
+        if regions and start - regions[-1][1] < min_silence:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    return [(start, end) for start, end in regions if end - start >= min_speech]
+
+def align_to_speech(texts: Sequence[str], regions: Sequence[Tuple[float, float]], snap: float = 0.5) -> List[Dict]:
+    """将文本按字数比例映射到语音区间（跳过静音），并把边界吸附到最近的停顿处"""
+    if not texts or not regions:
+        return []
+    if len(texts) == len(regions):
+        return [{'text': text, 'start': start, 'end': end} for text, (start, end) in zip(texts, regions)]
+
+    durations = np.array([end - start for start, end in regions])
+    speech_offsets = np.concatenate(([0.0], np.cumsum(durations)))
+    region_starts = np.array([start for start, _ in regions])
+    chars = np.array([len(text) for text in texts], dtype=np.float64)
+    fractions = np.concatenate(([0.0], np.cumsum(chars) / chars.sum()))
+
+    # 语音时间 -> 实际时间
+    speech_times = fractions * speech_offsets[-1]
+    indices = np.clip(np.searchsorted(speech_offsets, speech_times, side='right') - 1, 0, len(regions) - 1)
+    boundaries = region_starts[indices] + (speech_times - speech_offsets[indices])
+
+    gaps = np.array([end for _, end in regions[:-1]] + [start for start, _ in regions[1:]])
+    if len(gaps):
+        for i in range(1, len(boundaries) - 1):
+            nearest = gaps[np.abs(gaps - boundaries[i]).argmin()]
+            if abs(nearest - boundaries[i]) <= snap:
+                boundaries[i] = nearest
+    boundaries = np.maximum.accumulate(boundaries)
+    return [
+        {'text': text, 'start': float(boundaries[i]), 'end': float(boundaries[i + 1])}
+        for i, text in enumerate(texts)
+    ]
+
+def _format_timestamp(seconds: float, separator: str, fraction_digits: int) -> str:
+    scale = 10 ** fraction_digits
+    total = int(round(seconds * scale))
+    hours, remainder = divmod(total, 3600 * scale)
+    minutes, remainder = divmod(remainder, 60 * scale)
+    secs, fraction = divmod(remainder, scale)
+    if fraction_digits == 3:
+        return f'{hours:02d}:{minutes:02d}:{secs:02d}{separator}{fraction:03d}'
+    return f'{hours:d}:{minutes:02d}:{secs:02d}{separator}{fraction:02d}'
+
+def write_srt(cues: Sequence[Dict], path: str) -> str:
+    with open(path, 'w', encoding='utf-8') as f:
+        for index, cue in enumerate(cues, start=1):
+            f.write(f"{index}\n{_format_timestamp(cue['start'], ',', 3)} --> "
+                    f"{_format_timestamp(cue['end'], ',', 3)}\n{cue['text']}\n\n")
+    return path
+
+def write_ass(cues: Sequence[Dict], path: str, canvas_size: Tuple[int, int] = (1920, 1080),
+              font_name: str = 'Microsoft YaHei', fontsize: int = 24) -> str:
+    width, height = canvas_size
+    header = (
+        '[Script Info]\nScriptType: v4.00+\n'
+        f'PlayResX: {width}\nPlayResY: {height}\n\n'
+        '[V4+ Styles]\n'
+        'Format: Name, Fontname, Fontsize, PrimaryColour, OutlineColour, BorderStyle, Outline, Shadow, Alignment, MarginV\n'
+        f'Style: Default,{font_name},{fontsize},&H00FFFFFF,&H00000000,1,1,0,5,0\n\n'
+        '[Events]\nFormat: Layer, Start, End, Style, Text\n'
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(header)
+        for cue in cues:
+            text = cue['text'].replace('\n', '\\N')
+            f.write(f"Dialogue: 0,{_format_timestamp(cue['start'], '.', 2)},"
+                    f"{_format_timestamp(cue['end'], '.', 2)},Default,{text}\n")
+    return path
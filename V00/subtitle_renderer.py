@@ -0,0 +1,171 @@
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from logger import video_logger
+
+# 未指定字体时依次尝试的常见字体（优先支持中文）
+DEFAULT_FONTS = (
+    'msyh.ttc', 'msyh.ttf', 'simhei.ttf', 'simsun.ttc',
+    'PingFang.ttc', 'NotoSansCJK-Regular.ttc', 'wqy-microhei.ttc',
+    'DejaVuSans.ttf', 'arial.ttf',
+)
+
+def load_font(font_path: Optional[str], fontsize: int):
+    """加载字体，找不到时回退到 PIL 内置字体"""
+    for candidate in ((font_path,) if font_path else ()) + DEFAULT_FONTS:
+        try:
+            return ImageFont.truetype(candidate, fontsize)
+        except OSError:
+            continue
+    video_logger.warning('No TrueType font found, using PIL default font')
+    try:
+        return ImageFont.load_default(size=fontsize)
+    except TypeError:
+        return ImageFont.load_default()
+
+def wrap_text(text: str, font, max_width: int) -> List[str]:
+    """按像素宽度换行：中文逐字换行，英文尽量在空格处换行"""
+    lines = []
+    for paragraph in text.splitlines() or ['']:
+        line = ''
+        for char in paragraph:
+            candidate = line + char
+            if line and font.getlength(candidate) > max_width:
+                break_at = line.rfind(' ')
+                if char != ' ' and break_at > 0:
+                    lines.append(line[:break_at])
+                    line = line[break_at + 1:] + char
+                else:
+                    lines.append(line)
+                    line = char.lstrip()
+            else:
+                line = candidate
+        lines.append(line)
+    return [line for line in lines if line.strip()]
+
+class SubtitleSprite:
+    """预渲染的字幕贴图，保存预乘 alpha 后的数据以便整数混合"""
+    def __init__(self, rgba: np.ndarray):
+        alpha = rgba[:, :, 3:4].astype(np.uint16)
+        self.height, self.width = rgba.shape[:2]
+        # premultiplied + 127 用于四舍五入，最大值 255*255+127 不会溢出 uint16
+        self.premultiplied = rgba[:, :, :3].astype(np.uint16) * alpha + 127
+        self.inverse_alpha = 255 - alpha
+        # 混合用的中间缓冲随贴图缓存复用，逐帧混合时不再分配
+        self._scratch = np.empty(self.premultiplied.shape, dtype=np.uint16)
+
+    def blend_into(self, frame: np.ndarray, x: int, y: int) -> None:
+        """只在贴图包围盒内与画面混合"""
+        frame_height, frame_width = frame.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + self.width, frame_width), min(y + self.height, frame_height)
+        if x1 <= x0 or y1 <= y0:
+            return
+        sx, sy = x0 - x, y0 - y
+        region = frame[y0:y1, x0:x1]
+        blended = self._scratch[:y1 - y0, :x1 - x0]
+        np.multiply(region, self.inverse_alpha[sy:sy + y1 - y0, sx:sx + x1 - x0], out=blended)
+        blended += self.premultiplied[sy:sy + y1 - y0, sx:sx + x1 - x0]
+        blended //= 255
+        np.copyto(region, blended, casting='unsafe')
+
+class SubtitleTrack:
+    """定时字幕轨道
+
+    每条字幕只用 PIL 渲染一次并缓存为紧凑的 RGBA 贴图，
+    渲染时按时间查找当前字幕，并只混合贴图所在区域。
+    """
+    def __init__(self, cues: Sequence[Dict], canvas_size: Tuple[int, int], font_path: Optional[str] = None,
+                 fontsize: int = 24, color: str = 'white', stroke_width: int = 0, stroke_color: str = 'black',
+                 margin_bottom: Optional[int] = None, line_spacing: int = 4):
+        self.cues = sorted(cues, key=lambda cue: cue['start'])
+        self._starts = [cue['start'] for cue in self.cues]
+        self.canvas_size = canvas_size
+        self.fontsize = fontsize
+        self.font = load_font(font_path, fontsize)
+        self.color = color
+        self.stroke_width = stroke_width
+        self.stroke_color = stroke_color
+        self.margin_bottom = margin_bottom
+        self.line_spacing = line_spacing
+        self._sprites: Dict[str, SubtitleSprite] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self) -> float:
+        return self.cues[-1]['end'] if self.cues else 0.0
+
+    def cue_at(self, t: float) -> Optional[Dict]:
+        index = bisect.bisect_right(self._starts, t) - 1
+        if index >= 0 and t < self.cues[index]['end']:
+            return self.cues[index]
+        return None
+
+    def signature(self, start: float, end: float, fps: Optional[float] = None) -> List:
+        """[start, end) 时间段内字幕内容与样式的签名，时间相对于 start
+
+        指定 fps 时时间以帧为单位，整体平移整数帧后因浮点误差产生的微小差异不会改变签名。
+        """
+        scale, digits = (fps, 2) if fps else (1.0, 4)
+        cues = [
+            [cue['text'], round((cue['start'] - start) * scale, digits), round((cue['end'] - start) * scale, digits)]
+            for cue in self.cues if cue['start'] < end and cue['end'] > start
+        ]
+        style = [getattr(self.font, 'path', None), self.fontsize, self.color, self.stroke_width,
+                 self.stroke_color, self.margin_bottom, self.line_spacing, list(self.canvas_size)]
+        return [style, cues]
+
+    def render_sprite(self, text: str) -> SubtitleSprite:
+        lines = wrap_text(text, self.font, int(self.canvas_size[0] * 0.9))
+        boxes = [self.font.getbbox(line, stroke_width=self.stroke_width) for line in lines]
+        line_height = max((box[3] - box[1] for box in boxes), default=0)
+        width = max((box[2] - box[0] for box in boxes), default=0) + self.stroke_width * 2
+        height = (line_height + self.line_spacing) * len(lines) + self.stroke_width * 2
+
+        image = Image.new('RGBA', (max(width, 1), max(height, 1)), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        for index, (line, box) in enumerate(zip(lines, boxes)):
+            line_width = box[2] - box[0]
+            draw.text(
+                ((width - line_width) / 2 - box[0], index * (line_height + self.line_spacing) - box[1] + self.stroke_width),
+                line, font=self.font, fill=self.color,
+                stroke_width=self.stroke_width, stroke_fill=self.stroke_color
+            )
+        # 裁剪到实际像素的最小包围盒
+        bbox = image.getbbox()
+        if bbox:
+            image = image.crop(bbox)
+        return SubtitleSprite(np.asarray(image))
+
+    def sprite_for(self, text: str) -> SubtitleSprite:
+        with self._lock:
+            sprite = self._sprites.get(text)
+            if sprite is None:
+                sprite = self._sprites[text] = self.render_sprite(text)
+            return sprite
+
+    def prerender(self) -> None:
+        """提前渲染所有字幕贴图"""
+        for cue in self.cues:
+            self.sprite_for(cue['text'])
+        video_logger.info('Pre-rendered %d subtitle sprites', len(self._sprites))
+
+    def apply(self, frame: np.ndarray, t: float) -> None:
+        """将 t 时刻的字幕混合到画面中（原地修改）"""
+        cue = self.cue_at(t)
+        if cue is None:
+            return
+        sprite = self.sprite_for(cue['text'])
+        frame_height, frame_width = frame.shape[:2]
+        x = (frame_width - sprite.width) // 2
+        if self.margin_bottom is None:
+            y = (frame_height - sprite.height) // 2
+        else:
+            y = frame_height - self.margin_bottom - sprite.height
+        sprite.blend_into(frame, x, y)
+
+    def close(self) -> None:
+        with self._lock:
+            self._sprites.clear()
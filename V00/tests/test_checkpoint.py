@@ -0,0 +1,48 @@
+import unittest
+import os
+import shutil
+from checkpoint import RenderCheckpoint
+from memory_manager import MemoryManager
+
+class TestRenderCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_data'
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.audio_file = os.path.join(self.output_dir, 'audio.wav')
+        with open(self.audio_file, 'wb') as f:
+            f.write(b'narration')
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_completed_stage_survives_restart(self):
+        checkpoint = RenderCheckpoint(self.output_dir, {'script': 'a'})
+        checkpoint.complete('audio', audio=RenderCheckpoint.file_entry(self.audio_file))
+        checkpoint.update('compose', segments_done=3, segments_total=10)
+        restarted = RenderCheckpoint(self.output_dir, {'script': 'a'})
+        self.assertIsNotNone(restarted.completed('audio', files=('audio',)))
+        self.assertIsNone(restarted.completed('compose'))
+        self.assertEqual(restarted.stages['compose']['segments_done'], 3)
+
+    def test_changed_inputs_discard_checkpoint(self):
+        RenderCheckpoint(self.output_dir, {'script': 'a'}).complete('subtitle', cues=[])
+        self.assertIsNone(RenderCheckpoint(self.output_dir, {'script': 'b'}).completed('subtitle'))
+
+    def test_modified_output_recomputed(self):
+        checkpoint = RenderCheckpoint(self.output_dir, {'script': 'a'})
+        checkpoint.complete('audio', audio=RenderCheckpoint.file_entry(self.audio_file))
+        with open(self.audio_file, 'ab') as f:
+            f.write(b'!')
+        self.assertIsNone(checkpoint.completed('audio', files=('audio',)))
+
+    def test_memory_manager_keeps_persisted_files(self):
+        temp_dir = os.path.join(self.output_dir, 'temp')
+        manager = MemoryManager(temp_dir)
+        kept = os.path.join(temp_dir, 'checkpoint.json')
+        with open(kept, 'w') as f:
+            f.write('{}')
+        manager.__del__()
+        self.assertTrue(os.path.exists(kept))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import json
+import os
+import shutil
+import subprocess
+import sys
+from cli import load_manifest
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = 'test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write_manifest(self, manifest):
+        path = os.path.join(self.test_dir, 'jobs.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        return path
+
+    def test_paths_resolved_relative_to_manifest(self):
+        with open(os.path.join(self.test_dir, 'script.txt'), 'w', encoding='utf-8') as f:
+            f.write('测试文案\n')
+        path = self.write_manifest({'jobs': [
+            {'script_file': 'script.txt', 'image_path': 'images', 'video_path': 'videos'}
+        ]})
+        job = load_manifest(path)[0]
+        self.assertEqual(job['name'], 'job1')
+        self.assertEqual(job['script'], '测试文案')
+        self.assertEqual(job['image_path'], os.path.join(os.path.abspath(self.test_dir), 'images'))
+
+    def test_missing_fields_rejected(self):
+        path = self.write_manifest([{'name': 'broken', 'script': '文案'}])
+        with self.assertRaises(ValueError):
+            load_manifest(path)
+
+    def test_render_does_not_import_qt(self):
+        code = 'import sys, cli, pipeline; print("PyQt5" in sys.modules)'
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip().splitlines()[-1], 'False')
+
+if __name__ == '__main__':
+    unittest.main()
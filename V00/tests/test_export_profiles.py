@@ -0,0 +1,55 @@
+import unittest
+import json
+import os
+import shutil
+from export_profiles import DEFAULT_PROFILE, ffmpeg_params, get_profile, record_encode_stats, summarize_encode_stats
+
+class TestExportProfiles(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = 'test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_profile_params(self):
+        self.assertEqual(ffmpeg_params(get_profile('draft')),
+                         ['-preset', 'ultrafast', '-crf', '30', '-threads', '0', '-b:a', '96k',
+                          '-tune', 'fastdecode'])
+        # balanced 不设置 tune
+        self.assertEqual(ffmpeg_params(get_profile('balanced')),
+                         ['-preset', 'medium', '-crf', '23', '-threads', '0', '-b:a', '128k'])
+        self.assertEqual(ffmpeg_params(get_profile('archive')),
+                         ['-preset', 'slow', '-crf', '18', '-threads', '0', '-b:a', '192k', '-tune', 'film'])
+
+    def test_unknown_profile_falls_back(self):
+        for name in ('lossless', None, ''):
+            profile = get_profile(name)
+            self.assertEqual(profile['name'], DEFAULT_PROFILE)
+            self.assertEqual(ffmpeg_params(profile), ffmpeg_params(get_profile(DEFAULT_PROFILE)))
+
+    def test_stats_recorded_and_summarized(self):
+        stats_file = os.path.join(self.test_dir, 'stats', 'encode_stats.jsonl')
+        output_file = os.path.join(self.test_dir, 'out.mp4')
+        with open(output_file, 'wb') as f:
+            f.write(b'\0' * 4800)
+        entry = record_encode_stats(stats_file, get_profile('draft'), output_file, 48, 2.0, (64, 36))
+        self.assertEqual((entry['fps'], entry['bytes_per_frame']), (24.0, 100))
+        # 增量渲染只编码了部分帧：帧率按编码的帧数，每帧字节数按成片帧数
+        entry = record_encode_stats(os.path.join(self.test_dir, 'partial.jsonl'), get_profile('draft'),
+                                    output_file, 48, 2.0, (64, 36), encoded_frames=12)
+        self.assertEqual((entry['encoded_frames'], entry['fps'], entry['bytes_per_frame']), (12, 6.0, 100))
+        record_encode_stats(stats_file, get_profile('draft'), output_file, 48, 4.0, (64, 36))
+        record_encode_stats(stats_file, get_profile('archive'), output_file, 24, 6.0, (64, 36))
+        with open(stats_file, 'a', encoding='utf-8') as f:
+            f.write('\n')
+        with open(stats_file, encoding='utf-8') as f:
+            self.assertEqual(json.loads(f.readline())['resolution'], [64, 36])
+        self.assertEqual(summarize_encode_stats(stats_file), {
+            'draft': {'runs': 2, 'fps': 18.0, 'bytes_per_frame': 100},
+            'archive': {'runs': 1, 'fps': 4.0, 'bytes_per_frame': 200},
+        })
+        self.assertEqual(summarize_encode_stats(os.path.join(self.test_dir, 'missing.jsonl')), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import os
+import shutil
+import numpy as np
+from moviepy.editor import VideoClip
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+from frame_pool import FramePool, FRAME_POOL
+from lazy_clips import PooledVideoReader
+from render_engine import StreamingRenderer
+
+class TestFramePool(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_data'
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def make_video(self, frames=6):
+        path = os.path.join(self.output_dir, 'source.mp4')
+        clip = VideoClip(lambda t: np.full((36, 64, 3), int(t * 10) * 40, dtype=np.uint8), duration=frames / 10)
+        StreamingRenderer(path, (64, 36), fps=10, ffmpeg_params=['-preset', 'ultrafast']).render([clip])
+        return path
+
+    def test_pool_reuses_released_buffers(self):
+        pool = FramePool(max_free=2)
+        first = pool.acquire((4, 4, 3))
+        pool.release(first)
+        self.assertIs(pool.acquire((4, 4, 3)), first)
+        self.assertEqual(pool.acquire((4, 4, 3), np.int16).dtype, np.int16)
+        for _ in range(3):
+            pool.release(np.empty((2, 2, 3), dtype=np.uint8))
+        self.assertEqual(pool.stats(), {'allocations': 2, 'reuses': 1, 'free': 2})
+
+    def test_pooled_reader_matches_moviepy(self):
+        path = self.make_video()
+        expected = FFMPEG_VideoReader(path)
+        reader = PooledVideoReader(path)
+        buffers = set()
+        for index in (0, 1, 3, 4, 4, 2, 5):
+            frame = reader.get_frame(index / 10)
+            np.testing.assert_array_equal(frame, expected.get_frame(index / 10))
+            buffers.add(frame.ctypes.data)
+        # 两块缓冲交替使用，跳帧和回退定位都不分配新的帧缓冲
+        self.assertEqual(len(buffers), 2)
+        free = FRAME_POOL.stats()['free']
+        reader.close()
+        expected.close()
+        self.assertEqual(FRAME_POOL.stats()['free'], free + 2)
+
+    def test_non_contiguous_frames_written(self):
+        path = os.path.join(self.output_dir, 'crop.mp4')
+        frame = np.zeros((36, 80, 3), dtype=np.uint8)
+        clip = VideoClip(lambda t: frame[:, 8:72], duration=0.3)
+        self.assertEqual(StreamingRenderer(path, (64, 36), fps=10).render([clip]), 3)
+        self.assertTrue(os.path.getsize(path) > 0)
+
+if __name__ == '__main__':
+    unittest.main()
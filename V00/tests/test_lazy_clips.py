@@ -0,0 +1,70 @@
+import unittest
+import os
+import shutil
+import numpy as np
+from PIL import Image
+from lazy_clips import LazyImageClip, load_scaled_image, probe_image_size
+
+class TestScaledImageLoading(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = 'test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def make_image(self, name, size=(400, 200), orientation=None):
+        """左半红、右半蓝的图片，orientation 写入 EXIF 方向标记"""
+        width, height = size
+        pixels = np.zeros((height, width, 3), dtype=np.uint8)
+        pixels[:, :width // 2, 0] = 255
+        pixels[:, width // 2:, 2] = 255
+        img = Image.fromarray(pixels)
+        path = os.path.join(self.test_dir, name)
+        if orientation is None:
+            img.save(path)
+        else:
+            exif = img.getexif()
+            exif[0x0112] = orientation
+            img.save(path, exif=exif, quality=95)
+        return path
+
+    def assertColor(self, pixel, channel):
+        self.assertGreater(int(pixel[channel]), 200)
+        self.assertLess(int(np.delete(pixel, channel).max()), 60)
+
+    def test_rotated_jpeg_decoded_upright(self):
+        # 方向 6：存储的图片需要顺时针旋转 90 度显示，原来的左侧（红）转到上方
+        path = self.make_image('rotated.jpg', orientation=6)
+        self.assertEqual(probe_image_size(path), (200, 400))
+        frame = load_scaled_image(path, (50, 100))
+        self.assertEqual(frame.shape, (100, 50, 3))
+        self.assertColor(frame[10, 25], 0)
+        self.assertColor(frame[90, 25], 2)
+
+    def test_draft_decode_keeps_exact_size(self):
+        # JPEG 在 DCT 阶段缩小到不小于目标的尺寸，再精确缩放
+        path = self.make_image('plain.jpg', orientation=1)
+        frame = load_scaled_image(path, (90, 45))
+        self.assertEqual(frame.shape, (45, 90, 3))
+        self.assertColor(frame[20, 10], 0)
+        self.assertColor(frame[20, 80], 2)
+
+    def test_reduce_for_integer_factor(self):
+        path = self.make_image('plain.png')
+        frame = load_scaled_image(path, (100, 50))
+        self.assertEqual(frame.shape, (50, 100, 3))
+        # 整数倍缩小不跨越红蓝边界，两侧颜色不混合
+        self.assertTrue((frame[:, 49] == [255, 0, 0]).all())
+        self.assertTrue((frame[:, 50] == [0, 0, 255]).all())
+        self.assertEqual(load_scaled_image(path, (70, 35)).shape, (35, 70, 3))
+
+    def test_lazy_clip_uses_oriented_size(self):
+        path = self.make_image('rotated.jpg', orientation=6)
+        clip = LazyImageClip(path, 1.0, (100, 100))
+        self.assertEqual(tuple(clip.size), (50, 100))
+        self.assertEqual(clip.get_frame(0).shape, (100, 50, 3))
+        clip.close()
+
+if __name__ == '__main__':
+    unittest.main()
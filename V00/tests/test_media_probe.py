@@ -0,0 +1,61 @@
+import unittest
+import os
+import shutil
+import subprocess
+from media_probe import get_ffmpeg_binary, read_mp4_keyframes
+from memory_manager import MemoryManager
+
+class TestMp4Keyframes(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = 'test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def make_video(self, name, duration=2, gop=12, extra_input=(), extra_output=()):
+        """用 ffmpeg 生成固定 GOP 的 24fps 测试视频（含 B 帧，因此有合成时间偏移）"""
+        source = os.path.join(self.test_dir, 'source.mp4')
+        subprocess.run(
+            [get_ffmpeg_binary(), '-v', 'error', '-y', '-f', 'lavfi',
+             '-i', f'testsrc=size=64x36:rate=24:duration={duration}',
+             '-c:v', 'libx264', '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0',
+             '-bf', '2', '-pix_fmt', 'yuv420p', source],
+            check=True
+        )
+        # 重新封装以改变编辑列表，不重新编码
+        path = os.path.join(self.test_dir, name)
+        subprocess.run([get_ffmpeg_binary(), '-v', 'error', '-y', *extra_input, '-i', source,
+                        '-c', 'copy', *extra_output, path], check=True)
+        return path
+
+    def assertTimes(self, actual, expected):
+        self.assertEqual(len(actual), len(expected))
+        for value, target in zip(actual, expected):
+            self.assertAlmostEqual(value, target, places=6)
+
+    def test_keyframes_at_gop_boundaries(self):
+        # 编辑列表跳过 B 帧带来的合成延迟，关键帧显示时间从 0 开始
+        self.assertTimes(read_mp4_keyframes(self.make_video('gop.mp4')), [0, 0.5, 1.0, 1.5])
+
+    def test_composition_offset_without_edit_list(self):
+        # 没有编辑列表时显示时间 = 解码时间 + ctts 偏移（两帧）
+        path = self.make_video('no_elst.mp4', extra_output=('-use_editlist', '0'))
+        self.assertTimes(read_mp4_keyframes(path), [2 / 24, 0.5 + 2 / 24, 1.0 + 2 / 24, 1.5 + 2 / 24])
+
+    def test_empty_edit_delays_keyframes(self):
+        path = self.make_video('delayed.mp4', extra_input=('-itsoffset', '0.5'))
+        self.assertTimes(read_mp4_keyframes(path), [0.5, 1.0, 1.5, 2.0])
+
+    def test_segments_split_on_keyframes(self):
+        path = self.make_video('long.mp4', duration=4, gop=24)
+        self.assertTimes(read_mp4_keyframes(path), [0, 1, 2, 3])
+        # 每段目标约 4 / 3.5 秒，只能在关键帧处切分
+        chunk_mb = os.path.getsize(path) / 3.5 / (1024 * 1024)
+        manager = MemoryManager(os.path.join(self.test_dir, 'temp'))
+        self.assertEqual(manager.segment_large_file(path, 4.0, chunk_size_mb=chunk_mb),
+                         [(path, 0.0, 2.0), (path, 2.0, 4.0)])
+        self.assertEqual(manager.segment_large_file(path, 4.0), [(path, 0.0, 4.0)])
+
+if __name__ == '__main__':
+    unittest.main()
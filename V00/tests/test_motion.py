@@ -0,0 +1,56 @@
+import unittest
+import os
+import shutil
+import numpy as np
+from PIL import Image
+from motion import ImagePyramid, KenBurnsClip, MOTION_PRESETS, pick_motion
+from normalizer import Normalizer
+from video_strategy import ImageProcessor
+
+class TestMotion(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_data'
+        os.makedirs(self.output_dir, exist_ok=True)
+        # 水平渐变，便于判断取景框的位置
+        gradient = np.tile(np.linspace(0, 255, 320, dtype=np.uint8)[np.newaxis, :, np.newaxis], (180, 1, 3))
+        self.image = os.path.join(self.output_dir, 'gradient.png')
+        Image.fromarray(gradient).save(self.image)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_pick_motion_is_deterministic(self):
+        self.assertIn(pick_motion('a/photo.jpg'), MOTION_PRESETS)
+        self.assertEqual(pick_motion('a/photo.jpg'), pick_motion('b\\photo.jpg'))
+
+    def test_pyramid_levels_and_crop_fast_path(self):
+        pyramid = ImagePyramid(Image.new('RGB', (1000, 600)), (200, 100))
+        self.assertEqual([level.size for level in pyramid.levels], [(1000, 600), (500, 300), (250, 150)])
+        frame = pyramid.render((10, 20, 210, 120), (200, 100))
+        self.assertEqual(frame.shape, (100, 200, 3))
+        # 整数切片返回第 0 层的视图，不重新分配像素
+        self.assertTrue(np.shares_memory(frame, pyramid._base_array))
+
+    def test_frames_match_normalized_size(self):
+        clip = KenBurnsClip(self.image, 2.0, (160, 90), 'zoom_in', 1.5)
+        Normalizer((160, 90), 'letterbox').normalize([clip])
+        for t in (0.0, 1.0, 2.0):
+            self.assertEqual(clip.get_frame(t).shape, (90, 160, 3))
+
+    def test_motion_follows_duration(self):
+        clip = KenBurnsClip(self.image, 2.0, (160, 90), 'pan_right', 1.5)
+        Normalizer((160, 90), 'crop').normalize([clip])
+        longer = clip.set_duration(4.0)
+        # 时长调整后运动仍覆盖整个片段：起点在最左侧，终点在最右侧
+        self.assertLess(longer.get_frame(0).mean(), longer.get_frame(2.0).mean())
+        self.assertLess(longer.get_frame(2.0).mean(), longer.get_frame(4.0).mean())
+        np.testing.assert_array_equal(longer.get_frame(4.0), clip.get_frame(2.0))
+
+    def test_image_processor_option(self):
+        processor = ImageProcessor(canvas_size=(160, 90), ken_burns=True)
+        clip, = processor.load(self.image)
+        self.assertIsInstance(clip, KenBurnsClip)
+        self.assertEqual(clip.edit_ops, (('ken_burns', clip.motion, 1.2),))
+
+if __name__ == '__main__':
+    unittest.main()
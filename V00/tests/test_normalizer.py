@@ -0,0 +1,48 @@
+import unittest
+import os
+import shutil
+from moviepy.editor import ColorClip
+from PIL import Image
+from lazy_clips import LazyImageClip
+from normalizer import Normalizer, scaled_size
+from render_engine import StreamingRenderer
+
+class TestNormalizer(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_data'
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.portrait = os.path.join(self.output_dir, 'portrait.png')
+        Image.new('RGB', (90, 160), 'red').save(self.portrait)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_scaled_size(self):
+        self.assertEqual(scaled_size((320, 240), (1280, 720), 'letterbox'), (960, 720))
+        self.assertEqual(scaled_size((3840, 2160), (1280, 720), 'letterbox'), (1280, 720))
+        self.assertEqual(scaled_size((320, 240), (1280, 720), 'crop'), (1280, 960))
+
+    def test_image_decoded_at_target_size(self):
+        clip = LazyImageClip(self.portrait, 1.0, (64, 36))
+        Normalizer((160, 90), 'letterbox').normalize([clip])
+        self.assertEqual(clip.size, (51, 90))
+        self.assertEqual(clip.get_frame(0).shape, (90, 51, 3))
+        Normalizer((160, 90), 'crop').normalize([clip])
+        self.assertEqual(clip.get_frame(0).shape, (90, 160, 3))
+
+    def test_other_clips_resized_per_frame(self):
+        clip, = Normalizer((160, 90)).normalize([ColorClip((32, 18), color=(0, 255, 0), duration=1.0)])
+        self.assertEqual(clip.size, (160, 90))
+        self.assertEqual(clip.get_frame(0).shape, (90, 160, 3))
+
+    def test_letterbox_bars_cleared_after_overlay(self):
+        renderer = StreamingRenderer(os.path.join(self.output_dir, 'out.mp4'), (160, 90))
+        frame = renderer._fit_to_canvas(ColorClip((160, 90), color=(255, 255, 255)).get_frame(0), copy=True)
+        frame[:] = 255
+        frame = renderer._fit_to_canvas(ColorClip((80, 90), color=(0, 0, 255)).get_frame(0), copy=True)
+        self.assertEqual(frame[:, :40].max(), 0)
+        self.assertEqual(frame[:, 120:].max(), 0)
+        self.assertEqual(list(frame[45, 80]), [0, 0, 255])
+
+if __name__ == '__main__':
+    unittest.main()
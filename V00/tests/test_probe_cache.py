@@ -0,0 +1,139 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import subprocess
+from unittest import mock
+import numpy as np
+from moviepy.editor import VideoClip
+from media_probe import get_ffmpeg_binary
+from memory_manager import MemoryManager
+from probe_cache import HASH_BLOCK_SIZE, ProbeCache
+from render_engine import StreamingRenderer
+
+METADATA = {'duration': 2.0, 'width': 64, 'height': 36, 'fps': 24.0, 'codec': 'h264', 'has_audio': False}
+
+class TestProbeCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = 'test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.cache = ProbeCache(os.path.join(self.test_dir, 'probe.sqlite'), max_entries=2)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def make_file(self, name, size=HASH_BLOCK_SIZE * 3, seed=0):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as f:
+            f.write(np.random.default_rng(seed).bytes(size))
+        return path
+
+    def test_hit_on_unchanged_file(self):
+        path = self.make_file('a.mp4')
+        self.assertIsNone(self.cache.get(path))
+        self.cache.put(path, METADATA)
+        self.assertEqual(self.cache.get(path), METADATA)
+
+    def test_changed_file_misses(self):
+        path = self.make_file('a.mp4')
+        self.cache.put(path, METADATA)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        # 修改时间变化但内容相同：按内容哈希命中
+        self.assertEqual(self.cache.get(path), METADATA)
+        with open(path, 'ab') as f:
+            f.write(b'\0')
+        self.assertIsNone(self.cache.get(path))
+        # 文件头被改写、大小和修改时间不变时，内容哈希也不能命中
+        path = self.make_file('b.mp4', seed=1)
+        self.cache.put(path, METADATA)
+        stat = os.stat(path)
+        with open(path, 'r+b') as f:
+            f.write(b'changed')
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(self.cache.get(path))
+
+    def test_hit_after_move_by_content_hash(self):
+        path = self.make_file('a.mp4')
+        self.cache.put(path, METADATA)
+        os.makedirs(os.path.join(self.test_dir, 'moved'))
+        moved = os.path.join(self.test_dir, 'moved', 'renamed.mp4')
+        os.rename(path, moved)
+        self.assertEqual(self.cache.get(moved), METADATA)
+        # 命中后记录新的路径，下次按路径直接命中
+        row = self.cache._conn.execute('SELECT path FROM probes').fetchone()
+        self.assertEqual(row[0], os.path.abspath(moved))
+
+    def test_evicts_least_recently_used(self):
+        first, second, third = (self.make_file(f'{name}.mp4', seed=seed) for seed, name in enumerate('abc'))
+        self.cache.put(first, METADATA)
+        self.cache.put(second, METADATA)
+        self.cache.get(first)
+        self.cache.put(third, METADATA)
+        self.assertEqual(self.cache.get(first), METADATA)
+        self.assertIsNone(self.cache.get(second))
+        self.assertEqual(self.cache.get(third), METADATA)
+
+    def test_invalidate_and_clear(self):
+        first, second = self.make_file('a.mp4'), self.make_file('b.mp4', seed=1)
+        self.cache.put(first, METADATA)
+        self.cache.put(second, METADATA)
+        self.cache.invalidate(first)
+        self.assertIsNone(self.cache.get(first))
+        self.assertEqual(self.cache.get(second), METADATA)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(second))
+
+    def test_probe_counts_hits_and_misses(self):
+        path = os.path.join(self.test_dir, 'clip.mp4')
+        clip = VideoClip(lambda t: np.zeros((36, 64, 3), dtype=np.uint8), duration=1)
+        StreamingRenderer(path, (64, 36), fps=10).render([clip])
+        metadata = self.cache.probe(path)
+        self.assertEqual((metadata['width'], metadata['height']), (64, 36))
+        self.assertEqual(self.cache.probe(path), metadata)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_keyframes_cached_for_large_files(self):
+        path = os.path.join(self.test_dir, 'long.mp4')
+        subprocess.run(
+            [get_ffmpeg_binary(), '-v', 'error', '-y', '-f', 'lavfi', '-i', 'testsrc=size=64x36:rate=24:duration=4',
+             '-c:v', 'libx264', '-g', '24', '-keyint_min', '24', '-sc_threshold', '0', '-pix_fmt', 'yuv420p', path],
+            check=True
+        )
+        # 每段目标约 4 / 3.5 秒，按关键帧切成两段
+        chunk_mb = os.path.getsize(path) / 3.5 / (1024 * 1024)
+        manager = MemoryManager(os.path.join(self.test_dir, 'temp'))
+        self.cache.probe(path)
+        expected = [(path, 0.0, 2.0), (path, 2.0, 4.0)]
+        self.assertEqual(manager.segment_large_file(path, 4.0, chunk_mb, keyframe_probe=self.cache.keyframes),
+                         expected)
+        self.cache.close()
+
+        # 下次运行命中缓存：不读取容器索引，也不启动任何子进程
+        self.cache = ProbeCache(os.path.join(self.test_dir, 'probe.sqlite'))
+        with mock.patch('probe_cache.probe_keyframes') as probe_keyframes, \
+                mock.patch('probe_cache.probe_metadata') as probe_metadata, \
+                mock.patch('subprocess.Popen', side_effect=AssertionError('subprocess spawned')):
+            self.cache.probe(path)
+            segments = manager.segment_large_file(path, 4.0, chunk_mb, keyframe_probe=self.cache.keyframes)
+        self.assertEqual(segments, expected)
+        probe_keyframes.assert_not_called()
+        probe_metadata.assert_not_called()
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_adds_keyframes_column_to_old_database(self):
+        self.cache.close()
+        db_path = os.path.join(self.test_dir, 'old.sqlite')
+        conn = sqlite3.connect(db_path)
+        conn.execute('CREATE TABLE probes (content_hash TEXT PRIMARY KEY, path TEXT, size INTEGER, mtime_ns INTEGER,'
+                     ' duration REAL, width INTEGER, height INTEGER, fps REAL, codec TEXT,'
+                     ' has_audio INTEGER, last_access REAL)')
+        conn.close()
+        self.cache = ProbeCache(db_path)
+        path = self.make_file('a.mp4')
+        self.cache.put(path, METADATA)
+        self.assertEqual(self.cache.get(path), METADATA)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import json
+import os
+import shutil
+import threading
+from moviepy.editor import ColorClip
+from pipeline import ProgressTracker
+from profiler import NULL_PROFILER, Profiler
+from render_engine import StreamingRenderer
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_data'
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_chrome_trace_export(self):
+        profiler = Profiler('test')
+        with profiler.span('ingest', 'ingest', file='a.png'):
+            sum(range(10000))
+        with profiler.span('tts_segment', 'tts', cpu=False, index=0):
+            pass
+        trace = json.load(open(profiler.save(os.path.join(self.output_dir, 'trace.json')), encoding='utf-8'))
+        spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+        self.assertEqual([event['name'] for event in spans], ['ingest', 'tts_segment'])
+        self.assertIn('cpu_ms', spans[0]['args'])
+        self.assertNotIn('cpu_ms', spans[1]['args'])
+        self.assertEqual(spans[0]['args']['file'], 'a.png')
+        self.assertGreater(trace['otherData']['peak_rss_mb'], 0)
+
+    def test_render_records_clip_frames(self):
+        profiler = Profiler('test')
+        clips = [ColorClip((64, 36), color=(255, 0, 0), duration=1.0),
+                 ColorClip((64, 36), color=(0, 0, 255), duration=0.5)]
+        renderer = StreamingRenderer(os.path.join(self.output_dir, 'out.mp4'), (64, 36), fps=10,
+                                     profiler=profiler)
+        renderer.render(clips)
+        stages = profiler.summary()['stages']
+        self.assertEqual(stages['render_clip']['count'], 2)
+        self.assertEqual(stages['render_clip']['frames'], 15)
+        self.assertIn('fps', stages['render_clip'])
+        self.assertIn('encoder_flush', stages)
+
+    def test_null_profiler_records_nothing(self):
+        with NULL_PROFILER.span('ingest') as args:
+            args['frames'] = 1
+        self.assertEqual(NULL_PROFILER.events, [])
+
+class TestProgressTracker(unittest.TestCase):
+    def test_weighted_and_monotonic(self):
+        values = []
+        tracker = ProgressTracker({'ingest': 1, 'render': 3}, values.append)
+        tracker.update('ingest', 1, 2)
+        tracker.update('ingest', 2, 2)
+        tracker.update('render', 30, 60)
+        tracker.update('ingest', 1, 4)
+        tracker.update('render', 60, 60)
+        self.assertEqual(values, [12, 25, 62, 81])
+
+    def test_concurrent_updates(self):
+        # 多个阶段线程同时报告进度，回调收到的值严格递增并最终到达 100
+        values = []
+        tracker = ProgressTracker({'images': 1, 'videos': 1, 'audio': 2}, values.append)
+
+        def report(stage):
+            for done in range(1, 501):
+                tracker.update(stage, done, 500)
+
+        threads = [threading.Thread(target=report, args=(stage,)) for stage in ('images', 'videos', 'audio')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(values, sorted(set(values)))
+        self.assertEqual(values[-1], 100)
+
+if __name__ == '__main__':
+    unittest.main()
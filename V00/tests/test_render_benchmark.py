@@ -0,0 +1,24 @@
+import unittest
+from benchmarks.render_benchmark import compare_results
+
+class TestRenderBenchmark(unittest.TestCase):
+    def results(self, **stages):
+        return {'scales': {'small': {stage: {'median_seconds': value} for stage, value in stages.items()}}}
+
+    def test_regression_past_threshold(self):
+        baseline = self.results(compose=4.0, image_process=0.07)
+        current = self.results(compose=5.5, image_process=0.071)
+        regressions = compare_results(current, baseline, threshold=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('small/compose'))
+
+    def test_small_absolute_noise_ignored(self):
+        baseline = self.results(subtitle_generate=0.008)
+        current = self.results(subtitle_generate=0.02)
+        self.assertEqual(compare_results(current, baseline, threshold=0.25), [])
+
+    def test_missing_baseline_entries_skipped(self):
+        self.assertEqual(compare_results(self.results(compose=9.0), {'scales': {}}, threshold=0.25), [])
+
+if __name__ == '__main__':
+    unittest.main()
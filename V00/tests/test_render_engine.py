@@ -0,0 +1,69 @@
+import unittest
+import os
+import shutil
+import subprocess
+import numpy as np
+from moviepy.editor import ColorClip
+from media_probe import get_ffmpeg_binary, probe_metadata
+from render_engine import RenderCancelled, StreamingRenderer
+
+def decode_frames(path: str, size: tuple) -> np.ndarray:
+    """解码输出文件的全部帧（moviepy 的 nframes 是按时长估算的，不能用来数帧）"""
+    output = subprocess.run([get_ffmpeg_binary(), '-v', 'error', '-i', path, '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'],
+                            stdout=subprocess.PIPE, check=True).stdout
+    return np.frombuffer(output, dtype=np.uint8).reshape(-1, size[1], size[0], 3)
+
+class TestStreamingRenderer(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_data'
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_timeline_streamed_into_one_encoder(self):
+        path = os.path.join(self.output_dir, 'timeline.mp4')
+        clips = [
+            ColorClip((64, 36), color=(255, 0, 0), duration=0.5),
+            # 比画布小的片段居中放置，四周补黑
+            ColorClip((32, 18), color=(0, 0, 255), duration=0.3),
+        ]
+        progress = []
+        frames = StreamingRenderer(path, (64, 36), fps=10, ffmpeg_params=['-preset', 'ultrafast']).render(
+            clips, progress_callback=lambda done, total: progress.append((done, total)))
+        self.assertEqual(frames, 8)
+        self.assertEqual(progress[-1], (8, 8))
+
+        metadata = probe_metadata(path)
+        self.assertEqual((metadata['width'], metadata['height']), (64, 36))
+        decoded = decode_frames(path, (64, 36))
+        self.assertEqual(len(decoded), 8)
+        first, last = decoded[0].astype(int), decoded[-1].astype(int)
+        # 编码有损，按颜色的大致取值判断
+        self.assertGreater(first[18, 32, 0], 200)
+        self.assertLess(first[18, 32, 2], 60)
+        self.assertGreater(last[18, 32, 2], 200)
+        self.assertLess(last[2, 2].max(), 30)
+
+    def test_duration_limits_decoded_frames(self):
+        path = os.path.join(self.output_dir, 'limited.mp4')
+        decoded = []
+        clip = ColorClip((64, 36), color=(0, 255, 0), duration=1.0)
+        make_frame = clip.make_frame
+        clip.make_frame = lambda t: decoded.append(t) or make_frame(t)
+        frames = StreamingRenderer(path, (64, 36), fps=10).render([clip], duration=0.4)
+        self.assertEqual(frames, 4)
+        self.assertEqual(len(decoded), 4)
+
+    def test_stops_when_cancelled(self):
+        path = os.path.join(self.output_dir, 'cancelled.mp4')
+        progress = []
+        renderer = StreamingRenderer(path, (64, 36), fps=10, ffmpeg_params=['-preset', 'ultrafast'])
+        with self.assertRaises(RenderCancelled):
+            renderer.render([ColorClip((64, 36), color=(0, 255, 0), duration=1.0)],
+                            progress_callback=lambda done, total: progress.append(done),
+                            should_continue=lambda: len(progress) < 3)
+        self.assertEqual(progress, [1, 2, 3])
+
+if __name__ == '__main__':
+    unittest.main()
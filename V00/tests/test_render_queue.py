@@ -0,0 +1,115 @@
+import unittest
+import os
+import shutil
+import time
+import wave
+import numpy as np
+from PIL import Image
+from render_queue import CANCELLED, FAILED, PENDING, RUNNING, JobQueue, RenderScheduler
+from tts_factory import TTSFactory, TTSProvider
+
+class SilentTTSProvider(TTSProvider):
+    """每个字 0.1 秒静音的本地 TTS"""
+    async def synthesize_segment(self, text, voice_name, speed, output_file):
+        with wave.open(output_file, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(b'\x00\x00' * 800 * len(text))
+        return True
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = 'test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.db_path = os.path.join(self.test_dir, 'queue.sqlite')
+        self.queue = JobQueue(self.db_path, os.path.join(self.test_dir, 'jobs'))
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_jobs_get_separate_workdirs(self):
+        first = self.queue.submit('文案一', 'images', 'videos', name='同名')
+        second = self.queue.submit('文案二', 'images', 'videos', name='同名')
+        self.assertNotEqual(self.queue.get(first)['workdir'], self.queue.get(second)['workdir'])
+
+    def test_interrupted_jobs_requeued(self):
+        job_id = self.queue.submit('文案', 'images', 'videos')
+        self.assertEqual(self.queue.claim_next()['id'], job_id)
+        self.assertEqual(self.queue.get(job_id)['status'], RUNNING)
+        self.queue.close()
+        # 模拟程序重启
+        self.queue = JobQueue(self.db_path, os.path.join(self.test_dir, 'jobs'))
+        self.assertEqual(self.queue.get(job_id)['status'], PENDING)
+
+    def test_cancel_pending(self):
+        job_id = self.queue.submit('文案', 'images', 'videos')
+        self.assertTrue(self.queue.cancel(job_id))
+        self.assertIsNone(self.queue.claim_next())
+
+class TestRenderScheduler(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = 'test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.queue = JobQueue(os.path.join(self.test_dir, 'queue.sqlite'), os.path.join(self.test_dir, 'jobs'))
+        self.config = {'probe_cache_path': os.path.join(self.test_dir, 'probe.sqlite'), 'incremental_render': False}
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_memory_limit_blocks_start(self):
+        scheduler = RenderScheduler(self.queue, self.config, max_jobs=4, memory_per_job_mb=10 ** 9)
+        self.assertFalse(scheduler.can_start())
+
+    def test_failed_job_recorded(self):
+        scheduler = RenderScheduler(self.queue, self.config, max_jobs=2, memory_per_job_mb=0,
+                                    threshold_mb=0, poll_interval=0.05)
+        job_id = self.queue.submit('文案', os.path.join(self.test_dir, 'missing'), self.test_dir)
+        scheduler.start()
+        deadline = time.time() + 10
+        while self.queue.get(job_id)['status'] != FAILED and time.time() < deadline:
+            time.sleep(0.05)
+        scheduler.stop()
+        job = self.queue.get(job_id)
+        self.assertEqual(job['status'], FAILED)
+        self.assertEqual(job['error'], '图片文件夹不存在')
+
+    def test_cancel_running_job_during_compose(self):
+        TTSFactory.register_provider('silent', SilentTTSProvider)
+        image_dir = os.path.join(self.test_dir, 'images')
+        video_dir = os.path.join(self.test_dir, 'videos')
+        os.makedirs(image_dir)
+        os.makedirs(video_dir)
+        for index in range(2):
+            Image.fromarray(np.full((36, 64, 3), 80 * index, dtype=np.uint8)).save(
+                os.path.join(image_dir, f'image_{index}.png'))
+        config = dict(self.config, voice_mode='silent', canvas_width=64, canvas_height=36,
+                      export_profile='draft', profile_render=False, resume_renders=False,
+                      tts_cache_dir=os.path.join(self.test_dir, 'tts'))
+        statuses = []
+
+        def on_update(job_id):
+            status = self.queue.status_text.get(job_id)
+            if status == '正在合成最终视频...' and status not in statuses:
+                statuses.append(status)
+                # 合成开始后取消，此时任务处于运行中
+                self.assertEqual(self.queue.get(job_id)['status'], RUNNING)
+                scheduler.cancel(job_id)
+
+        scheduler = RenderScheduler(self.queue, config, max_jobs=1, memory_per_job_mb=0,
+                                    threshold_mb=0, poll_interval=0.05, on_update=on_update)
+        job_id = self.queue.submit('第一句文案。第二句文案。', image_dir, video_dir)
+        scheduler.start()
+        deadline = time.time() + 30
+        while self.queue.get(job_id)['status'] in (PENDING, RUNNING) and time.time() < deadline:
+            time.sleep(0.05)
+        scheduler.stop()
+        self.assertEqual(statuses, ['正在合成最终视频...'])
+        job = self.queue.get(job_id)
+        self.assertEqual(job['status'], CANCELLED)
+        self.assertIsNone(job['output'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import os
+import shutil
+import numpy as np
+from moviepy.editor import VideoClip
+from render_engine import StreamingRenderer
+from scene_detect import SceneCache, SceneDetector, frame_histograms
+from video_strategy import VideoProcessor
+from probe_cache import ProbeCache
+
+class TestSceneDetector(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_data'
+        self.video_dir = os.path.join(self.output_dir, 'videos')
+        os.makedirs(self.video_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def make_video(self, name='shots.mp4'):
+        """三个 2 秒的镜头：灰色静止画面、滚动的随机纹理、黑场"""
+        rng = np.random.default_rng(0)
+        texture = rng.integers(0, 256, size=(36, 64, 3), dtype=np.uint8)
+        gray = np.full((36, 64, 3), 128, dtype=np.uint8)
+        black = np.zeros((36, 64, 3), dtype=np.uint8)
+
+        def make_frame(t):
+            if t < 2:
+                return gray
+            if t < 4:
+                return np.roll(texture, int(t * 20), axis=1)
+            return black
+
+        path = os.path.join(self.video_dir, name)
+        clip = VideoClip(make_frame, duration=6)
+        StreamingRenderer(path, (64, 36), fps=10, ffmpeg_params=['-preset', 'ultrafast']).render([clip])
+        return path
+
+    def test_histograms_match_numpy(self):
+        frames = np.random.default_rng(1).integers(0, 256, size=(3, 8, 8, 3), dtype=np.uint8)
+        expected = [np.histogramdd(frame.reshape(-1, 3), bins=4, range=[(0, 256)] * 3)[0].ravel() / 64
+                    for frame in frames]
+        np.testing.assert_allclose(frame_histograms(frames), expected)
+
+    def test_shots_split_and_scored(self):
+        shots = SceneDetector(sample_fps=4).analyze(self.make_video())
+        self.assertEqual([(shot['start'], shot['end']) for shot in shots], [(0, 2), (2, 4), (4, 6)])
+        # 运动的纹理得分最高，黑场不可用
+        self.assertEqual(max(shots, key=lambda shot: shot['score']), shots[1])
+        self.assertEqual(shots[2]['score'], 0)
+
+    def test_results_cached_per_file(self):
+        path = self.make_video()
+        cache = SceneCache(os.path.join(self.output_dir, 'scenes.sqlite'))
+        shots = SceneDetector(cache=cache).analyze(path)
+        self.assertEqual(SceneDetector(cache=cache).analyze(path), shots)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # 检测参数不同时不能复用
+        SceneDetector(sample_fps=4, cache=cache).analyze(path)
+        self.assertEqual(cache.misses, 2)
+        # 文件修改后重新检测
+        os.utime(path, ns=(0, 0))
+        SceneDetector(cache=cache).analyze(path)
+        self.assertEqual(cache.misses, 3)
+        cache.close()
+
+    def test_select_best_segments(self):
+        detector = SceneDetector(max_segments=2, segment_seconds=2)
+        shots = [
+            [{'start': 0, 'end': 6, 'score': 0.5}, {'start': 6, 'end': 7, 'score': 0.1}],
+            [{'start': 0, 'end': 3, 'score': 0.9}, {'start': 3, 'end': 5, 'score': 0.2}],
+        ]
+        # 片段取镜头中间部分，按文件和时间排序；结束时间不超过素材时长
+        self.assertEqual(detector.select(shots, [6, 2.5]), [(0, 2, 4), (1, 0.25, 2.25)])
+
+    def test_video_processor_keeps_selected_segments(self):
+        self.make_video()
+        processor = VideoProcessor(
+            probe_cache=ProbeCache(os.path.join(self.output_dir, 'probe.sqlite')),
+            scene_detector=SceneDetector(sample_fps=4, max_segments=1, segment_seconds=1)
+        )
+        clips = processor.process(self.video_dir)
+        self.assertEqual(len(clips), 1)
+        self.assertAlmostEqual(clips[0].duration, 1)
+        self.assertEqual(clips[0].edit_ops[-1], ('subclip', 2.5, 3.5))
+        # 取帧来自运动纹理镜头
+        self.assertGreater(clips[0].get_frame(0).std(), 30)
+        clips[0].close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import unittest
+import asyncio
+import json
+import os
+import shutil
+import time
+import wave
+from PIL import Image
+from lazy_clips import LazyImageClip
+from render_engine import RenderCancelled, SegmentedRenderer
+from segment_cache import SegmentCache
+from subtitle_renderer import SubtitleTrack
+from tts_factory import TTSProvider
+from video_strategy import SubtitleGenerator, VideoComposer
+
+class CharTTSProvider(TTSProvider):
+    """每个字 0.13 秒静音的本地 TTS，时长不是整数帧"""
+    async def synthesize_segment(self, text, voice_name, speed, output_file):
+        with wave.open(output_file, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(b'\x00\x00' * 1040 * len(text))
+        return True
+
+class TestSegmentKeys(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_data'
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.images = []
+        for index, color in enumerate(('red', 'green', 'blue')):
+            path = os.path.join(self.output_dir, f'{index}.png')
+            Image.new('RGB', (64, 36), color).save(path)
+            self.images.append(path)
+        self.renderer = SegmentedRenderer(
+            os.path.join(self.output_dir, 'out.mp4'), (64, 36),
+            SegmentCache(os.path.join(self.output_dir, 'segments')), fps=10, segment_seconds=2.0
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def keys(self, cues=()):
+        clips = [LazyImageClip(path, 3.0, (64, 36)) for path in self.images]
+        subtitle = SubtitleTrack(list(cues), (64, 36))
+        return [segment['key'] for segment in self.renderer.plan_segments(clips, [subtitle])]
+
+    def test_segments_split_at_clip_boundaries(self):
+        keys = self.keys()
+        # 每张 3 秒的图片按 2 秒上限切成 2 段
+        self.assertEqual(len(keys), 6)
+        self.assertEqual(keys, self.keys())
+
+    def test_only_changed_image_is_dirty(self):
+        before = self.keys()
+        time.sleep(0.01)
+        Image.new('RGB', (64, 36), 'yellow').save(self.images[1])
+        after = self.keys()
+        self.assertEqual([a == b for a, b in zip(before, after)], [True, True, False, False, True, True])
+
+    def test_only_segments_with_changed_cue_are_dirty(self):
+        before = self.keys([{'text': '你好', 'start': 0.0, 'end': 1.0}, {'text': '世界', 'start': 6.5, 'end': 7.5}])
+        after = self.keys([{'text': '你好', 'start': 0.0, 'end': 1.0}, {'text': '再见', 'start': 6.5, 'end': 7.5}])
+        self.assertEqual([a == b for a, b in zip(before, after)], [True, True, True, True, False, True])
+
+    def test_encode_stats_count_only_encoded_frames(self):
+        composer = VideoComposer(os.path.join(self.output_dir, 'output'), fps=10, profile='draft',
+                                 segment_cache=SegmentCache(os.path.join(self.output_dir, 'cache')),
+                                 segment_seconds=2.0)
+
+        def compose():
+            clips = [LazyImageClip(path, 3.0, (64, 36)) for path in self.images]
+            self.assertTrue(composer.compose(clips, SubtitleTrack([], (64, 36)), None)[1])
+            with open(composer.stats_file, encoding='utf-8') as f:
+                return [json.loads(line) for line in f]
+
+        self.assertEqual([(entry['frames'], entry['encoded_frames']) for entry in compose()], [(90, 90)])
+        time.sleep(0.01)
+        Image.new('RGB', (64, 36), 'yellow').save(self.images[1])
+        # 第二次渲染只重新编码第二张图片的两个分段，帧率按这 30 帧计算
+        second = compose()[-1]
+        self.assertEqual((second['frames'], second['encoded_frames']), (90, 30))
+        self.assertAlmostEqual(second['fps'], 30 / second['seconds'], delta=0.01 * second['fps'] + 0.01)
+        # 全部分段复用时不记录编码速度
+        self.assertEqual(len(compose()), 2)
+
+class TestScriptEdit(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_data'
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.images = []
+        for index in range(8):
+            path = os.path.join(self.output_dir, f'{index}.png')
+            Image.new('RGB', (64, 36), (30 * index, 255 - 30 * index, 128)).save(path)
+            self.images.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_one_line_edit_reuses_most_segments(self):
+        composer = VideoComposer(os.path.join(self.output_dir, 'output'), fps=10, profile='draft',
+                                 segment_cache=SegmentCache(os.path.join(self.output_dir, 'cache')))
+        provider = CharTTSProvider(frame_rate=composer.fps)
+        generator = SubtitleGenerator((64, 36))
+        audio_file = os.path.join(self.output_dir, 'narration.wav')
+
+        def compose(script):
+            self.assertTrue(asyncio.run(provider.generate_speech(script, 'am_adam', 1.0, audio_file)))
+            subtitle = generator.generate(script, 0.0, audio_file)
+            segments = []
+            composer.on_segment = lambda index, total, reused: segments.append(reused)
+            clips = [LazyImageClip(path, 3.0, (64, 36)) for path in self.images]
+            self.assertTrue(composer.compose(clips, subtitle, audio_file)[1])
+            return segments
+
+        lines = [f'第{index}句配音文案。' for index in range(16)]
+        self.assertNotIn(True, compose(''.join(lines)))
+        # 修改中间的一句，配音变长 0.52 秒（不是整数帧）
+        lines[7] = '第七句改成了更长的文案。'
+        segments = compose(''.join(lines))
+        self.assertEqual(len(segments), 8)
+        self.assertLessEqual(segments.count(False), 2)
+        self.assertEqual(segments[:3], [True, True, True])
+
+class TestSegmentCacheLeases(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = os.path.join('test_data', 'segments')
+
+    def tearDown(self):
+        shutil.rmtree('test_data', ignore_errors=True)
+
+    def put(self, cache, key):
+        path = cache.temp_path(key)
+        with open(path, 'wb') as f:
+            f.write(b'\0' * 100)
+        return cache.put(key, path)
+
+    def test_segments_in_use_by_other_job_survive_eviction(self):
+        # 两个并发任务各自创建缓存对象，共用目录；预算只够一个分段
+        job_a = SegmentCache(self.cache_dir, max_bytes=100)
+        job_b = SegmentCache(self.cache_dir, max_bytes=100)
+        first = self.put(job_a, 'a' * 64)
+        job_a.release(['a' * 64])
+        self.assertEqual(job_b.get('a' * 64), first)
+        self.put(job_a, 'b' * 64)
+        # 任务 A 淘汰时只保护自己的分段，任务 B 已取得、尚未拼接的分段也不能删除
+        job_a.evict(keep={'b' * 64})
+        self.assertTrue(os.path.exists(first))
+        job_b.release(['a' * 64])
+        job_a.evict(keep={'b' * 64})
+        self.assertFalse(os.path.exists(first))
+        self.assertIsNone(job_b.get('a' * 64))
+        self.assertFalse(job_b.leases.in_use('a' * 64))
+        job_a.release(['b' * 64])
+
+    def test_render_releases_segments_after_concat(self):
+        cache = SegmentCache(self.cache_dir)
+        image = os.path.join('test_data', 'still.png')
+        Image.new('RGB', (64, 36), 'red').save(image)
+        renderer = SegmentedRenderer(os.path.join('test_data', 'out.mp4'), (64, 36), cache, fps=10, segment_seconds=1.0)
+        for _ in range(2):
+            renderer.render([LazyImageClip(image, 2.0, (64, 36))])
+            keys = [segment['key'] for segment in renderer.plan_segments([LazyImageClip(image, 2.0, (64, 36))], [])]
+            self.assertFalse(any(cache.leases.in_use(key) for key in keys))
+        self.assertEqual((renderer.encoded, renderer.reused), (0, 2))
+
+    def test_cancel_between_segments_skips_concat(self):
+        cache = SegmentCache(self.cache_dir)
+        image = os.path.join('test_data', 'still.png')
+        Image.new('RGB', (64, 36), 'red').save(image)
+        output_file = os.path.join('test_data', 'out.mp4')
+        segments = []
+        renderer = SegmentedRenderer(output_file, (64, 36), cache, fps=10, segment_seconds=1.0,
+                                     on_segment=lambda index, total, reused: segments.append(index))
+        with self.assertRaises(RenderCancelled):
+            renderer.render([LazyImageClip(image, 3.0, (64, 36))], should_continue=lambda: not segments)
+        self.assertEqual(segments, [0])
+        self.assertFalse(os.path.exists(output_file))
+        # 已编码的分段留在缓存中，登记已释放
+        key = renderer.plan_segments([LazyImageClip(image, 3.0, (64, 36))])[0]['key']
+        self.assertFalse(cache.leases.in_use(key))
+        self.assertIsNotNone(cache.get(key))
+        cache.release([key])
+
+if __name__ == '__main__':
+    unittest.main()
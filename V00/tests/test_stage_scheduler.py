@@ -0,0 +1,82 @@
+import unittest
+import threading
+from stage_scheduler import StageError, StageScheduler
+
+class TestStageScheduler(unittest.TestCase):
+    def test_dependencies_receive_results(self):
+        order = []
+
+        def stage(name, value):
+            def run(**inputs):
+                order.append(name)
+                return value + sum(inputs.values())
+            return run
+
+        scheduler = StageScheduler()
+        scheduler.add_stage('images', stage('images', 1))
+        scheduler.add_stage('audio', stage('audio', 10))
+        scheduler.add_stage('subtitle', stage('subtitle', 100), depends_on=('images', 'audio'))
+        scheduler.add_stage('compose', stage('compose', 1000), depends_on=('subtitle',))
+        results = scheduler.run()
+        self.assertEqual(results, {'images': 1, 'audio': 10, 'subtitle': 111, 'compose': 1111})
+        self.assertEqual(order[2:], ['subtitle', 'compose'])
+        self.assertEqual(set(scheduler.timings), {'images', 'audio', 'subtitle', 'compose'})
+
+    def test_independent_stages_run_concurrently(self):
+        # 两个阶段都要等对方到达屏障才能结束，串行执行时会超时
+        barrier = threading.Barrier(2, timeout=5)
+        scheduler = StageScheduler(max_workers=2)
+        scheduler.add_stage('images', lambda: barrier.wait())
+        scheduler.add_stage('audio', lambda: barrier.wait())
+        self.assertEqual(set(scheduler.run()), {'images', 'audio'})
+
+    def test_failure_stops_dependent_stages(self):
+        started = []
+        scheduler = StageScheduler()
+        scheduler.add_stage('audio', lambda: 1 / 0)
+        scheduler.add_stage('compose', lambda audio: started.append('compose'), depends_on=('audio',))
+        with self.assertRaises(StageError) as context:
+            scheduler.run()
+        self.assertEqual(context.exception.stage, 'audio')
+        self.assertIsInstance(context.exception.error, ZeroDivisionError)
+        self.assertEqual(started, [])
+
+    def test_cancel_between_stages(self):
+        running = {'value': True}
+        started = []
+
+        def first():
+            started.append('first')
+            # 模拟用户在阶段执行期间点击停止
+            running['value'] = False
+
+        scheduler = StageScheduler()
+        scheduler.add_stage('first', first)
+        scheduler.add_stage('second', lambda first: started.append('second'), depends_on=('first',))
+        with self.assertRaises(StageError) as context:
+            scheduler.run(should_continue=lambda: running['value'])
+        self.assertEqual(context.exception.stage, 'scheduler')
+        self.assertEqual(started, ['first'])
+
+    def test_cancel_during_last_stage(self):
+        running = {'value': True}
+
+        def compose(first):
+            # 最后一个阶段执行期间取消，阶段本身正常返回
+            running['value'] = False
+            return 'out.mp4'
+
+        scheduler = StageScheduler()
+        scheduler.add_stage('first', lambda: 1)
+        scheduler.add_stage('compose', compose, depends_on=('first',))
+        with self.assertRaises(StageError) as context:
+            scheduler.run(should_continue=lambda: running['value'])
+        self.assertEqual(context.exception.stage, 'scheduler')
+
+    def test_unknown_dependency_rejected(self):
+        scheduler = StageScheduler()
+        with self.assertRaises(ValueError):
+            scheduler.add_stage('compose', lambda audio: None, depends_on=('audio',))
+
+if __name__ == '__main__':
+    unittest.main()
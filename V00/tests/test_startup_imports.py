@@ -0,0 +1,20 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+
+# 开始渲染时才加载的模块，界面启动时不能导入
+DEFERRED_MODULES = ('moviepy.editor', 'gradio_client', 'PIL', 'pipeline', 'tts_factory')
+
+class TestStartupImports(unittest.TestCase):
+    def test_import_main_defers_render_modules(self):
+        code = ('import sys, json, main; '
+                f'print(json.dumps([name for name in {DEFERRED_MODULES!r} if name in sys.modules]))')
+        env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                env=env).stdout
+        self.assertEqual(json.loads(output.strip().splitlines()[-1]), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import shutil
+import wave
+import numpy as np
+from subtitle_alignment import align_to_speech, cues_from_timings, detect_speech_regions, write_srt
+
+class TestSubtitleAlignment(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_data'
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def write_wav(self, pattern, sample_rate=8000):
+        """pattern: [(秒数, 是否有声), ...]"""
+        rng = np.random.default_rng(0)
+        chunks = [
+            rng.normal(0, 3000, int(sample_rate * seconds)) if voiced else np.zeros(int(sample_rate * seconds))
+            for seconds, voiced in pattern
+        ]
+        path = os.path.join(self.output_dir, 'speech.wav')
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(sample_rate)
+            f.writeframes(np.concatenate(chunks).astype('<i2').tobytes())
+        return path
+
+    def test_detect_speech_regions(self):
+        path = self.write_wav([(0.5, False), (1.0, True), (0.5, False), (2.0, True)])
+        regions = detect_speech_regions(path)
+        self.assertEqual(len(regions), 2)
+        self.assertAlmostEqual(regions[0][0], 0.5, delta=0.05)
+        self.assertAlmostEqual(regions[1][1], 4.0, delta=0.05)
+
+    def test_align_skips_silence(self):
+        cues = align_to_speech(['一二三', '四五六七八九'], [(0.0, 1.0), (2.0, 3.0), (3.5, 4.5)])
+        self.assertEqual(cues[0]['start'], 0.0)
+        # 边界落在停顿处，而不是按总时长均分
+        self.assertEqual(cues[0]['end'], cues[1]['start'])
+        self.assertIn(cues[1]['start'], (1.0, 2.0))
+        self.assertEqual(cues[1]['end'], 4.5)
+
+    def test_cues_from_timings_and_srt(self):
+        timings = [{'index': 0, 'text': '第一句。', 'start': 0.0, 'end': 1.5},
+                   {'index': 1, 'text': '第二句，很长。', 'start': 1.5, 'end': 3.25}]
+        cues = cues_from_timings(timings, max_chars=4)
+        self.assertEqual(cues[0], {'text': '第一句。', 'start': 0.0, 'end': 1.5})
+        self.assertEqual(cues[-1]['end'], 3.25)
+        path = write_srt(cues, os.path.join(self.output_dir, 'out.srt'))
+        with open(path, encoding='utf-8') as f:
+            self.assertTrue(f.read().startswith('1\n00:00:00,000 --> 00:00:01,500\n第一句。\n'))
+
+if __name__ == '__main__':
+    unittest.main()
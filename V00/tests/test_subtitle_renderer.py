@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+from subtitle_renderer import SubtitleSprite, SubtitleTrack, wrap_text
+
+class FixedWidthFont:
+    """每个字符宽 10 像素的字体，换行结果与系统字体无关"""
+    def getlength(self, text):
+        return len(text) * 10
+
+class TestSubtitleSprite(unittest.TestCase):
+    def test_blend_matches_hand_computed_pixel(self):
+        sprite = SubtitleSprite(np.array([[[200, 100, 50, 128]]], dtype=np.uint8))
+        frame = np.array([[[10, 20, 250], [1, 2, 3]]], dtype=np.uint8)
+        sprite.blend_into(frame, 0, 0)
+        # (c * a + f * (255 - a) + 127) // 255
+        self.assertEqual(frame[0, 0].tolist(), [105, 60, 150])
+        # 包围盒之外的像素不变
+        self.assertEqual(frame[0, 1].tolist(), [1, 2, 3])
+
+    def test_opaque_white_over_white_does_not_overflow(self):
+        sprite = SubtitleSprite(np.full((2, 2, 4), 255, dtype=np.uint8))
+        frame = np.full((4, 4, 3), 255, dtype=np.uint8)
+        sprite.blend_into(frame, 1, 1)
+        self.assertTrue((frame == 255).all())
+        self.assertEqual(sprite.premultiplied.max(), 255 * 255 + 127)
+
+    def test_blend_clipped_at_frame_edges(self):
+        rgba = np.zeros((2, 2, 4), dtype=np.uint8)
+        rgba[..., 0] = 255
+        rgba[..., 3] = 255
+        frame = np.zeros((3, 3, 3), dtype=np.uint8)
+        SubtitleSprite(rgba).blend_into(frame, 2, -1)
+        self.assertEqual(frame[:, :, 0].tolist(), [[0, 0, 255], [0, 0, 0], [0, 0, 0]])
+        SubtitleSprite(rgba).blend_into(frame, 5, 5)
+        self.assertEqual(int(frame.sum()), 255)
+
+class TestSubtitleTrack(unittest.TestCase):
+    def test_cue_at_boundaries(self):
+        track = SubtitleTrack([
+            {'text': '第二句', 'start': 1.0, 'end': 2.0},
+            {'text': '第一句', 'start': 0.0, 'end': 1.0},
+            {'text': '第三句', 'start': 2.5, 'end': 3.0},
+        ], (320, 180))
+        # 开始时间包含在内，结束时间不包含
+        self.assertEqual(track.cue_at(0.0)['text'], '第一句')
+        self.assertEqual(track.cue_at(0.999)['text'], '第一句')
+        self.assertEqual(track.cue_at(1.0)['text'], '第二句')
+        self.assertIsNone(track.cue_at(-0.1))
+        self.assertIsNone(track.cue_at(2.0))
+        self.assertEqual(track.cue_at(2.5)['text'], '第三句')
+        self.assertIsNone(track.cue_at(3.0))
+        self.assertEqual(track.duration, 3.0)
+
+    def test_wrap_cjk_per_character(self):
+        self.assertEqual(wrap_text('一二三四五六七八九十甲乙', FixedWidthFont(), 50),
+                         ['一二三四五', '六七八九十', '甲乙'])
+
+    def test_wrap_english_at_spaces(self):
+        font = FixedWidthFont()
+        self.assertEqual(wrap_text('the quick brown fox', font, 100), ['the quick', 'brown fox'])
+        # 没有空格的长单词只能按字符断开
+        self.assertEqual(wrap_text('abcdefghijkl', font, 50), ['abcde', 'fghij', 'kl'])
+        self.assertEqual(wrap_text('ab\n\ncd', font, 100), ['ab', 'cd'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import os
+import shutil
+from moviepy.editor import ColorClip
+from PIL import Image
+from lazy_clips import LazyImageClip
+from render_engine import frame_count
+from timeline_planner import TimelinePlanner
+
+class TestTimelinePlanner(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_data'
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.image_file = os.path.join(self.output_dir, 'still.png')
+        Image.new('RGB', (64, 36), 'red').save(self.image_file)
+        self.planner = TimelinePlanner(min_image_duration=1.0, min_speed=0.8, max_speed=1.5)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def image(self):
+        return LazyImageClip(self.image_file, 3.0, (64, 36))
+
+    def video(self, duration):
+        return ColorClip((64, 36), color=(0, 0, 255), duration=duration)
+
+    def total(self, clips):
+        return sum(clip.duration for clip in clips)
+
+    def test_images_absorb_difference(self):
+        clips = self.planner.plan([self.image(), self.video(4.0), self.image()], 10.0)
+        self.assertEqual([round(clip.duration, 3) for clip in clips], [3.0, 4.0, 3.0])
+
+    def test_long_timeline_sped_up_then_trimmed(self):
+        clips = self.planner.plan([self.image(), self.video(6.0), self.video(6.0)], 8.0)
+        self.assertAlmostEqual(self.total(clips), 8.0, places=6)
+        self.assertEqual(clips[0].duration, 1.0)
+        # 两个视频加速 1.5 倍后仍超出，第二个视频被截断
+        self.assertAlmostEqual(clips[1].duration, 4.0, places=6)
+        self.assertAlmostEqual(clips[2].duration, 3.0, places=6)
+
+    def test_videos_only_sped_up(self):
+        clips = self.planner.plan([self.video(6.0), self.video(6.0)], 9.0)
+        self.assertEqual(clips[0].edit_ops, (('speed', 1.3),))
+        self.assertAlmostEqual(self.total(clips), 9.0, places=6)
+        self.assertEqual(len(clips), 2)
+
+    def test_short_timeline_looped(self):
+        clips = self.planner.plan([self.video(2.0)], 7.0)
+        self.assertAlmostEqual(self.total(clips), 7.0, places=6)
+        self.assertGreater(len(clips), 1)
+
+    def test_frames_match_narration(self):
+        clips = self.planner.plan([self.image(), self.video(5.0), self.image()], 9.5)
+        self.assertEqual(sum(frame_count(clip.duration, 24) for clip in clips), frame_count(9.5, 24))
+
+    def test_images_aligned_to_cue_starts(self):
+        anchors = [0.0, 1.2, 2.5, 3.1, 4.6, 6.0, 7.3]
+        clips = self.planner.plan([self.image() for _ in range(3)], 9.0, anchors=anchors, fps=10)
+        self.assertEqual([clip.duration for clip in clips], [3.1, 2.9, 3.0])
+        # 第二张图片内的一句变长 0.8 秒：其后的字幕整体平移，只有第二张图片变长
+        shifted = anchors[:4] + [anchor + 0.8 for anchor in anchors[4:]]
+        clips = self.planner.plan([self.image() for _ in range(3)], 9.8, anchors=shifted, fps=10)
+        self.assertEqual([clip.duration for clip in clips], [3.1, 3.7, 3.0])
+
+    def test_speed_quantized(self):
+        # 配音时长的小幅变化不改变视频倍速，只改变末尾的截断位置
+        first = self.planner.plan([self.image(), self.video(6.0), self.video(6.0)], 10.0)
+        second = self.planner.plan([self.image(), self.video(6.0), self.video(6.0)], 10.2)
+        # 12 / 9 和 12 / 9.2 都取整到 1.3 倍
+        self.assertEqual(first[1].edit_ops, (('speed', 1.3),))
+        self.assertEqual(second[1].edit_ops, first[1].edit_ops)
+        self.assertAlmostEqual(self.total(second), 10.2, places=6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+from moviepy.editor import VideoClip
+from render_engine import release_reader, timeline_counts
+from segment_cache import clip_signature
+from timeline_planner import TimelinePlanner
+from transitions import TransitionClip, Transitions, create_transitions
+
+class FakeReader:
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed += 1
+
+def solid(value, duration, size=(32, 18)):
+    frame = np.full((size[1], size[0], 3), value, dtype=np.uint8)
+    clip = VideoClip(lambda t: frame, duration=duration)
+    clip.reader = FakeReader()
+    return clip
+
+class TestTransitions(unittest.TestCase):
+    fps = 10
+
+    def test_only_overlap_frames_blended(self):
+        clips = [solid(0, 2.0), solid(200, 2.0), solid(100, 2.0)]
+        timeline = Transitions('crossfade', 0.5).apply(clips, (32, 18), self.fps)
+        self.assertEqual([type(clip) is TransitionClip for clip in timeline], [False, True, False, True, False])
+        # 每个边界重叠 5 帧，总帧数减少 10 帧
+        self.assertEqual(timeline_counts(timeline, self.fps), [15, 5, 10, 5, 15])
+        # 非重叠帧原样经过，不复制也不修改
+        self.assertIs(timeline[0].get_frame(0), clips[0].get_frame(0))
+        blended = [int(timeline[1].get_frame(index / self.fps)[0, 0, 0]) for index in range(5)]
+        self.assertEqual(blended, sorted(blended))
+        self.assertTrue(0 < blended[0] and blended[-1] < 200)
+        self.assertEqual(clips[0].get_frame(0)[0, 0, 0], 0)
+
+    def test_dip_to_black_and_wipe(self):
+        dip = TransitionClip(solid(200, 1.0), solid(100, 1.0), 'dip_to_black', 9, self.fps, (32, 18))
+        levels = [int(dip.get_frame(index / self.fps)[0, 0, 0]) for index in range(9)]
+        self.assertEqual(levels[4], 0)
+        self.assertTrue(levels[0] > levels[3] and levels[5] < levels[8] <= 100)
+        wipe = TransitionClip(solid(200, 1.0), solid(100, 1.0), 'wipe', 3, self.fps, (32, 18))
+        frame = wipe.get_frame(1 / self.fps)
+        self.assertEqual((frame[0, 0, 0], frame[0, -1, 0]), (100, 200))
+
+    def test_letterboxed_sources_fit_canvas(self):
+        clip = TransitionClip(solid(200, 1.0, (16, 18)), solid(100, 1.0), 'crossfade', 3, self.fps, (32, 18))
+        frame = clip.get_frame(0)
+        self.assertEqual(frame.shape, (18, 32, 3))
+        self.assertLess(frame[0, 0, 0], frame[0, 16, 0])
+
+    def test_short_clips_limit_overlap(self):
+        timeline = Transitions('crossfade', 1.0).apply([solid(0, 0.4), solid(100, 3.0)], (32, 18), self.fps)
+        self.assertEqual(timeline_counts(timeline, self.fps), [2, 2, 28])
+
+    def test_planner_reserves_overlap(self):
+        # 不放慢视频，循环时间线补足时长
+        clips = TimelinePlanner(min_speed=1.0).plan([solid(0, 3.0), solid(100, 3.0), solid(200, 3.0)], 10.0,
+                                                    overlap=0.5)
+        timeline = Transitions('crossfade', 0.5).apply(clips, (32, 18), self.fps)
+        self.assertEqual(sum(timeline_counts(timeline, self.fps)), 100)
+
+    def test_shared_readers_stay_open(self):
+        clips = [solid(0, 2.0), solid(100, 2.0)]
+        head, transition, tail = Transitions('crossfade', 0.5).apply(clips, (32, 18), self.fps)
+        release_reader(head, transition)
+        self.assertEqual(clips[0].reader.closed, 0)
+        release_reader(transition, tail)
+        self.assertEqual((clips[0].reader.closed, clips[1].reader.closed), (1, 0))
+
+    def test_signature_requires_file_sources(self):
+        transition = TransitionClip(solid(0, 1.0), solid(100, 1.0), 'crossfade', 3, self.fps, (32, 18))
+        self.assertIsNone(clip_signature(transition))
+
+    def test_create_transitions(self):
+        self.assertIsNone(create_transitions('none', 0.5))
+        self.assertIsNone(create_transitions('crossfade', 0))
+        with self.assertRaises(ValueError):
+            create_transitions('spin', 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import asyncio
+import os
+import shutil
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from tts_factory import GradioTTSProvider, TTSFactory, LocalTTSProvider
+
+class StandInClient:
+    """模拟 Gradio Client：submit 返回在后台线程中完成的 Future"""
+    instances = 0
+
+    def __init__(self, server_url, fail_times=0, delay=0.0):
+        StandInClient.instances += 1
+        self.server_url = server_url
+        self.fail_times = fail_times
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.output_dir = os.path.join('test_tts_factory_output', 'server')
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def _predict(self, text, call):
+        time.sleep(self.delay)
+        if call <= self.fail_times:
+            raise ConnectionError('server unavailable')
+        audio_path = os.path.join(self.output_dir, f'{call}.wav')
+        with wave.open(audio_path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(1000)
+            f.writeframes(b'\x00\x00' * 100 * len(text))
+        return None, audio_path
+
+    def submit(self, text, voice, speed, api_name):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        return self.executor.submit(self._predict, text, call)
+
+class TestGradioTTSProvider(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_tts_factory_output'
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.output_file = os.path.join(self.output_dir, 'temp_audio.wav')
+        GradioTTSProvider.close_clients()
+
+    def tearDown(self):
+        # 等待模拟服务端的后台请求结束后再清理目录
+        for client in GradioTTSProvider._clients.values():
+            client.executor.shutdown(wait=True)
+        GradioTTSProvider.close_clients()
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def make_provider(self, server_url, **client_options):
+        return GradioTTSProvider(
+            server_url,
+            retry_backoff=0.01,
+            client_factory=lambda url: StandInClient(url, **client_options)
+        )
+
+    def test_client_reused_across_providers(self):
+        before = StandInClient.instances
+        for _ in range(2):
+            provider = self.make_provider('http://stand-in-reuse')
+            self.assertTrue(asyncio.run(provider.generate_speech('第一句。第二句。', 'am_adam', 1.0, self.output_file)))
+        self.assertEqual(StandInClient.instances - before, 1)
+
+    def test_retry_with_backoff(self):
+        provider = self.make_provider('http://stand-in-retry', fail_times=2)
+        self.assertTrue(asyncio.run(provider.generate_speech('只有一句。', 'am_adam', 1.0, self.output_file)))
+        self.assertEqual(provider.get_client('http://stand-in-retry').calls, 3)
+
+    def test_request_timeout(self):
+        provider = self.make_provider('http://stand-in-timeout', delay=0.5)
+        provider.request_timeout = 0.05
+        provider.max_retries = 0
+        self.assertFalse(asyncio.run(provider.generate_speech('超时。', 'am_adam', 1.0, self.output_file)))
+
+    def test_cancel_from_other_thread(self):
+        provider = self.make_provider('http://stand-in-cancel', delay=0.3)
+        threading.Timer(0.1, provider.cancel).start()
+        started = time.perf_counter()
+        success = asyncio.run(provider.generate_speech('第一句。第二句。第三句。第四句。', 'am_adam', 1.0, self.output_file))
+        self.assertFalse(success)
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+class TestTTSFactory(unittest.TestCase):
+    def test_unsupported_options_ignored(self):
+        provider = TTSFactory.create_provider('local', server_url='http://unused', request_timeout=5, max_concurrency=4)
+        self.assertIsInstance(provider, LocalTTSProvider)
+        self.assertEqual(provider.max_concurrency, 4)
+
+if __name__ == '__main__':
+    unittest.main()
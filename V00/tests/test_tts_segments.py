@@ -0,0 +1,135 @@
+import unittest
+import asyncio
+import os
+import shutil
+import wave
+from speech_segments import split_text, load_segment_timings
+from tts_cache import TTSCache
+from tts_factory import TTSProvider
+
+class FakeTTSProvider(TTSProvider):
+    """按文本长度生成静音 WAV 的测试用 TTS"""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = []
+
+    async def synthesize_segment(self, text, voice_name, speed, output_file):
+        self.requests.append(text)
+        # 让较短的片段先完成，验证拼接顺序与完成顺序无关
+        await asyncio.sleep(0.01 * len(text))
+        with wave.open(output_file, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(1000)
+            f.writeframes(b'\x00\x00' * 100 * len(text))
+        return True
+
+class GatedTTSProvider(FakeTTSProvider):
+    """gates 中的文本等待对应事件后才开始合成"""
+    def __init__(self, gates=None, **kwargs):
+        super().__init__(**kwargs)
+        self.gates = gates or {}
+
+    async def synthesize_segment(self, text, voice_name, speed, output_file):
+        if text in self.gates:
+            await self.gates[text].wait()
+        return await super().synthesize_segment(text, voice_name, speed, output_file)
+
+class TestSplitText(unittest.TestCase):
+    def test_split_chinese_and_english(self):
+        segments = split_text('你好，世界！这是第一句。Hello world. Pi is 3.14 ok?')
+        self.assertEqual(segments, ['你好，世界！', '这是第一句。', 'Hello world.', 'Pi is 3.14 ok?'])
+
+    def test_long_sentence_split_at_clauses(self):
+        segments = split_text('一二三四五，六七八九十，一二三四五六七八九十。', max_chars=8)
+        self.assertTrue(all(len(segment) <= 8 for segment in segments))
+        self.assertEqual(''.join(segments), '一二三四五，六七八九十，一二三四五六七八九十。')
+
+class TestSegmentedSynthesis(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = 'test_tts_output'
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_segments_stitched_in_order(self):
+        provider = FakeTTSProvider(max_concurrency=2)
+        output_file = os.path.join(self.output_dir, 'temp_audio.wav')
+        success = asyncio.run(provider.generate_speech('很长的第一句话。短句。第三句！', 'am_adam', 1.0, output_file))
+        self.assertTrue(success)
+
+        timings = load_segment_timings(output_file)
+        self.assertEqual([t['text'] for t in timings], ['很长的第一句话。', '短句。', '第三句！'])
+        self.assertAlmostEqual(timings[0]['end'], 0.8)
+        self.assertAlmostEqual(timings[1]['start'], timings[0]['end'])
+        with wave.open(output_file, 'rb') as f:
+            self.assertAlmostEqual(f.getnframes() / f.getframerate(), timings[-1]['end'])
+
+    def test_segments_aligned_to_frames(self):
+        provider = FakeTTSProvider(frame_rate=3)
+        output_file = os.path.join(self.output_dir, 'temp_audio.wav')
+        self.assertTrue(asyncio.run(provider.generate_speech('短句。第二句话。', 'am_adam', 1.0, output_file)))
+        timings = load_segment_timings(output_file)
+        # 0.3 秒和 0.5 秒的分段各补静音到 1/3 秒的整数倍（取最近的采样点）
+        self.assertEqual([round(t['end'] * 3, 2) for t in timings], [1.0, 3.0])
+        with wave.open(output_file, 'rb') as f:
+            self.assertEqual(f.getnframes(), 1000)
+
+    def test_cache_skips_unchanged_segments(self):
+        cache = TTSCache(os.path.join(self.output_dir, 'cache'))
+        output_file = os.path.join(self.output_dir, 'temp_audio.wav')
+        provider = FakeTTSProvider(cache=cache)
+        self.assertTrue(asyncio.run(provider.generate_speech('第一句。第二句。', 'am_adam', 1.0, output_file)))
+        self.assertEqual(len(provider.requests), 2)
+
+        # 整段文案不变时不再发起任何请求
+        provider.requests.clear()
+        self.assertTrue(asyncio.run(provider.generate_speech('第一句。第二句。', 'am_adam', 1.0, output_file)))
+        self.assertEqual(provider.requests, [])
+
+        # 只修改一句时只重新合成该分段
+        self.assertTrue(asyncio.run(provider.generate_speech('第一句。新的第二句。', 'am_adam', 1.0, output_file)))
+        self.assertEqual(provider.requests, ['新的第二句。'])
+
+        # 语速变化时缓存失效
+        provider.requests.clear()
+        self.assertTrue(asyncio.run(provider.generate_speech('第一句。', 'am_adam', 1.2, output_file)))
+        self.assertEqual(provider.requests, ['第一句。'])
+
+    def test_overlapping_jobs_keep_each_others_segments(self):
+        # 两个任务各自创建缓存对象，共用一个容量很小的缓存目录
+        cache_dir = os.path.join(self.output_dir, 'cache')
+        cache_a = TTSCache(cache_dir, max_bytes=1)
+        cache_b = TTSCache(cache_dir, max_bytes=1)
+        results = {}
+
+        async def run():
+            gate = asyncio.Event()
+            job_a = GatedTTSProvider(gates={'第二句。': gate}, cache=cache_a)
+            job_b = GatedTTSProvider(cache=cache_b)
+            first_path = cache_a._audio_path(job_a._cache_key('第一句。', 'am_adam', 1.0))
+            task_a = asyncio.create_task(job_a.generate_speech(
+                '第一句。第二句。', 'am_adam', 1.0, os.path.join(self.output_dir, 'a.wav')))
+            while not os.path.exists(first_path):
+                await asyncio.sleep(0.005)
+            # 任务 A 的第一段已写入缓存、第二段尚未合成时，任务 B 完成并淘汰缓存
+            results['b'] = await job_b.generate_speech(
+                '另一段文案。', 'am_adam', 1.0, os.path.join(self.output_dir, 'b.wav'))
+            results['first_kept'] = os.path.exists(first_path)
+            gate.set()
+            results['a'] = await task_a
+            return first_path
+
+        first_path = asyncio.run(run())
+        self.assertTrue(results['a'])
+        self.assertTrue(results['b'])
+        self.assertTrue(results['first_kept'])
+        with wave.open(os.path.join(self.output_dir, 'a.wav'), 'rb') as f:
+            self.assertEqual(f.getnframes(), 800)
+        # 两个任务结束后登记全部释放，超出预算的条目在最后一次淘汰时删除
+        self.assertFalse(cache_a.leases.in_use(os.path.basename(first_path)[:-len('.wav')]))
+        self.assertFalse(os.path.exists(first_path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -57,8 +57,12 @@ class TestVideoProcessor(unittest.TestCase):
             image_path='invalid_path',
             video_path='invalid_path'
         )
-        with self.assertRaises(Exception):
-            processor.run()
+        # run 在线程中执行，不向外抛出异常，而是通过 error_occurred 信号报告错误
+        errors = []
+        processor.error_occurred.connect(errors.append)
+        processor.run()
+        self.assertEqual(errors, ['图片文件夹不存在'])
+        self.assertFalse(processor.is_running)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
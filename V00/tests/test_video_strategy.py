@@ -0,0 +1,35 @@
+import unittest
+import os
+import shutil
+from video_strategy import ImageProcessor
+from PIL import Image
+
+class TestImageProcessor(unittest.TestCase):
+    def setUp(self):
+        # 创建测试用的图片目录（包含子目录）
+        self.test_dir = 'test_strategy_data'
+        os.makedirs(os.path.join(self.test_dir, 'b'), exist_ok=True)
+        os.makedirs(os.path.join(self.test_dir, 'a'), exist_ok=True)
+        for width, sub_dir in ((10, 'a'), (20, 'b'), (30, '')):
+            img = Image.new('RGB', (width, 10), color='red')
+            img.save(os.path.join(self.test_dir, sub_dir, f'img_{width}.jpg'))
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_parallel_process_keeps_walk_order(self):
+        # 并发加载后的片段顺序应与遍历顺序一致
+        processor = ImageProcessor(max_workers=3)
+        clips = processor.process(self.test_dir)
+        self.assertEqual([clip.size[0] for clip in clips], [30, 10, 20])
+
+    def test_progress_reported_per_file(self):
+        # 每加载完一个文件都应报告一次进度
+        progress = []
+        processor = ImageProcessor(max_workers=2)
+        processor.process(self.test_dir, lambda done, total: progress.append((done, total)))
+        self.assertEqual(progress, [(1, 3), (2, 3), (3, 3)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import math
+import wave
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Sequence
+from moviepy.editor import AudioFileClip
+from moviepy.video.fx.speedx import speedx
+from logger import video_logger
+from lazy_clips import LazyImageClip
+from segment_cache import record_edit
+
+def audio_duration(audio_file: str) -> Optional[float]:
+    """读取配音时长，WAV 只读文件头，其他格式交给 ffmpeg 探测"""
+    try:
+        with wave.open(audio_file, 'rb') as f:
+            return f.getnframes() / float(f.getframerate())
+    except (wave.Error, EOFError):
+        pass
+    except OSError as e:
+        video_logger.warning('Failed to read audio duration of %s: %s', audio_file, str(e))
+        return None
+    try:
+        clip = AudioFileClip(audio_file)
+    except (OSError, IOError) as e:
+        video_logger.warning('Failed to read audio duration of %s: %s', audio_file, str(e))
+        return None
+    try:
+        return clip.duration
+    finally:
+        clip.close()
+
+class TimelinePlanner:
+    """根据配音时长规划时间线
+
+    图片片段时长可自由调整，优先由图片吸收时长差；
+    仍然过长时在 max_speed 以内加速视频，再截断超出配音的部分；
+    仍然过短时在 min_speed 以内放慢视频，再循环时间线补足。
+    规划后的时间线总时长与配音一致，配音结束后的帧不会被解码和编码。
+    使用转场时相邻片段重叠 overlap 秒，规划时为每个片段边界预留重叠消耗的时长。
+
+    修改文案后配音时长随之变化，规划尽量只改变少数片段，增量渲染时其余分段仍能复用：
+    提供 anchors（字幕开始时间）时图片的切换点对齐到字幕，见 _anchor_images；
+    视频倍速按 speed_step 向下取整，配音的小幅变化由末尾片段的截断吸收。
+    """
+    def __init__(self, min_image_duration: float = 1.0, min_speed: float = 0.8,
+                 max_speed: float = 1.5, loop: bool = True, speed_step: float = 0.05):
+        self.min_image_duration = min_image_duration
+        self.min_speed = min_speed
+        self.max_speed = max_speed
+        self.loop = loop
+        self.speed_step = speed_step
+
+    @staticmethod
+    def is_still(clip) -> bool:
+        return isinstance(clip, LazyImageClip)
+
+    def plan(self, clips: Sequence, target_duration: Optional[float], overlap: float = 0.0,
+             anchors: Sequence[float] = (), fps: Optional[float] = None) -> List:
+        """规划时间线；指定 fps 时对齐后的图片时长为整数帧"""
+        clips = list(clips)
+        if not clips or not target_duration or target_duration <= 0:
+            return clips
+
+        natural = sum(clip.duration for clip in clips)
+        stills = [clip for clip in clips if self.is_still(clip)]
+        video_duration = sum(clip.duration for clip in clips if not self.is_still(clip))
+        # 片段总时长需要多出转场重叠消耗的部分
+        budget = target_duration + overlap * (len(clips) - 1)
+        image_budget = budget - video_duration
+
+        if stills and image_budget >= self.min_image_duration * len(stills):
+            # 图片分配剩余时长，视频保持原速
+            if anchors:
+                clips = self._anchor_images(clips, budget, overlap, anchors, fps)
+            else:
+                clips = self._set_image_durations(clips, image_budget / len(stills))
+        else:
+            if stills:
+                clips = self._set_image_durations(clips, self.min_image_duration)
+            # 没有图片时视频需要覆盖全部时长
+            image_budget = self.min_image_duration * len(stills)
+            speed = video_duration / max(budget - image_budget, 1e-6) if video_duration else 1.0
+            if self.speed_step:
+                # 向下取整后视频略长于所需，超出部分由 _fill 截断
+                speed = round(math.floor(speed / self.speed_step + 1e-9) * self.speed_step, 6)
+            speed = min(max(speed, self.min_speed), self.max_speed)
+            if abs(speed - 1.0) > 1e-3:
+                clips = [clip if self.is_still(clip) else record_edit(speedx(clip, speed), clip, 'speed', speed)
+                         for clip in clips]
+            clips = self._fill(clips, target_duration, overlap)
+
+        video_logger.info('Planned timeline: %d clips, %.2fs natural -> %.2fs to match narration',
+                          len(clips), natural, sum(clip.duration for clip in clips) - overlap * (len(clips) - 1))
+        return clips
+
+    def _set_image_durations(self, clips: List, duration: float) -> List:
+        return [record_edit(clip.set_duration(duration), clip, 'duration', duration) if self.is_still(clip) else clip
+                for clip in clips]
+
+    def _anchor_images(self, clips: List, budget: float, overlap: float, anchors: Sequence[float],
+                       fps: Optional[float]) -> List:
+        """图片的结束位置对齐到字幕开始时间，最后一张图片补足剩余时长
+
+        每张图片按剩余时长平分得到理想时长，再取允许范围内最接近的、使下一个片段恰好从某条字幕开始的时长。
+        修改一句文案后，之前的图片时长基本不变；之后的字幕整体平移，对齐到它们的图片随之平移、时长不变，
+        只有包含这句字幕的图片时长改变。
+        """
+        points = sorted(round(anchor * fps) / fps if fps else anchor for anchor in anchors)
+        stills_left = sum(1 for clip in clips if self.is_still(clip))
+        videos_left = sum(clip.duration for clip in clips if not self.is_still(clip))
+        used = 0.0
+        position = 0.0
+        planned = []
+        for clip in clips:
+            if self.is_still(clip):
+                stills_left -= 1
+                available = budget - used - videos_left
+                duration = available
+                if stills_left:
+                    share = available / (stills_left + 1)
+                    longest = available - stills_left * self.min_image_duration
+                    anchored = self._nearest_anchor(points, position - overlap, share, longest)
+                    duration = share if anchored is None else anchored
+                # 时长写入分段键，去掉浮点误差
+                duration = round(duration, 6)
+                clip = record_edit(clip.set_duration(duration), clip, 'duration', duration)
+            else:
+                videos_left -= clip.duration
+            planned.append(clip)
+            used += clip.duration
+            position += clip.duration - overlap
+        return planned
+
+    def _nearest_anchor(self, points: List[float], origin: float, share: float, longest: float) -> Optional[float]:
+        """返回最接近 share 的时长，使 origin + 时长落在某个对齐点上且时长在 [min_image_duration, longest] 内"""
+        low = bisect_left(points, origin + self.min_image_duration - 1e-6)
+        high = bisect_right(points, origin + longest + 1e-6)
+        if low >= high:
+            return None
+        index = bisect_left(points, origin + share, low, high)
+        nearest = min(points[max(index - 1, low):min(index + 1, high)], key=lambda point: abs(point - origin - share))
+        return nearest - origin
+
+    def _fill(self, clips: List, target_duration: float, overlap: float = 0.0) -> List:
+        """截断超出目标时长的片段，时长不足时循环时间线"""
+        if sum(clip.duration for clip in clips) <= overlap * len(clips):
+            return clips
+        planned = []
+        position = 0.0
+        while position < target_duration - 1e-6:
+            for clip in clips:
+                if target_duration - position <= 1e-6:
+                    break
+                # 除第一个片段外，每个片段的开头与上一个片段重叠
+                remaining = target_duration - position + (overlap if planned else 0.0)
+                if clip.duration > remaining:
+                    clip = record_edit(clip.subclip(0, remaining), clip, 'subclip', 0, remaining)
+                position += clip.duration - (overlap if planned else 0.0)
+                planned.append(clip)
+            if not self.loop:
+                break
+        return planned
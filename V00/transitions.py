@@ -0,0 +1,193 @@
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from moviepy.editor import VideoClip
+from frame_pool import FRAME_POOL
+from logger import video_logger
+from render_engine import clip_readers, frame_count
+from segment_cache import record_edit
+
+# 转场方式：crossfade 交叉淡化，dip_to_black 前一片段淡出到黑场后下一片段淡入，wipe 从左到右擦除
+TRANSITIONS = ('crossfade', 'dip_to_black', 'wipe')
+
+def _scale(frame: np.ndarray, weight: int, out: np.ndarray, scratch: np.ndarray) -> None:
+    """out = frame * weight / 128，整数运算"""
+    np.multiply(frame, weight, out=scratch, dtype=np.int16)
+    scratch >>= 7
+    np.copyto(out, scratch, casting='unsafe')
+
+def _mix(a: np.ndarray, b: np.ndarray, weight: int, out: np.ndarray, scratch: np.ndarray) -> None:
+    """out = a + (b - a) * weight / 128
+
+    差值乘以 7 位权重不会超出 int16，只需一个在帧之间复用的 int16 缓冲。
+    """
+    np.subtract(b, a, out=scratch, dtype=np.int16)
+    scratch *= weight
+    scratch >>= 7
+    np.add(a, scratch, out=scratch)
+    np.copyto(out, scratch, casting='unsafe')
+
+def trim(clip, start: float, end: float):
+    """截取片段的 [start, end) 部分
+
+    moviepy 的 subclip 会为了得到尺寸立即解码第一帧（图片要完整解码，视频要打开解码器并定位），
+    这里直接复用原片段的尺寸和解码器，取帧时才解码。
+    """
+    piece = clip.copy()
+    piece.make_frame = lambda t: clip.get_frame(t + start)
+    piece.start = 0
+    piece.duration = piece.end = end - start
+    return record_edit(piece, clip, 'subclip', start, end)
+
+def fit_frame(frame: np.ndarray, buffer: np.ndarray, copy: bool = False) -> np.ndarray:
+    """把帧居中放入画布大小的缓冲区（补黑边或裁切）；尺寸一致且不要求 copy 时原样返回，只读使用"""
+    if frame.ndim == 2:
+        frame = np.dstack([frame] * 3)
+    frame = frame[:, :, :3]
+    if frame.dtype != np.uint8:
+        frame = frame.astype(np.uint8)
+    height, width = frame.shape[:2]
+    canvas_height, canvas_width = buffer.shape[:2]
+    if (width, height) == (canvas_width, canvas_height):
+        if not copy:
+            return frame
+        np.copyto(buffer, frame)
+        return buffer
+    x, y = (canvas_width - width) // 2, (canvas_height - height) // 2
+    src = frame[max(-y, 0):max(-y, 0) + min(height, canvas_height),
+                max(-x, 0):max(-x, 0) + min(width, canvas_width)]
+    y, x = max(y, 0), max(x, 0)
+    buffer.fill(0)
+    buffer[y:y + src.shape[0], x:x + src.shape[1]] = src
+    return buffer
+
+class TransitionBuffers:
+    """转场片段的输出、画布适配和混合缓冲，首次取帧时从缓冲池取用
+
+    作为片段的 reader 注册，渲染引擎在转场结束后像释放解码器一样调用 close 把缓冲归还缓冲池，
+    因此同一时间只有正在渲染的转场占用缓冲，与转场数量无关。
+    """
+    def __init__(self, size: Tuple[int, int]):
+        self.size = size
+        self.buffers: Optional[Tuple[np.ndarray, ...]] = None
+
+    def get(self) -> Tuple[np.ndarray, ...]:
+        if self.buffers is None:
+            width, height = self.size
+            self.buffers = (
+                FRAME_POOL.acquire((height, width, 3)),
+                FRAME_POOL.acquire((height, width, 3)),
+                FRAME_POOL.acquire((height, width, 3)),
+                FRAME_POOL.acquire((height, width, 3), np.int16),
+            )
+        return self.buffers
+
+    def close(self) -> None:
+        if self.buffers is not None:
+            for buffer in self.buffers:
+                FRAME_POOL.release(buffer)
+            self.buffers = None
+
+class TransitionClip(VideoClip):
+    """两个片段重叠部分的转场片段
+
+    只有重叠的帧经过这里：每帧取前一片段末尾和后一片段开头的对应帧，
+    用 NumPy 整数运算混合到缓冲池的输出缓冲中，源帧（可能是解码器或图片缓存的视图）不会被修改。
+    """
+    def __init__(self, outgoing, incoming, kind: str, frames: int, fps: float, size: Tuple[int, int]):
+        VideoClip.__init__(self)
+        if kind not in TRANSITIONS:
+            raise ValueError(f'Unknown transition: {kind}')
+        self.outgoing = outgoing
+        self.incoming = incoming
+        # 来源片段用于计算分段键和释放解码器
+        self.sources = (outgoing, incoming)
+        self.kind = kind
+        self.fps = fps
+        self.frames = frames
+        # 前一片段从第 offset 帧开始与后一片段重叠
+        self.offset = frame_count(outgoing.duration, fps) - frames
+        self.size = tuple(size)
+        self.duration = self.end = frames / fps
+        self.edit_ops = (('transition', kind, frames, self.offset),)
+        self.reader = TransitionBuffers(self.size)
+        # 同一素材首尾相接（循环时间线）时两侧共用解码器，读取后一片段会覆盖解码器缓冲中前一片段的帧
+        incoming_readers = clip_readers(incoming)
+        self._copy_outgoing = any(reader is other for reader in clip_readers(outgoing) for other in incoming_readers)
+        self.make_frame = self._blend
+
+    def _source(self, side: int, index: int) -> np.ndarray:
+        if side == 0:
+            frame = self.outgoing.get_frame((self.offset + index) / self.fps)
+        else:
+            frame = self.incoming.get_frame(index / self.fps)
+        return fit_frame(frame, self.reader.get()[1 + side], copy=side == 0 and self._copy_outgoing)
+
+    def _blend(self, t: float) -> np.ndarray:
+        out, _, _, scratch = self.reader.get()
+        index = min(max(int(round(t * self.fps)), 0), self.frames - 1)
+        # 两端都不含纯粹的源帧：第一帧已开始过渡，最后一帧尚未完全切换
+        progress = (index + 1) / (self.frames + 1)
+        if self.kind == 'crossfade':
+            _mix(self._source(0, index), self._source(1, index), int(round(progress * 128)), out, scratch)
+        elif self.kind == 'dip_to_black':
+            # 前半段只需要前一片段，后半段只需要后一片段，另一侧不解码
+            if progress < 0.5:
+                _scale(self._source(0, index), int(round((1 - 2 * progress) * 128)), out, scratch)
+            else:
+                _scale(self._source(1, index), int(round((2 * progress - 1) * 128)), out, scratch)
+        else:
+            edge = int(round(self.size[0] * progress))
+            out[:, :edge] = self._source(1, index)[:, :edge]
+            out[:, edge:] = self._source(0, index)[:, edge:]
+        return out
+
+    def close(self):
+        self.reader.close()
+
+class Transitions:
+    """在时间线相邻片段之间插入转场
+
+    每个片段边界让前后片段重叠 duration 秒：前一片段去掉末尾、后一片段去掉开头的重叠帧，
+    中间插入只包含重叠帧的转场片段，其余帧原样经过渲染引擎，转场的开销只与转场时长和数量有关。
+    时间线总时长因此缩短，由 TimelinePlanner.plan 的 overlap 参数预先补足。
+    """
+    def __init__(self, kind: str = 'crossfade', duration: float = 0.5):
+        if kind not in TRANSITIONS:
+            raise ValueError(f'Unknown transition: {kind}')
+        self.kind = kind
+        self.duration = max(duration, 0.0)
+
+    def overlap(self, fps: float) -> float:
+        """按帧对齐后的重叠时长"""
+        return int(round(self.duration * fps)) / fps
+
+    def apply(self, clips: Sequence, size: Tuple[int, int], fps: float) -> List:
+        clips = list(clips)
+        frames = int(round(self.duration * fps))
+        if frames <= 0 or len(clips) < 2:
+            return clips
+        counts = [frame_count(clip.duration, fps) for clip in clips]
+        # 片段的开头和末尾各最多让出一半帧数，短片段的转场相应缩短
+        overlaps = [min(frames, counts[index] // 2, counts[index + 1] // 2) for index in range(len(clips) - 1)]
+
+        timeline = []
+        for index, clip in enumerate(clips):
+            head = overlaps[index - 1] if index else 0
+            tail = overlaps[index] if index < len(overlaps) else 0
+            if head or tail:
+                if counts[index] > head + tail:
+                    start, end = head / fps, (counts[index] - tail) / fps
+                    timeline.append(trim(clip, start, end))
+            else:
+                timeline.append(clip)
+            if tail:
+                timeline.append(TransitionClip(clip, clips[index + 1], self.kind, tail, fps, size))
+        video_logger.info('Inserted %d %s transitions (%d blended frames)',
+                          sum(1 for count in overlaps if count), self.kind, sum(overlaps))
+        return timeline
+
+def create_transitions(kind: Optional[str], duration: float) -> Optional[Transitions]:
+    """按配置创建转场，kind 为空或 none 时硬切"""
+    if not kind or kind == 'none' or duration <= 0:
+        return None
+    return Transitions(kind, duration)
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from typing import Dict, Iterable, List, Optional
+from cache_leases import leases_for
+from logger import tts_logger
+
+class TTSCache:
+    """按内容寻址的配音缓存
+
+    键为 (服务标识, 文本, 音色, 语速) 的哈希，整段文案和单个分段共用同一缓存。
+    写入使用临时文件 + os.replace 保证原子性，总大小超过 max_bytes 时按最近使用时间淘汰。
+    get 命中和 put 写入的条目登记为使用中，直到调用方 release；同一目录的所有缓存对象共用登记，
+    并发任务的淘汰不会删除其他任务合成和拼接期间用到的条目。
+    """
+    def __init__(self, cache_dir: str = os.path.join('cache', 'tts'), max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.leases = leases_for(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(namespace: str, text: str, voice_name: str, speed: float) -> str:
+        payload = json.dumps([namespace, text, voice_name, round(float(speed), 4)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _audio_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.wav')
+
+    def _timings_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.segments.json')
+
+    def _atomic_copy(self, source: str, destination: str) -> None:
+        os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+        temp_path = f'{destination}.{uuid.uuid4().hex}.tmp'
+        try:
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, destination)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def get(self, key: str, output_file: str) -> bool:
+        """命中时将缓存音频复制到 output_file 并返回 True，命中的条目登记为使用中，用完后需要 release"""
+        audio_path = self._audio_path(key)
+        # 先登记再复制：登记后的条目不会再被淘汰，复制时已被删除则视为未命中
+        self.leases.acquire(key)
+        try:
+            self._atomic_copy(audio_path, output_file)
+            # 更新访问时间，用于 LRU 淘汰
+            os.utime(audio_path)
+        except FileNotFoundError:
+            self.leases.release([key])
+            with self._lock:
+                self.misses += 1
+            tts_logger.debug('TTS cache miss: %s', key[:12])
+            return False
+        with self._lock:
+            self.hits += 1
+        tts_logger.debug('TTS cache hit: %s', key[:12])
+        return True
+
+    def put(self, key: str, audio_file: str) -> None:
+        """写入条目并登记为使用中，用完后需要 release"""
+        self.leases.acquire(key)
+        try:
+            self._atomic_copy(audio_file, self._audio_path(key))
+        except Exception:
+            self.leases.release([key])
+            raise
+
+    def release(self, keys: Iterable[str]) -> None:
+        """释放 get/put 登记的条目，每次登记对应一次释放"""
+        self.leases.release(keys)
+
+    def get_timings(self, key: str) -> Optional[List[Dict]]:
+        try:
+            with open(self._timings_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put_timings(self, key: str, timings: List[Dict]) -> None:
+        path = self._timings_path(key)
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(timings, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def evict(self) -> None:
+        """总大小超过预算时删除最久未使用的条目，任一任务登记为使用中的条目不会被删除"""
+        with self._lock, self.leases.hold():
+            entries = []
+            total = 0
+            for root, _, files in os.walk(self.cache_dir):
+                for file in files:
+                    if not file.endswith('.wav'):
+                        continue
+                    path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            removed = 0
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                key = os.path.basename(path)[:-len('.wav')]
+                if self.leases.in_use(key):
+                    continue
+                try:
+                    for stale in (path, path[:-len('.wav')] + '.segments.json'):
+                        if os.path.exists(stale):
+                            os.remove(stale)
+                except OSError as e:
+                    # 其他缓存对象已删除，或 Windows 上文件仍被打开
+                    tts_logger.warning('Failed to evict TTS cache entry %s: %s', path, str(e))
+                    continue
+                total -= size
+                removed += 1
+            tts_logger.info('TTS cache evicted %d entries, %d bytes remaining', removed, total)
+
+    def log_stats(self) -> None:
+        tts_logger.info('TTS cache stats: %d hits, %d misses', self.hits, self.misses)
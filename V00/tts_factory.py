@@ -1,46 +1,256 @@
 from abc import ABC, abstractmethod
-from gradio_client import Client
+import asyncio
+import importlib
+import inspect
 import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Type, Union
 from logger import tts_logger
+from profiler import NULL_PROFILER, Profiler
+from tts_cache import TTSCache
+from speech_segments import build_timings, concat_wav_files, save_segment_timings, split_text
 
 class TTSProvider(ABC):
+    """TTS 服务基类
+
+    generate_speech 将文案按句子切分，以有限并发分段合成，
+    再按顺序拼接到 output_file，并在旁边写入分段时间信息（*.segments.json）。
+    配置了 cache 时，整段文案和每个分段都会先查询配音缓存。
+    每个分段完成时通过 progress_callback(done, total) 报告进度，并在 profiler 中记录合成耗时。
+    设置 frame_rate 时各分段拼接到视频帧边界（见 concat_wav_files）。
+    """
+    def __init__(self, max_concurrency: int = 3, max_segment_chars: int = 120, cache: Optional[TTSCache] = None,
+                 profiler: Optional[Profiler] = None, frame_rate: Optional[float] = None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_segment_chars = max_segment_chars
+        self.cache = cache
+        self.frame_rate = frame_rate
+        self.profiler = profiler or NULL_PROFILER
+        self.last_segments: List[Dict] = []
+        self._cancel_event = threading.Event()
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self) -> None:
+        """取消合成（可从其他线程调用），正在进行的请求会被尽快中止"""
+        self._cancel_event.set()
+        with self._in_flight_lock:
+            cancel_callbacks = list(self._in_flight)
+        for cancel_callback in cancel_callbacks:
+            cancel_callback()
+        tts_logger.info('TTS generation cancelled, %d requests aborted', len(cancel_callbacks))
+
+    def reset_cancellation(self) -> None:
+        self._cancel_event.clear()
+
+    def _track(self, cancel_callback: Callable[[], None]) -> None:
+        """登记进行中请求的取消回调"""
+        with self._in_flight_lock:
+            self._in_flight.add(cancel_callback)
+
+    def _untrack(self, cancel_callback: Callable[[], None]) -> None:
+        with self._in_flight_lock:
+            self._in_flight.discard(cancel_callback)
+
+    @property
+    def cache_namespace(self) -> str:
+        """缓存键中区分不同服务的标识"""
+        return type(self).__name__
+
+    def _cache_key(self, text: str, voice_name: str, speed: float, frame_rate: Optional[float] = None) -> str:
+        namespace = f'{self.cache_namespace}@{frame_rate:g}fps' if frame_rate else self.cache_namespace
+        return TTSCache.make_key(namespace, text, voice_name, speed)
+
+    async def generate_speech(self, text: str, voice_name: str, speed: float, output_file: str,
+                              progress_callback: Optional[Callable[[int, int], None]] = None) -> bool:
+        segment_dir = None
+        # 本次用到的缓存条目在拼接和写入整段缓存完成前保持登记，避免被并发任务淘汰
+        leased = []
+        try:
+            output_dir = os.path.dirname(output_file) or '.'
+            os.makedirs(output_dir, exist_ok=True)
+
+            # 整段文案命中缓存时直接复用音频和分段时间
+            # 整段音频包含按帧对齐补的静音，帧率不同时不能复用
+            script_key = self._cache_key(text, voice_name, speed, self.frame_rate) if self.cache else None
+            if script_key:
+                timings = self.cache.get_timings(script_key)
+                if timings is not None and self.cache.get(script_key, output_file):
+                    leased.append(script_key)
+                    self.last_segments = timings
+                    save_segment_timings(output_file, timings)
+                    tts_logger.info('Reused cached narration for the whole script')
+                    if progress_callback:
+                        progress_callback(1, 1)
+                    return True
+
+            texts = split_text(text, self.max_segment_chars)
+            if not texts:
+                raise ValueError('Empty script')
+            tts_logger.info('Synthesizing %d segments with concurrency %d', len(texts), self.max_concurrency)
+
+            segment_dir = tempfile.mkdtemp(prefix='tts_segments_', dir=output_dir)
+            segment_files = [os.path.join(segment_dir, f'segment_{i:04d}.wav') for i in range(len(texts))]
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            finished = 0
+
+            def segment_done() -> None:
+                nonlocal finished
+                finished += 1
+                if progress_callback:
+                    progress_callback(finished, len(texts))
+
+            async def synthesize(index: int) -> bool:
+                segment_key = self._cache_key(texts[index], voice_name, speed) if self.cache else None
+                if segment_key and self.cache.get(segment_key, segment_files[index]):
+                    leased.append(segment_key)
+                    segment_done()
+                    return True
+                async with semaphore:
+                    if self.cancelled:
+                        return False
+                    started = time.perf_counter()
+                    # 分段在同一事件循环中并发等待，线程 CPU 时间无法归属到单个分段，只记录墙钟时间
+                    with self.profiler.span('tts_segment', 'tts', cpu=False, index=index, chars=len(texts[index])):
+                        success = await self.synthesize_segment(texts[index], voice_name, speed, segment_files[index])
+                    tts_logger.debug('Segment %d finished in %.2fs', index, time.perf_counter() - started)
+                if success and segment_key:
+                    self.cache.put(segment_key, segment_files[index])
+                    leased.append(segment_key)
+                if success:
+                    segment_done()
+                return success
+
+            results = await asyncio.gather(*(synthesize(i) for i in range(len(texts))))
+            if not all(results):
+                raise RuntimeError(f'{results.count(False)} of {len(texts)} segments failed')
+
+            with self.profiler.span('tts_concat', 'tts', segments=len(texts)):
+                durations = concat_wav_files(segment_files, output_file, self.frame_rate)
+            self.last_segments = build_timings(texts, durations)
+            save_segment_timings(output_file, self.last_segments)
+            if script_key:
+                self.cache.put(script_key, output_file)
+                leased.append(script_key)
+                self.cache.put_timings(script_key, self.last_segments)
+            tts_logger.info('Audio file saved successfully: %.2fs in %d segments', sum(durations), len(texts))
+            return True
+        except Exception as e:
+            tts_logger.error('%s generation failed: %s', type(self).__name__, str(e))
+            return False
+        finally:
+            if segment_dir:
+                shutil.rmtree(segment_dir, ignore_errors=True)
+            if self.cache:
+                self.cache.release(leased)
+                self.cache.evict()
+                self.cache.log_stats()
+
     @abstractmethod
-    async def generate_speech(self, text: str, voice_name: str, speed: float, output_file: str) -> bool:
+    async def synthesize_segment(self, text: str, voice_name: str, speed: float, output_file: str) -> bool:
+        """合成单个文本片段并写入 output_file（WAV）"""
         pass
 
+def gradio_client_factory(server_url: str):
+    """创建 Gradio Client；gradio_client 导入较慢，只在第一次连接服务时导入"""
+    from gradio_client import Client
+    return Client(server_url)
+
 class GradioTTSProvider(TTSProvider):
-    def __init__(self, server_url: str = None):
+    """基于 Gradio 服务的 TTS
+
+    同一服务地址的 Client 在进程内复用，避免每次请求都重新获取接口定义。
+    请求通过 Client.submit 提交并以 asyncio 方式等待，不阻塞事件循环，
+    支持超时、指数退避重试和取消。
+    """
+    _clients: Dict[str, Any] = {}
+    _clients_lock = threading.Lock()
+
+    def __init__(self, server_url: str = None, request_timeout: float = 120.0, max_retries: int = 2,
+                 retry_backoff: float = 1.0, client_factory: Callable[[str], Any] = gradio_client_factory, **kwargs):
+        super().__init__(**kwargs)
         self.server_url = server_url or os.getenv("TTS_SERVER_URL", "http://localhost:7860/")
-        self.client = Client(self.server_url)
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.client_factory = client_factory
+    
+    @property
+    def cache_namespace(self) -> str:
+        return f'gradio:{self.server_url}'
+    
+    @classmethod
+    def get_client(cls, server_url: str, client_factory: Callable[[str], Any] = gradio_client_factory):
+        """获取（必要时创建）该服务地址共享的 Client"""
+        with cls._clients_lock:
+            client = cls._clients.get(server_url)
+            if client is None:
+                tts_logger.info('Connecting to Gradio TTS server: %s', server_url)
+                client = client_factory(server_url)
+                cls._clients[server_url] = client
+            return client
+    
+    @classmethod
+    def close_clients(cls) -> None:
+        with cls._clients_lock:
+            cls._clients.clear()
     
-    async def generate_speech(self, text: str, voice_name: str, speed: float, output_file: str) -> bool:
+    async def _request(self, text: str, voice_name: str, speed: float):
+        loop = asyncio.get_running_loop()
+        # 首次创建 Client 需要请求服务端接口定义，放到线程池中执行
+        client = await loop.run_in_executor(None, self.get_client, self.server_url, self.client_factory)
+        job = client.submit(
+            text=text,
+            voice=voice_name,
+            speed=speed,
+            api_name="/generate_speech"
+        )
+        waiter = asyncio.wrap_future(getattr(job, 'future', job))
+
+        def cancel_request():
+            # 已在服务端执行的请求无法撤回，但本地等待会立即结束
+            job.cancel()
+            loop.call_soon_threadsafe(waiter.cancel)
+
+        self._track(cancel_request)
         try:
-            tts_logger.info('Starting Gradio TTS generation with voice: %s', voice_name)
-            tts_logger.debug('Sending TTS request with text length: %d', len(text))
-            
-            result = self.client.predict(
-                text=text,
-                voice=voice_name,
-                speed=speed,
-                api_name="/generate_speech"
-            )
-            
-            progress, audio_path = result
-            tts_logger.debug('TTS generation completed, saving to file: %s', output_file)
-            
-            with open(audio_path, "rb") as f:
-                audio_data = f.read()
-            with open(output_file, "wb") as out:
-                out.write(audio_data)
-            
-            tts_logger.info('Audio file saved successfully')
-            return True
-        except Exception as e:
-            tts_logger.error('Gradio TTS generation failed: %s', str(e))
-            return False
+            return await asyncio.wait_for(waiter, self.request_timeout)
+        except asyncio.TimeoutError:
+            job.cancel()
+            raise
+        finally:
+            self._untrack(cancel_request)
+    
+    async def synthesize_segment(self, text: str, voice_name: str, speed: float, output_file: str) -> bool:
+        for attempt in range(self.max_retries + 1):
+            if self.cancelled:
+                return False
+            try:
+                tts_logger.debug('Sending Gradio TTS request with voice %s, text length: %d', voice_name, len(text))
+                progress, audio_path = await self._request(text, voice_name, speed)
+                shutil.copyfile(audio_path, output_file)
+                return True
+            except asyncio.CancelledError:
+                if self.cancelled:
+                    return False
+                raise
+            except Exception as e:
+                tts_logger.warning('Gradio TTS request failed (attempt %d/%d): %s',
+                                   attempt + 1, self.max_retries + 1, str(e) or type(e).__name__)
+                if attempt < self.max_retries and not self.cancelled:
+                    await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+        tts_logger.error('Gradio TTS segment failed after %d attempts', self.max_retries + 1)
+        return False
 
 class LocalTTSProvider(TTSProvider):
-    async def generate_speech(self, text: str, voice_name: str, speed: float, output_file: str) -> bool:
+    async def synthesize_segment(self, text: str, voice_name: str, speed: float, output_file: str) -> bool:
         try:
             # 这里实现本地TTS逻辑
             tts_logger.info('Starting Local TTS generation')
@@ -50,17 +260,37 @@ class LocalTTSProvider(TTSProvider):
             return False
 
 class TTSFactory:
-    _providers = {
+    # 值可以是类，也可以是 "模块:类名" 字符串，后者在第一次创建时才导入对应模块
+    _providers: Dict[str, Union[Type[TTSProvider], str]] = {
         'gradio': GradioTTSProvider,
         'local': LocalTTSProvider
     }
     
     @classmethod
-    def create_provider(cls, provider_type: str, **kwargs) -> TTSProvider:
+    def register_provider(cls, provider_type: str, provider: Union[Type[TTSProvider], str]) -> None:
+        cls._providers[provider_type] = provider
+    
+    @classmethod
+    def resolve_provider(cls, provider_type: str) -> Type[TTSProvider]:
         provider_class = cls._providers.get(provider_type)
         if not provider_class:
             raise ValueError(f'Unknown TTS provider type: {provider_type}')
-        return provider_class(**kwargs)
+        if isinstance(provider_class, str):
+            module_name, _, class_name = provider_class.partition(':')
+            provider_class = getattr(importlib.import_module(module_name), class_name)
+            cls._providers[provider_type] = provider_class
+        return provider_class
+    
+    @classmethod
+    def create_provider(cls, provider_type: str, **kwargs) -> TTSProvider:
+        provider_class = cls.resolve_provider(provider_type)
+        # 忽略该服务不支持的参数，便于统一传入配置
+        accepted = set()
+        for klass in provider_class.__mro__:
+            if '__init__' in vars(klass):
+                accepted.update(inspect.signature(klass.__init__).parameters)
+        options = {key: value for key, value in kwargs.items() if key in accepted}
+        return provider_class(**options)
 
 # 支持的语音列表
 voice_list = ["am_puck", "af_bella", "am_adam"]
\ No newline at end of file
@@ -1,12 +1,14 @@
 import os
 from PyQt5.QtCore import QThread, pyqtSignal
 import json
-from moviepy.editor import VideoFileClip, ImageClip, concatenate_videoclips, CompositeVideoClip, TextClip, AudioFileClip
+from moviepy.editor import VideoFileClip, ImageClip, TextClip
 from PIL import Image
 import numpy as np
 from tts import text_to_audio
 import asyncio
 from logger import video_logger
+from memory_manager import MemoryManager
+from render_engine import StreamingRenderer, canvas_size
 
 class VideoProcessor(QThread):
     progress_updated = pyqtSignal(int)
@@ -73,17 +75,18 @@ class VideoProcessor(QThread):
                             self.processing_status.emit('内存不足，正在清理...')
                             continue
                             
-                        # 大文件分块处理
-                        chunks = self.memory_manager.split_large_file(video_path)
-                        if not chunks:
+                        # 大文件按关键帧区间处理
+                        clip = VideoFileClip(video_path)
+                        segments = self.memory_manager.segment_large_file(video_path, clip.duration)
+                        if not segments:
                             video_logger.error('Failed to process video: %s', file)
                             continue
                             
-                        for chunk in chunks:
-                            clip = VideoFileClip(chunk)
+                        if len(segments) == 1:
                             video_clips.append(clip)
-                            if chunk != video_path:  # 如果是临时分块文件
-                                self.memory_manager.register_temp_file(chunk)
+                        else:
+                            for _, start, end in segments:
+                                video_clips.append(clip.subclip(start, end))
                                 
                         video_logger.debug('Processed video: %s', file)
                     except Exception as e:
@@ -134,30 +137,19 @@ class VideoProcessor(QThread):
             if not final_clips:
                 raise Exception('没有找到可用的素材')
             
-            final_video = concatenate_videoclips(final_clips)
+            total_duration = sum(clip.duration for clip in final_clips)
             
             # 添加字幕
             txt_clip = TextClip(self.script, fontsize=24, color='white')
-            txt_clip = txt_clip.set_pos('center').set_duration(final_video.duration)
+            txt_clip = txt_clip.set_pos('center').set_duration(total_duration)
             
-            # 添加音频
-            audio_clip = AudioFileClip(audio_file)
-            
-            # 合成最终视频
-            final_video = CompositeVideoClip([final_video, txt_clip])
-            final_video = final_video.set_audio(audio_clip)
-            
-            # 导出最终视频
+            # 流式合成并导出最终视频
             output_file = os.path.join(self.output_path, 'final_video.mp4')
-            final_video.write_videofile(
-                output_file,
-                fps=24,
-                codec='libx264',
-                audio_codec='aac'
-            )
+            renderer = StreamingRenderer(output_file, canvas_size(final_clips), fps=24)
+            renderer.render(final_clips, audio_file, overlays=[txt_clip])
             
             # 清理资源
-            final_video.close()
+            txt_clip.close()
             for clip in final_clips:
                 clip.close()
             
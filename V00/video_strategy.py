@@ -1,92 +1,296 @@
 from abc import ABC, abstractmethod
-from moviepy.editor import VideoFileClip, ImageClip, concatenate_videoclips, CompositeVideoClip, TextClip, AudioFileClip
-from PIL import Image
-import numpy as np
+from moviepy.editor import VideoFileClip
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from logger import video_logger
-from typing import List, Tuple
+from export_profiles import DEFAULT_PROFILE, ffmpeg_params, get_profile, record_encode_stats
+from lazy_clips import LazyImageClip, LazyVideoFileClip
+from memory_manager import MemoryManager
+from motion import KenBurnsClip
+from normalizer import Normalizer
+from probe_cache import ProbeCache
+from profiler import NULL_PROFILER, Profiler
+from scene_detect import SceneDetector
+from speech_segments import load_segment_timings, split_text
+from subtitle_alignment import align_to_speech, cues_from_timings, detect_speech_regions, write_ass, write_srt
+from subtitle_renderer import SubtitleTrack
+from render_engine import RenderCancelled, SegmentedRenderer, StreamingRenderer, canvas_size
+from segment_cache import SegmentCache, record_edit
+from timeline_planner import TimelinePlanner, audio_duration
+from transitions import Transitions, trim
+from typing import Callable, Dict, List, Optional, Tuple
 
 class MediaProcessor(ABC):
+    """媒体处理器基类
+
+    负责遍历素材文件夹，并使用线程池并发加载素材。结果顺序与遍历顺序一致，
+    每完成一个文件都会通过 progress_callback(done, total) 报告进度，并在 profiler 中记录每个文件的加载耗时。
+    """
+    extensions: Tuple[str, ...] = ()
+
+    def __init__(self, max_workers: Optional[int] = None, profiler: Optional[Profiler] = None):
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.profiler = profiler or NULL_PROFILER
+
+    def collect_files(self, path: str) -> List[str]:
+        """按确定的顺序收集文件夹中所有支持的素材文件"""
+        file_paths = []
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file in sorted(files):
+                if file.lower().endswith(self.extensions):
+                    file_paths.append(os.path.join(root, file))
+        return file_paths
+
+    def process(self, path: str, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[VideoFileClip]:
+        file_paths = self.collect_files(path)
+        total = len(file_paths)
+        results: List[List[VideoFileClip]] = [[] for _ in file_paths]
+        if not file_paths:
+            return []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._load_safely, file_path): index
+                for index, file_path in enumerate(file_paths)
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if progress_callback:
+                    progress_callback(done, total)
+
+        clips = [clip for file_clips in results for clip in file_clips]
+        video_logger.info('%s loaded %d clips from %d files with %d workers',
+                          type(self).__name__, len(clips), total, self.max_workers)
+        return clips
+
+    def _load_safely(self, file_path: str) -> List[VideoFileClip]:
+        try:
+            with self.profiler.span('ingest', 'ingest', file=os.path.basename(file_path)):
+                return self.load(file_path)
+        except Exception as e:
+            video_logger.error('Error processing %s: %s', os.path.basename(file_path), str(e))
+            return []
+
     @abstractmethod
-    def process(self, path: str) -> List[VideoFileClip]:
+    def load(self, file_path: str) -> List[VideoFileClip]:
+        """加载单个素材文件，返回对应的片段列表"""
         pass
 
 class ImageProcessor(MediaProcessor):
-    def __init__(self, duration: float = 3.0):
+    extensions = ('.png', '.jpg', '.jpeg')
+
+    def __init__(self, duration: float = 3.0, max_workers: Optional[int] = None,
+                 canvas_size: Tuple[int, int] = (1920, 1080), profiler: Optional[Profiler] = None,
+                 ken_burns: bool = False, ken_burns_zoom: float = 1.2):
+        super().__init__(max_workers, profiler)
         self.duration = duration
-    
-    def process(self, path: str) -> List[VideoFileClip]:
-        image_clips = []
-        for root, _, files in os.walk(path):
-            for file in files:
-                if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    try:
-                        img_path = os.path.join(root, file)
-                        img = Image.open(img_path)
-                        img_array = np.array(img)
-                        clip = ImageClip(img_array).set_duration(self.duration)
-                        image_clips.append(clip)
-                        video_logger.debug('Processed image: %s', file)
-                    except Exception as e:
-                        video_logger.error('Error processing image %s: %s', file, str(e))
-        return image_clips
+        self.canvas_size = canvas_size
+        self.ken_burns = ken_burns
+        self.ken_burns_zoom = ken_burns_zoom
+
+    def load(self, file_path: str) -> List[VideoFileClip]:
+        # 只读取文件头，像素在渲染到该片段时按画布尺寸解码
+        if self.ken_burns:
+            clip = KenBurnsClip(file_path, self.duration, self.canvas_size, zoom=self.ken_burns_zoom)
+        else:
+            clip = LazyImageClip(file_path, self.duration, self.canvas_size)
+        video_logger.debug('Processed image: %s', os.path.basename(file_path))
+        return [clip]
 
 class VideoProcessor(MediaProcessor):
-    def process(self, path: str) -> List[VideoFileClip]:
-        video_clips = []
-        for root, _, files in os.walk(path):
-            for file in files:
-                if file.lower().endswith(('.mp4', '.avi', '.mov')):
-                    try:
-                        video_path = os.path.join(root, file)
-                        clip = VideoFileClip(video_path)
-                        video_clips.append(clip)
-                        video_logger.debug('Processed video: %s', file)
-                    except Exception as e:
-                        video_logger.error('Error processing video %s: %s', file, str(e))
-        return video_clips
+    extensions = ('.mp4', '.avi', '.mov')
+
+    def __init__(self, max_workers: Optional[int] = None, memory_manager: Optional[MemoryManager] = None,
+                 probe_cache: Optional[ProbeCache] = None, profiler: Optional[Profiler] = None,
+                 scene_detector: Optional[SceneDetector] = None):
+        super().__init__(max_workers, profiler)
+        self.memory_manager = memory_manager or MemoryManager()
+        self.probe_cache = probe_cache or ProbeCache()
+        # 设置镜头检测时不再使用完整素材，只保留所有文件中得分最高的若干片段
+        self.scene_detector = scene_detector
+
+    def process(self, path: str, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[VideoFileClip]:
+        clips = super().process(path, progress_callback)
+        if self.scene_detector is None or not clips:
+            return clips
+        selected = self.scene_detector.select([clip.scenes for clip in clips], [clip.duration for clip in clips])
+        segments = [trim(clips[index], start, end) for index, start, end in selected]
+        video_logger.info('Scene detection selected %d segments (%.1fs) from %d videos',
+                          len(segments), sum(clip.duration for clip in segments), len(clips))
+        return segments
+
+    def load(self, file_path: str) -> List[VideoFileClip]:
+        # 探测信息命中缓存时无需启动解码器，渲染到该片段时再按需打开
+        metadata = self.probe_cache.probe(file_path)
+        if metadata is None:
+            # 没有 ffprobe 时用 moviepy 探测；成片使用配音作为音轨，无需打开素材自带的音频解码器
+            probe = VideoFileClip(file_path, audio=False)
+            metadata = {'width': probe.size[0], 'height': probe.size[1], 'fps': probe.fps, 'duration': probe.duration}
+            probe.close()
+        # 渲染到该片段时才按归一化后的尺寸打开解码器
+        clip = LazyVideoFileClip(file_path, metadata)
+        if self.scene_detector is not None:
+            # 镜头检测与探测在同一个加载线程中完成，多个文件并发检测；选出的片段共享整个文件的解码器
+            clip.scenes = self.scene_detector.analyze(file_path)
+            return [clip]
+        # 大文件按关键帧区间切分，各区间共享同一个解码器按需读取
+        segments = self.memory_manager.segment_large_file(file_path, clip.duration,
+                                                          keyframe_probe=self.probe_cache.keyframes)
+        if len(segments) <= 1:
+            clips = [clip]
+        else:
+            clips = [record_edit(clip.subclip(start, end), clip, 'subclip', start, end) for _, start, end in segments]
+        video_logger.debug('Processed video: %s (%d segments)', os.path.basename(file_path), len(clips))
+        return clips
 
 class SubtitleGenerator:
-    def generate(self, text: str, duration: float) -> TextClip:
-        return TextClip(text, fontsize=24, color='white')\
-               .set_pos('center')\
-               .set_duration(duration)
+    def __init__(self, canvas_size: Tuple[int, int] = (1920, 1080), font_path: Optional[str] = None,
+                 fontsize: int = 24, color: str = 'white', max_chars: int = 40,
+                 profiler: Optional[Profiler] = None):
+        self.canvas_size = canvas_size
+        self.font_path = font_path
+        self.fontsize = fontsize
+        self.color = color
+        self.max_chars = max_chars
+        self.profiler = profiler or NULL_PROFILER
+
+    def generate(self, text: str, duration: float, audio_file: Optional[str] = None) -> SubtitleTrack:
+        with self.profiler.span('subtitle_align', 'subtitle'):
+            cues = self.align_cues(text, audio_file) if audio_file else []
+        if not cues:
+            # 没有配音信息时按字数比例把总时长分配给每句
+            sentences = split_text(text, self.max_chars) or [text]
+            total_chars = sum(len(sentence) for sentence in sentences)
+            start = 0.0
+            for sentence in sentences:
+                end = start + duration * len(sentence) / max(total_chars, 1)
+                cues.append({'text': sentence, 'start': start, 'end': end})
+                start = end
+        return self.build_track(cues)
+
+    def build_track(self, cues: List[Dict]) -> SubtitleTrack:
+        """由已计算好的字幕时间（例如从检查点恢复的）构建并预渲染字幕轨道"""
+        track = SubtitleTrack(cues, self.canvas_size, self.font_path, self.fontsize, self.color)
+        with self.profiler.span('subtitle_prerender', 'subtitle', cues=len(cues)):
+            track.prerender()
+        return track
+
+    def align_cues(self, text: str, audio_file: str) -> List[Dict]:
+        """根据配音计算字幕时间：优先使用 TTS 分段时间，否则对音频做静音检测"""
+        timings = load_segment_timings(audio_file)
+        if timings:
+            cues = cues_from_timings(timings, self.max_chars)
+            video_logger.info('Aligned %d subtitle cues from TTS segment timings', len(cues))
+            return cues
+        try:
+            regions = detect_speech_regions(audio_file)
+        except (OSError, EOFError, ValueError) as e:
+            video_logger.warning('Silence detection failed on %s: %s', audio_file, str(e))
+            return []
+        cues = align_to_speech(split_text(text, self.max_chars), regions)
+        video_logger.info('Aligned %d subtitle cues to %d speech regions', len(cues), len(regions))
+        return cues
 
 class VideoComposer:
-    def __init__(self, output_path: str = 'output'):
+    def __init__(self, output_path: str = 'output', fps: float = 24, profile: str = DEFAULT_PROFILE,
+                 planner: Optional[TimelinePlanner] = None, segment_cache: Optional[SegmentCache] = None,
+                 segment_seconds: float = 10.0, profiler: Optional[Profiler] = None,
+                 on_segment: Optional[Callable[[int, int, bool], None]] = None,
+                 normalizer: Optional[Normalizer] = None, transitions: Optional[Transitions] = None):
         self.output_path = output_path
+        self.fps = fps
+        self.profile = get_profile(profile)
+        self.planner = planner or TimelinePlanner()
+        # 设置归一化器时按固定画布渲染，否则画布取所有片段的最大宽高
+        self.normalizer = normalizer
+        # 设置转场时相邻片段重叠，只有重叠部分的帧需要混合
+        self.transitions = transitions
+        # 设置分段缓存时增量渲染，只重新编码内容变化的分段
+        self.segment_cache = segment_cache
+        self.segment_seconds = segment_seconds
+        self.profiler = profiler or NULL_PROFILER
+        # 增量渲染时每完成一个分段调用 on_segment(index, total, reused)，用于记录检查点
+        self.on_segment = on_segment
+        self.stats_file = os.path.join(output_path, 'encode_stats.jsonl')
         os.makedirs(output_path, exist_ok=True)
     
-    def compose(self, clips: List[VideoFileClip], subtitle: TextClip, audio_path: str) -> Tuple[str, bool]:
+    def compose(self, clips: List[VideoFileClip], subtitle: SubtitleTrack, audio_path: str,
+                progress_callback: Optional[Callable[[int, int], None]] = None,
+                should_continue: Optional[Callable[[], bool]] = None) -> Tuple[str, bool]:
+        """合成成片，返回 (输出路径, 是否成功)；should_continue 返回 False 时抛出 RenderCancelled"""
         try:
             if not clips:
                 raise ValueError('No media clips available')
             
-            # 合并视频片段
-            final_video = concatenate_videoclips(clips)
-            
-            # 添加音频
-            audio_clip = AudioFileClip(audio_path)
-            
-            # 合成最终视频
-            final_video = CompositeVideoClip([final_video, subtitle])
-            final_video = final_video.set_audio(audio_clip)
-            
-            # 导出视频
+            # 先按配音时长规划时间线，再按扁平时间线逐片段流式编码，字幕作为叠加层在帧上混合
+            if self.normalizer is not None:
+                with self.profiler.span('normalize', 'compose', clips=len(clips)):
+                    clips = self.normalizer.normalize(clips)
+            with self.profiler.span('plan_timeline', 'compose', clips=len(clips)):
+                narration = audio_duration(audio_path) if audio_path else None
+                overlap = self.transitions.overlap(self.fps) if self.transitions is not None else 0.0
+                # 图片切换点对齐到字幕开始时间，修改文案后只有变化附近的分段需要重新编码
+                timeline = self.planner.plan(clips, narration, overlap,
+                                             anchors=[cue['start'] for cue in subtitle.cues], fps=self.fps)
             output_file = os.path.join(self.output_path, 'final_video.mp4')
-            final_video.write_videofile(
-                output_file,
-                fps=24,
-                codec='libx264',
-                audio_codec='aac'
-            )
+            size = self.normalizer.canvas_size if self.normalizer is not None else canvas_size(timeline)
+            if self.transitions is not None:
+                timeline = self.transitions.apply(timeline, size, self.fps)
+            if self.segment_cache is not None:
+                renderer = SegmentedRenderer(
+                    output_file,
+                    size,
+                    self.segment_cache,
+                    fps=self.fps,
+                    codec='libx264',
+                    audio_codec='aac',
+                    ffmpeg_params=ffmpeg_params(self.profile),
+                    audio_params=['-b:a', self.profile['audio_bitrate']],
+                    segment_seconds=self.segment_seconds,
+                    profiler=self.profiler,
+                    on_segment=self.on_segment
+                )
+            else:
+                renderer = StreamingRenderer(
+                    output_file,
+                    size,
+                    fps=self.fps,
+                    codec='libx264',
+                    audio_codec='aac',
+                    ffmpeg_params=ffmpeg_params(self.profile),
+                    profiler=self.profiler
+                )
+            started = time.perf_counter()
+            with self.profiler.span('render', 'compose') as span:
+                frames = renderer.render(timeline, audio_path, overlays=[subtitle],
+                                         progress_callback=progress_callback, duration=narration,
+                                         should_continue=should_continue)
+                span['frames'] = frames
+            # 复用的分段几乎不耗时，只按实际编码的帧数统计帧率；全部复用时没有可记录的编码速度
+            encoded = renderer.encoded_frames if self.segment_cache is not None else frames
+            if encoded:
+                record_encode_stats(self.stats_file, self.profile, output_file, frames,
+                                    time.perf_counter() - started, size, encoded_frames=encoded)
+            else:
+                video_logger.info('All %d segments reused from cache, encode stats not recorded', renderer.reused)
+            
+            # 输出外挂字幕文件
+            subtitle_base = os.path.splitext(output_file)[0]
+            with self.profiler.span('write_subtitles', 'subtitle'):
+                write_srt(subtitle.cues, subtitle_base + '.srt')
+                write_ass(subtitle.cues, subtitle_base + '.ass', size, fontsize=subtitle.fontsize)
             
             # 清理资源
-            final_video.close()
+            subtitle.close()
             for clip in clips:
                 clip.close()
             
             return output_file, True
+        except RenderCancelled:
+            video_logger.info('Video composition cancelled')
+            raise
         except Exception as e:
             video_logger.error('Error during video composition: %s', str(e))
-            return '', False
\ No newline at end of file
+            return '', False